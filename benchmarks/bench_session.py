@@ -0,0 +1,67 @@
+"""
+Requests per second of ``send_message`` against a local stub server,
+with a fresh connection per call (old module level ``requests.post``)
+and with the pooled client session.
+
+    python -m benchmarks.bench_session --requests 2000 --threads 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from mailgun import Mailgun
+from mailgun.testing import StubServer
+
+DATA = {"from": "bench@example.com", "to": "to@example.com", "subject": "bench"}
+
+
+def run(call, total: int, threads: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda _: call(), range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with StubServer() as server:
+        url = server.base_url() + "example.com/messages"
+
+        def unpooled():
+            return requests.post(url, auth=("api", "key"), data=DATA).json()
+
+        before = run(unpooled, args.requests, args.threads)
+        before_connections = server.connections
+
+        with Mailgun("key", "example.com", pool_maxsize=args.threads) as mail:
+            mail.base_url = server.base_url()
+
+            def pooled():
+                return mail.send_message(DATA["from"], DATA["to"], DATA["subject"])
+
+            after = run(pooled, args.requests, args.threads)
+        after_connections = server.connections - before_connections
+
+    print(
+        "module requests.post: {:8.1f} req/s  {} connections".format(
+            before, before_connections
+        )
+    )
+    print(
+        "pooled session:       {:8.1f} req/s  {} connections".format(
+            after, after_connections
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Synthetic inputs for the benchmarks: MIME messages of chosen sizes and
+attachment counts, and event logs for the stub ``/events`` endpoint.
+"""
+import io
+import random
+import zipfile
+from email.message import EmailMessage
+
+# name, total attachment bytes, attachments
+CORPORA = (
+    ("small", 20 * 1024, 1),
+    ("medium", 1024 * 1024, 3),
+    ("large", 10 * 1024 * 1024, 5),
+    ("many", 2 * 1024 * 1024, 20),
+)
+
+
+def make_mime(size: int, attachments: int, seed: int = 0):
+    """
+    A multipart message with text and html bodies and ``attachments``
+    files sharing ``size`` bytes, every fourth one a zip of a png
+
+    Args:
+        size: ``int``
+            attachment bytes before encoding
+        attachments: ``int``
+        seed: ``int``
+
+    Return:
+        raw message: ``bytes``
+    """
+    generator = random.Random(seed)
+    msg = EmailMessage()
+    msg["From"] = "bench@example.com"
+    msg["To"] = "inbox@example.com"
+    msg["Date"] = "Mon, 01 Jan 2019 22:00:00 +0000"
+    msg["Subject"] = "Benchmark {} bytes, {} attachments".format(size, attachments)
+    msg.set_content("Hello,\nplease find the documents attached.\n" * 20)
+    msg.add_alternative("<p>Hello</p>" * 20, subtype="html")
+
+    part_size = max(size // max(attachments, 1), 1)
+    for index in range(attachments):
+        content = generator.getrandbits(8 * part_size).to_bytes(part_size, "little")
+        if index % 4 == 3:
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, "w") as z:
+                z.writestr("scan-{}.png".format(index), b"\x89PNG" + content)
+            msg.add_attachment(
+                archive.getvalue(),
+                maintype="application",
+                subtype="zip",
+                filename="scans-{}.zip".format(index),
+            )
+        else:
+            msg.add_attachment(
+                b"%PDF-1.4\n" + content,
+                maintype="application",
+                subtype="pdf",
+                filename="document-{}.pdf".format(index),
+            )
+    return msg.as_bytes()
+
+
+def make_events(count: int, start: float = 1546300800, event: str = "stored"):
+    """
+    ``count`` events one second apart, as ``StubMailgun.add_events`` takes
+    them
+
+    Return:
+        ``list`` of ``dict``
+    """
+    return [
+        {
+            "id": "event-{}".format(index),
+            "event": event,
+            "timestamp": start + index,
+            "storage": {"key": "message-{}".format(index)},
+            "message": {"headers": {"subject": "Event {}".format(index)}},
+        }
+        for index in range(count)
+    ]
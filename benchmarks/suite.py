@@ -0,0 +1,350 @@
+"""
+Throughput of the client against a local stub server, written as JSON so
+runs can be tracked and compared over time. Every benchmark runs in a
+fresh process so its peak RSS is its own.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --latency 0.02 --throttle 0.05 --only send
+    python -m benchmarks.suite --baseline results.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks.corpus import CORPORA, make_events, make_mime
+from mailgun import BulkSender, Mailgun, RetryPolicy
+from mailgun.email_parsing import cleanup_workspace, parse_email, parse_email_stream
+from mailgun.testing import StubMailgun, StubServer
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+MB = 1024 * 1024
+# the main figure of each benchmark, compared against a baseline
+THROUGHPUT = {
+    "send": "requests_per_second",
+    "events": "events_per_second",
+    "lists": "members_per_second",
+    "storage": "mb_per_second",
+    "parse": "mb_per_second",
+}
+
+
+def peak_rss():
+    """Peak resident memory of this process in MB, ``None`` when unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+def _server(config):
+    app = StubMailgun(
+        latency=config["latency"],
+        throttle=config["throttle"],
+        retry_after=0,
+    )
+    return StubServer(app).start()
+
+
+def _client(server, config, workers: int):
+    mail = Mailgun(
+        "key",
+        "example.com",
+        pool_maxsize=workers,
+        retry=RetryPolicy(retries=10, backoff=0.01, max_backoff=0.5),
+    )
+    mail.base_url = server.base_url()
+    return mail
+
+
+def bench_send(config):
+    """``send_message`` through ``BulkSender``"""
+    server = _server(config)
+    workers = config["workers"]
+    messages = (
+        {
+            "sender_email": "bench@example.com",
+            "to": "to-{}@example.com".format(index),
+            "subject": "Benchmark",
+            "text_body": "Hello",
+        }
+        for index in range(config["messages"])
+    )
+    try:
+        with _client(server, config, workers) as mail:
+            sender = BulkSender(mail, workers=workers)
+            start = time.perf_counter()
+            failed = sum(1 for r in sender.send(messages) if r.error is not None)
+            elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    return {
+        "requests": config["messages"],
+        "failed": failed,
+        "throttled": server.app.throttled,
+        "seconds": elapsed,
+        "requests_per_second": config["messages"] / elapsed,
+    }
+
+
+def bench_events(config):
+    """``iter_events`` over the paginated ``/events`` endpoint"""
+    server = _server(config)
+    server.app.add_events(make_events(config["events"]))
+    try:
+        with _client(server, config, 2) as mail:
+            start = time.perf_counter()
+            count = sum(1 for _ in mail.iter_events({"event": "stored"}))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    return {
+        "events": count,
+        "pages": len(server.app.requests),
+        "seconds": elapsed,
+        "events_per_second": count / elapsed,
+    }
+
+
+def bench_lists(config):
+    """``mailing_list_add_members`` through ``members.json``"""
+    server = _server(config)
+    workers = config["workers"]
+    members = (
+        {"address": "member-{}@example.com".format(index), "vars": {"n": index}}
+        for index in range(config["members"])
+    )
+    try:
+        with _client(server, config, workers) as mail:
+            start = time.perf_counter()
+            chunks = list(
+                mail.mailing_list_add_members("bench", members, workers=workers)
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    return {
+        "members": config["members"],
+        "failed_chunks": sum(1 for c in chunks if c.error is not None),
+        "seconds": elapsed,
+        "members_per_second": config["members"] / elapsed,
+    }
+
+
+def bench_storage(config):
+    """``parse_stored_message`` , download and parse of stored messages"""
+    server = _server(config)
+    corpus = [
+        make_mime(size, count, seed) for seed, (_, size, count) in enumerate(CORPORA)
+    ]
+    urls = [
+        server.url + server.app.store_message(str(index), raw.decode("ascii"))
+        for index, raw in enumerate(corpus)
+    ]
+    total = sum(len(raw) for raw in corpus)
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            with _client(server, config, 2) as mail:
+                start = time.perf_counter()
+                for index, url in enumerate(urls):
+                    metadata = mail.parse_stored_message(url, str(index), folder)
+                    cleanup_workspace(metadata)
+                elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+    return {
+        "messages": len(urls),
+        "bytes": total,
+        "seconds": elapsed,
+        "mb_per_second": total / MB / elapsed,
+    }
+
+
+def _parse_rate(parse, raw, repeat: int, folder: str):
+    start = time.perf_counter()
+    for index in range(repeat):
+        cleanup_workspace(parse(raw, str(index), folder))
+    return len(raw) * repeat / MB / (time.perf_counter() - start)
+
+
+def bench_parse(config):
+    """``parse_email`` and ``parse_email_stream`` over the MIME corpora"""
+    corpora = {}
+    total = elapsed = 0
+    with tempfile.TemporaryDirectory() as folder:
+        for seed, (name, size, count) in enumerate(CORPORA):
+            raw = make_mime(size, count, seed)
+            # the same volume of data for every corpus
+            repeat = max(1, int(config["parse_mb"] * MB // len(raw)))
+            start = time.perf_counter()
+            whole = _parse_rate(parse_email, raw.decode("ascii"), repeat, folder)
+            stream = _parse_rate(parse_email_stream, raw, repeat, folder)
+            elapsed += time.perf_counter() - start
+            total += 2 * len(raw) * repeat
+            corpora[name] = {
+                "bytes": len(raw),
+                "attachments": count,
+                "repeat": repeat,
+                "parse_email_mb_per_second": whole,
+                "parse_email_stream_mb_per_second": stream,
+            }
+    return {
+        "corpora": corpora,
+        "seconds": elapsed,
+        "mb_per_second": total / MB / elapsed,
+    }
+
+
+BENCHMARKS = {
+    "send": bench_send,
+    "events": bench_events,
+    "lists": bench_lists,
+    "storage": bench_storage,
+    "parse": bench_parse,
+}
+
+
+def _run_one(name, config):
+    result = BENCHMARKS[name](config)
+    result["peak_rss_mb"] = peak_rss()
+    return result
+
+
+def run(config: dict, names=None, isolate: bool = True):
+    """
+    Run the benchmarks
+
+    Args:
+        config: ``dict``
+            sizes, ``latency`` and ``throttle`` of the stub, see ``main``
+        names: ``list``
+            benchmarks to run, all by default
+        isolate: ``bool``
+            run each one in a new process
+
+    Return:
+        results by benchmark name: ``dict``
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        if not isolate:
+            results[name] = _run_one(name, config)
+            continue
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            results[name] = pool.submit(_run_one, name, config).result()
+    return results
+
+
+def regressions(results: dict, baseline: dict, tolerance: float):
+    """
+    Benchmarks slower than the baseline by more than ``tolerance``
+
+    Return:
+        ``list`` of ``(name, baseline, current)``
+    """
+    slower = []
+    for name, metric in THROUGHPUT.items():
+        before = baseline.get("results", {}).get(name, {}).get(metric)
+        current = results.get(name, {}).get(metric)
+        if before and current is not None and current < before * (1 - tolerance):
+            slower.append((name, before, current))
+    return slower
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS))
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--events", type=int, default=30000)
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--parse-mb", type=float, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="seconds added to every response"
+    )
+    parser.add_argument(
+        "--throttle", type=float, default=0, help="share of requests answered 429"
+    )
+    parser.add_argument("--no-isolate", action="store_true")
+    parser.add_argument("--output", help="JSON file, stdout when omitted")
+    parser.add_argument("--baseline", help="JSON file of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    config = {
+        "messages": args.messages,
+        "workers": args.workers,
+        "events": args.events,
+        "members": args.members,
+        "parse_mb": args.parse_mb,
+        "latency": args.latency,
+        "throttle": args.throttle,
+    }
+    results = run(config, args.only, not args.no_isolate)
+    report = {
+        "timestamp": time.time(),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for name, result in results.items():
+        print(
+            "{:8} {:>12.1f} {:20} peak rss {:.1f} MB".format(
+                name,
+                result[THROUGHPUT[name]],
+                THROUGHPUT[name],
+                result["peak_rss_mb"] or 0,
+            ),
+            file=sys.stderr,
+        )
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        for name, before, current in slower:
+            print(
+                "{} regressed: {:.1f} -> {:.1f}".format(name, before, current),
+                file=sys.stderr,
+            )
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,15 @@
 from .mailgun import Mailgun
+from .async_mailgun import AsyncMailgun
+from .bulk import BulkSender, DomainRateLimiter, TokenBucket
+from .attachments import Attachment, AttachmentBundle
+from .poller import EventPoller, JSONCheckpoint, SQLiteCheckpoint
+from .parallel import ParseResult, parse_many
+from .pipeline import InboundPipeline
+from .cache import SQLiteValidationStore, ValidationCache
+from .validation import ValidationResult, validate_many
+from .lists import ChunkResult
+from .retry import CircuitBreaker, RetryPolicy
+from .concurrency import AdaptiveLimiter
+from .instrumentation import Instrumentation, MetricsCollector, RequestEvent
+from .transport import HTTPTransport, InMemoryTransport, RecordReplayTransport
+from .spool import OutboundSpool, SpoolDispatcher
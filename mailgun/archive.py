@@ -0,0 +1,158 @@
+"""Bounded, streaming extraction of zip attachments"""
+import os
+import tempfile
+import zipfile
+
+from .error import ArchiveLimitExceeded
+
+CHUNK_SIZE = 64 * 1024
+MAX_TOTAL_SIZE = 1024 * 1024 * 1024
+MAX_MEMBERS = 10000
+MAX_RATIO = 100
+MAX_DEPTH = 3
+# members smaller than this are never flagged for their compression ratio
+RATIO_MIN_SIZE = 1024 * 1024
+
+
+class _Budget:
+    def __init__(self, max_total_size: int, max_members: int):
+        self.max_total_size = max_total_size
+        self.max_members = max_members
+        self.size = 0
+        self.members = 0
+
+    def add_member(self):
+        self.members += 1
+        if self.members > self.max_members:
+            raise ArchiveLimitExceeded(
+                "more than {} archive members".format(self.max_members)
+            )
+
+    def add_bytes(self, count: int):
+        self.size += count
+        if self.size > self.max_total_size:
+            raise ArchiveLimitExceeded(
+                "archive content larger than {} bytes".format(self.max_total_size)
+            )
+
+
+def _target_path(output_dir: str, name: str):
+    """Path of a member inside ``output_dir`` , ``None`` when it escapes it"""
+    name = name.replace("\\", "/").lstrip("/")
+    path = os.path.normpath(os.path.join(output_dir, name))
+    root = os.path.normpath(output_dir)
+    if os.path.commonpath([root, path]) != root or path == root:
+        return None
+    return path
+
+
+def _copy_member(archive, member, path, budget, max_ratio, chunk_size):
+    written = 0
+    try:
+        with archive.open(member) as src, open(path, "wb") as out:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                budget.add_bytes(len(chunk))
+                if (
+                    written > RATIO_MIN_SIZE
+                    and written > max(member.compress_size, 1) * max_ratio
+                ):
+                    raise ArchiveLimitExceeded(
+                        "{} compression ratio above {}".format(
+                            member.filename, max_ratio
+                        )
+                    )
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def extract_zip(
+    path: str,
+    output_dir: str,
+    allowed: tuple = None,
+    max_total_size: int = MAX_TOTAL_SIZE,
+    max_members: int = MAX_MEMBERS,
+    max_ratio: float = MAX_RATIO,
+    nested: bool = True,
+    max_depth: int = MAX_DEPTH,
+    chunk_size: int = CHUNK_SIZE,
+):
+    """
+    Extract the wanted members of a zip archive, one chunk at a time
+
+    Members are checked against ``allowed`` before anything is read, so
+    other files are never decompressed. Extraction stops with
+    ``ArchiveLimitExceeded`` once the archives hold too many members, too
+    many decompressed bytes, or a member inflates more than ``max_ratio``
+    times, which is the signature of a zip bomb.
+
+    Args:
+        path: ``str``
+            zip file
+        output_dir: ``str``
+            folder for the extracted files
+        allowed: ``tuple``
+            file extensions to extract, ``None`` for every member
+        max_total_size: ``int``
+            decompressed bytes allowed across nested archives
+        max_members: ``int``
+            members allowed across nested archives
+        max_ratio: ``float``
+            decompressed / compressed size allowed for a member
+        nested: ``bool``
+            extract zip files found inside the archive too
+        max_depth: ``int``
+            nesting levels followed
+        chunk_size: ``int``
+
+    Return:
+        paths of the extracted files: ``list``
+    """
+    budget = _Budget(max_total_size, max_members)
+    return _extract(
+        path, output_dir, allowed, budget, max_ratio, nested, max_depth, chunk_size
+    )
+
+
+def _extract(path, output_dir, allowed, budget, max_ratio, nested, depth, chunk_size):
+    extracted = []
+    with zipfile.ZipFile(path, "r") as archive:
+        for member in archive.infolist():
+            if member.is_dir():
+                continue
+            budget.add_member()
+            _, ext = os.path.splitext(member.filename)
+
+            if ext == ".zip" and nested and depth > 0:
+                fd, inner = tempfile.mkstemp(suffix=".zip", dir=output_dir)
+                os.close(fd)
+                _copy_member(archive, member, inner, budget, max_ratio, chunk_size)
+                try:
+                    extracted += _extract(
+                        inner,
+                        output_dir,
+                        allowed,
+                        budget,
+                        max_ratio,
+                        nested,
+                        depth - 1,
+                        chunk_size,
+                    )
+                finally:
+                    os.remove(inner)
+                continue
+
+            if allowed is not None and ext not in allowed:
+                continue
+            target = _target_path(output_dir, member.filename)
+            if target is None:
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _copy_member(archive, member, target, budget, max_ratio, chunk_size)
+            extracted.append(target)
+    return extracted
@@ -0,0 +1,455 @@
+"""Asyncio Mailgun client sharing one pooled aiohttp connection"""
+import asyncio
+import base64
+import os
+from functools import partial
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from .email_parsing import parse_email
+from .mailgun import (
+    MAX_BATCH_SIZE,
+    batch_data,
+    batch_result,
+    is_valid_risk,
+    message_data,
+    resolve_credentials,
+    template_data,
+)
+from .multipart import attachment_source
+from .transport import region_url
+from .utils import chunked
+
+
+class AsyncMailgun:
+    """
+    Initializes an asyncio client with the same methods as ``Mailgun`` ,
+    every API method is a coroutine.
+
+    Requires ``aiohttp`` ( ``pip install mailgun3_python[async]`` ).
+
+    Args:
+        apikey:``str``
+            API key provided from mailgun. You can also save env var as ``MAILGUN_API_KEY`` .
+        domain:``str``
+            domain to use for this class. You can also save env var as ``MAILGUN_DOMAIN`` .
+        version:``str``
+            Maingun API version.
+        concurrency:``int``
+            maximum number of requests in flight, extra calls wait their turn.
+        limit_per_host:``int``
+            maximum connections per host, ``0`` for no per-host limit.
+        keepalive_timeout:``float``
+            seconds an idle connection is kept open.
+        timeout:``float``
+            total timeout in seconds for every request.
+        validation_cache:``ValidationCache``
+            cache of address validation results.
+        retry:``RetryPolicy``
+            retries of failed requests, ``None`` to send every request once.
+        circuit_breaker:``CircuitBreaker``
+            fail fast while the API keeps failing.
+        region:``str``
+            ``"us"`` or ``"eu"`` .
+        api_url:``str``
+            API root overriding ``region`` .
+
+    Example:
+
+        .. code-block:: python
+
+            async with AsyncMailgun(concurrency=200) as mailgun:
+                await asyncio.gather(
+                    *[mailgun.send_message(sender, to, "Hello", "Hi") for to in emails]
+                )
+    """
+
+    def __init__(
+        self,
+        apikey: str = None,
+        domain: str = None,
+        version: str = "v3",
+        concurrency: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 15,
+        timeout: float = None,
+        validation_cache=None,
+        retry=None,
+        circuit_breaker=None,
+        region: str = "us",
+        api_url: str = None,
+    ):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncMailgun requires aiohttp, "
+                "install it with `pip install mailgun3_python[async]`"
+            )
+
+        self.apikey, self.domain = resolve_credentials(apikey, domain)
+        self.version = version
+        self.api_url = (api_url or region_url(region)).rstrip("/")
+        self.base_url = "{}/{}/".format(self.api_url, self.version)
+        self.validate_url = "{}/v4/address/validate".format(self.api_url)
+        self.auth = ("api", self.apikey)
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.validation_cache = validation_cache
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.session = None
+        self._semaphore = None
+
+    def _get_session(self):
+        # created lazily so it binds to the running event loop
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            token = base64.b64encode(":".join(self.auth).encode("utf-8"))
+            self.session = aiohttp.ClientSession(
+                headers={"Authorization": "Basic " + token.decode("ascii")},
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self.session
+
+    def _retry(self, method: str, attempt: int, status: int, idempotent: bool):
+        policy = self.retry
+        return (
+            policy is not None
+            and attempt < policy.retries
+            and policy.is_retryable(method, status, idempotent)
+        )
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        idempotent: bool = None,
+        data=None,
+        with_status: bool = False,
+        **kwargs
+    ):
+        """
+        Send a request through the shared session and decode the json body,
+        retried as ``retry`` allows. A callable ``data`` builds the body of
+        every attempt. ``with_status`` returns ``(status, json)`` , the json
+        ``None`` when the body is not json.
+        """
+        session = self._get_session()
+        breaker = self.circuit_breaker
+        attempt = 0
+        while True:
+            trial = breaker is not None and breaker.before()
+            try:
+                body = data() if callable(data) else data
+                async with self._semaphore:
+                    async with session.request(
+                        method, url, data=body, **kwargs
+                    ) as response:
+                        status = response.status
+                        failed = status >= 500 or status == 429
+                        if breaker is not None and failed:
+                            breaker.failure()
+                        elif breaker is not None:
+                            breaker.success()
+                        trial = False
+                        if not self._retry(method, attempt, status, idempotent):
+                            if not with_status:
+                                return await response.json(content_type=None)
+                            try:
+                                payload = await response.json(content_type=None)
+                            except ValueError:
+                                payload = None
+                            return status, payload
+                        headers = response.headers
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if breaker is not None:
+                    breaker.failure()
+                if not self._retry(method, attempt, None, idempotent):
+                    raise
+                headers = None
+            except BaseException:
+                # cancelled or failed, a trial left unsettled would keep
+                # the circuit open for good
+                if trial:
+                    breaker.release()
+                raise
+            attempt += 1
+            await asyncio.sleep(self.retry.delay(attempt, headers))
+
+    async def close(self):
+        """
+        Close the pooled connection
+        """
+        if self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def send_message(
+        self,
+        sender_email: str,
+        to: str,
+        subject: str,
+        html_body: str = None,
+        text_body: str = None,
+        files: list = None,
+        extra_data: dict = None,
+    ):
+        """
+        Send email, see ``Mailgun.send_message``
+
+        Return:
+            Response from API: ``json``
+        """
+        data = message_data(sender_email, to, subject, html_body, text_body, extra_data)
+        url = self.base_url + "{}/messages".format(self.domain)
+
+        if not files:
+            return await self._request("POST", url, data=data)
+
+        handles = []
+        starts = {}
+
+        def build():
+            # a new form for every attempt, files are read again from the start
+            form = aiohttp.FormData()
+            for key, value in data.items():
+                form.add_field(key, str(value))
+            for index, f in enumerate(files):
+                filename, source = attachment_source(f, index)
+                if isinstance(source, (str, os.PathLike)):
+                    source = open(source, "rb")
+                    handles.append(source)
+                elif hasattr(source, "seek"):
+                    source.seek(starts.setdefault(index, source.tell()))
+                form.add_field(
+                    "attachment",
+                    source,
+                    filename=filename,
+                    content_type=getattr(f, "content_type", None),
+                )
+            return form
+
+        try:
+            return await self._request("POST", url, data=build)
+        finally:
+            for handle in handles:
+                handle.close()
+
+    async def send_message_template(
+        self,
+        sender_email: str,
+        to: str,
+        subject: str,
+        template_name: str,
+        data: dict,
+        extra_data: dict = None,
+    ):
+        """
+        Send email using template, see ``Mailgun.send_message_template``
+
+        Return:
+            Response from API: ``json``
+        """
+        payload = template_data(
+            sender_email, to, subject, template_name, data, extra_data
+        )
+        url = self.base_url + "{}/messages".format(self.domain)
+        return await self._request("POST", url, data=payload)
+
+    async def send_batch(
+        self,
+        sender_email: str,
+        recipients,
+        subject: str,
+        html_body: str = None,
+        text_body: str = None,
+        template_name: str = None,
+        data: dict = None,
+        extra_data: dict = None,
+        batch_size: int = MAX_BATCH_SIZE,
+    ):
+        """
+        Batch send with recipient variables, see ``Mailgun.send_batch``
+
+        Return:
+            Result per batch: ``list`` , a failed batch does not stop the
+            next ones
+        """
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(
+                "batch_size must be between 1 and {}".format(MAX_BATCH_SIZE)
+            )
+
+        if template_name:
+            base = template_data(
+                sender_email, None, subject, template_name, data or {}, extra_data
+            )
+        else:
+            base = message_data(
+                sender_email, None, subject, html_body, text_body, extra_data
+            )
+
+        url = self.base_url + "{}/messages".format(self.domain)
+        results = []
+        for index, chunk in enumerate(chunked(recipients, batch_size)):
+            fields = [
+                (key, str(item))
+                for key, value in batch_data(base, chunk).items()
+                for item in (value if isinstance(value, list) else [value])
+            ]
+            # plain fields, unlike a FormData, can be sent again on a retry
+            try:
+                status, payload = await self._request(
+                    "POST", url, data=fields, with_status=True
+                )
+            except Exception as e:
+                results.append(batch_result(index, chunk, error=e))
+                continue
+            results.append(batch_result(index, chunk, status, payload))
+        return results
+
+    async def get_logs(self, params: dict = {"event": "stored"}):
+        """
+        Logs
+
+        Args:
+            Params: ``dict``
+                filter for logs.
+
+        Return:
+            logs dicts: ``dict``
+        """
+        url = self.base_url + "{}/events".format(self.domain)
+        return await self._request("GET", url, params=params)
+
+    async def mailing_list_create(self, list_name: str, description: str):
+        """
+        Create new mailing list
+
+        Return:
+            Response dict: ``dict``
+        """
+        url = self.base_url + "lists"
+        data = {
+            "address": "{}@{}".format(list_name, self.domain),
+            "description": description,
+        }
+        return await self._request("POST", url, data=data)
+
+    async def mailing_list_delete(self, list_name: str):
+        """
+        Delete mailing list
+
+        Return:
+            Response dict: ``dict``
+        """
+        url = self.base_url + "lists/{}@{}".format(list_name, self.domain)
+        return await self._request("DELETE", url)
+
+    async def mailing_list_add_email(self, list_name: str, data: dict):
+        """
+        Add user to mailing list, see ``Mailgun.mailing_list_add_email``
+
+        Return:
+            Rsponses from API: ``dict``
+        """
+        url = self.base_url + "lists/{}@{}/members".format(list_name, self.domain)
+        return await self._request("POST", url, data=data)
+
+    async def mailing_list_delete_email(self, list_name: str, email: str):
+        """
+        Delete user from mailing list
+
+        Return:
+            Rsponses from API: ``dict``
+        """
+        url = self.base_url + "lists/{}@{}/members/{}".format(
+            list_name, self.domain, email
+        )
+        return await self._request("DELETE", url)
+
+    async def mailing_list_update_email(self, list_name: str, email: str, data: dict):
+        """
+        Update user to detail on mailing list
+
+        Return:
+            Rsponses from API: ``dict``
+        """
+        url = self.base_url + "lists/{}@{}/members/{}".format(
+            list_name, self.domain, email
+        )
+        return await self._request("PUT", url, data=data)
+
+    async def validated_email(self, email: str):
+        """
+        Validate the Email
+
+        Return:
+            valid True or false: ``bool``
+        """
+        return is_valid_risk(await self.validate_address(email))
+
+    async def validate_address(self, email: str):
+        """
+        Validate the Email, answering from ``validation_cache`` when it has
+        a fresh result
+
+        Return:
+            Response from API: ``dict``
+        """
+        cache = self.validation_cache
+        if cache is not None:
+            data = cache.get(email)
+            if data is not None:
+                return data
+
+        data = await self._request("GET", self.validate_url, params={"address": email})
+        # failed calls carry no risk and are not cached
+        if cache is not None and "risk" in data:
+            cache.set(email, data, is_valid_risk(data))
+        return data
+
+    async def get_message_mime(self, url: str):
+        """
+        get email mime to parse email
+
+        Return:
+            json with body-mime: ``dict``
+        """
+        headers = {"Accept": "message/rfc2822"}
+        return await self._request("GET", url, headers=headers)
+
+    async def parse_email_mime(
+        self, body_mime, email_id: str = None, save_attachment_dir: str = "tmp"
+    ):
+        """
+        parse email-mime in the default executor so the event loop keeps running
+
+        Return:
+            Metadata and file saved in tmp dir: ``dict``
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, partial(parse_email, body_mime, email_id, save_attachment_dir)
+        )
+
+    def __str__(self):
+        return "Async Mailgun API"
+
+    def __repr__(self):
+        return "Async Mailgun API"
@@ -0,0 +1,133 @@
+"""Attachments loaded once and shared by many sends"""
+import mmap
+import os
+
+from .multipart import attachment_source
+
+MMAP_THRESHOLD = 1024 * 1024
+
+
+class Attachment:
+    """
+    Read-only attachment content.
+
+    ``content`` is a ``memoryview`` , every send reads slices of it, so one
+    ``Attachment`` can be used by many sends and threads at once.
+
+    Args:
+        filename:``str``
+        content:``memoryview``
+        content_type:``str``
+            guessed from ``filename`` when omitted.
+    """
+
+    def __init__(self, filename: str, content, content_type: str = None):
+        self.filename = filename
+        self.content = memoryview(content).toreadonly()
+        self.content_type = content_type
+        self._mmap = None
+
+    @classmethod
+    def from_path(
+        cls,
+        path: str,
+        filename: str = None,
+        content_type: str = None,
+        mmap_threshold: int = MMAP_THRESHOLD,
+    ):
+        """
+        Load a file, memory-mapped when it is at least ``mmap_threshold`` bytes
+        """
+        filename = filename or os.path.basename(path)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size and size >= mmap_threshold:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                attachment = cls(filename, mapped, content_type)
+                attachment._mmap = mapped
+                return attachment
+            return cls(filename, f.read(), content_type)
+
+    @property
+    def size(self):
+        return self.content.nbytes
+
+    def close(self):
+        """
+        Release the buffer, the attachment can't be sent afterwards
+        """
+        self.content.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __repr__(self):
+        return "Attachment({!r}, {} bytes)".format(self.filename, self.size)
+
+
+class AttachmentBundle:
+    """
+    Attachments built once and reused across ``send_message`` calls.
+
+    Pass the bundle as ``files`` , each send only writes the part headers
+    around the shared buffers, without opening or reading the files again.
+
+    Args:
+        files:``list``
+            same entries as ``send_message`` ``files`` .
+        mmap_threshold:``int``
+            files at least this large are memory-mapped instead of read.
+
+    Example:
+
+        .. code-block:: python
+
+            with AttachmentBundle(["./brochure.pdf", ("terms.pdf", terms)]) as bundle:
+                for to in emails:
+                    mailgun.send_message(sender, to, "Brochure", "Hi", files=bundle)
+    """
+
+    def __init__(self, files: list = None, mmap_threshold: int = MMAP_THRESHOLD):
+        self.mmap_threshold = mmap_threshold
+        self.attachments = []
+        for index, entry in enumerate(files or []):
+            self.add(entry, index)
+
+    def add(self, entry, index: int = None):
+        """
+        Add one ``files`` entry
+
+        Return:
+            added attachment: ``Attachment``
+        """
+        if isinstance(entry, Attachment):
+            attachment = entry
+        else:
+            index = len(self.attachments) if index is None else index
+            filename, source = attachment_source(entry, index)
+            if isinstance(source, (str, os.PathLike)):
+                attachment = Attachment.from_path(
+                    source, filename, mmap_threshold=self.mmap_threshold
+                )
+            elif isinstance(source, (bytes, bytearray, memoryview)):
+                attachment = Attachment(filename, bytes(source))
+            else:
+                attachment = Attachment(filename, source.read())
+        self.attachments.append(attachment)
+        return attachment
+
+    def close(self):
+        for attachment in self.attachments:
+            attachment.close()
+
+    def __iter__(self):
+        return iter(self.attachments)
+
+    def __len__(self):
+        return len(self.attachments)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,248 @@
+"""Concurrent bulk sending with per-domain token-bucket rate limiting"""
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+BulkResult = namedtuple("BulkResult", ["index", "message_id", "error", "response"])
+BulkResult.__doc__ = """
+Outcome of one message: ``message_id`` on success, ``error`` (API message
+or exception) on failure.
+"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Args:
+        rate:``float``
+            tokens added per second, ``None`` for no limit and ``0`` to
+            pause until the rate is changed.
+        burst:``float``
+            bucket capacity, defaults to one second worth of tokens.
+    """
+
+    def __init__(self, rate: float = None, burst: float = None):
+        self._lock = threading.Lock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: float = None, burst: float = None):
+        """
+        Change the rate, takes effect for waiting callers too
+        """
+        if rate is not None and rate < 0:
+            raise ValueError("rate must be None or at least 0")
+        with self._lock:
+            self.rate = rate
+            self.burst = burst or max(rate or 1, 1)
+            self.tokens = self.burst
+            self._last = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens: float = 1):
+        """
+        Block until ``tokens`` are available and take them
+        """
+        while True:
+            with self._lock:
+                if self.rate is None:
+                    return
+                if self.rate == 0:
+                    # paused
+                    delay = 0.1
+                else:
+                    self._refill()
+                    if self.tokens >= tokens:
+                        self.tokens -= tokens
+                        return
+                    delay = (tokens - self.tokens) / self.rate
+            # wake up regularly so a runtime rate change is picked up
+            time.sleep(min(delay, 0.1))
+
+
+class DomainRateLimiter:
+    """
+    One ``TokenBucket`` per sending domain, share it between senders of the
+    same domain.
+
+    Args:
+        rate:``float``
+            default messages per second of a domain, ``None`` for no limit.
+        burst:``float``
+    """
+
+    def __init__(self, rate: float = None, burst: float = None):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, domain: str):
+        with self._lock:
+            if domain not in self._buckets:
+                self._buckets[domain] = TokenBucket(self.rate, self.burst)
+            return self._buckets[domain]
+
+    def set_rate(self, rate: float = None, domain: str = None, burst: float = None):
+        """
+        Change the rate of one domain, or the default and every domain
+        """
+        if domain is not None:
+            self.bucket(domain).set_rate(rate, burst)
+            return
+        with self._lock:
+            self.rate, self.burst = rate, burst
+            buckets = list(self._buckets.values())
+        for bucket in buckets:
+            bucket.set_rate(rate, burst)
+
+    def acquire(self, domain: str):
+        self.bucket(domain).acquire()
+
+
+class BulkSender:
+    """
+    Send many messages through a ``Mailgun`` client on a bounded thread pool.
+
+    Args:
+        mailgun:``Mailgun``
+        workers:``int``
+            number of sending threads, keep the client ``pool_maxsize`` at
+            least as large.
+        rate:``float``
+            messages per second for the client domain, ``None`` for no limit.
+        burst:``float``
+        max_in_flight:``int``
+            messages submitted but not yet yielded, defaults to ``2 * workers``
+            so memory stays flat however long the input is.
+        limiter:``DomainRateLimiter``
+            shared limiter, overrides ``rate`` and ``burst`` .
+
+    Example:
+
+        .. code-block:: python
+
+            sender = BulkSender(mailgun, workers=16, rate=50)
+            messages = ({"sender_email": "Docsumo <hello@docsumo.com>",
+                         "to": to,
+                         "subject": "Hello",
+                         "text_body": "Hi"} for to in emails)
+            for result in sender.send(messages):
+                if result.error:
+                    print(result.index, result.error)
+            print(sender.stats())
+    """
+
+    def __init__(
+        self,
+        mailgun,
+        workers: int = 8,
+        rate: float = None,
+        burst: float = None,
+        max_in_flight: int = None,
+        limiter: DomainRateLimiter = None,
+    ):
+        self.mailgun = mailgun
+        self.workers = workers
+        self.max_in_flight = max_in_flight or 2 * workers
+        self.limiter = limiter or DomainRateLimiter(rate, burst)
+        self.sent = 0
+        self.failed = 0
+        self._started = None
+        self._finished = None
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float = None, burst: float = None):
+        """
+        Change the messages per second of the client domain at runtime,
+        ``0`` pauses sending and ``None`` removes the limit
+        """
+        self.limiter.set_rate(rate, self.mailgun.domain, burst)
+
+    def _send_one(self, index: int, message: dict):
+        self.limiter.acquire(self.mailgun.domain)
+        try:
+            if "template_name" in message:
+                response = self.mailgun.send_message_template(**message)
+            else:
+                response = self.mailgun.send_message(**message)
+        except Exception as e:
+            return BulkResult(index, None, e, None)
+
+        message_id = response.get("id") if isinstance(response, dict) else None
+        if message_id:
+            return BulkResult(index, message_id, None, response)
+        error = response.get("message") if isinstance(response, dict) else response
+        return BulkResult(index, None, error, response)
+
+    def _record(self, result: BulkResult):
+        with self._lock:
+            if result.error is None:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def send(self, messages):
+        """
+        Send messages, yielding results as they complete
+
+        Args:
+            messages: ``iterable``
+                ``dict`` of ``send_message`` keyword arguments, or of
+                ``send_message_template`` ones when ``template_name`` is set.
+
+        Return:
+            generator of ``BulkResult`` in completion order
+        """
+        self.sent = self.failed = 0
+        self._started = time.monotonic()
+        self._finished = None
+        pending = set()
+        with ThreadPoolExecutor(self.workers) as pool:
+            for index, message in enumerate(messages):
+                if len(pending) >= self.max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        self._record(result)
+                        yield result
+                pending.add(pool.submit(self._send_one, index, message))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    self._record(result)
+                    yield result
+        self._finished = time.monotonic()
+
+    @property
+    def throughput(self):
+        """Completed messages per second since ``send`` started"""
+        if self._started is None:
+            return 0.0
+        elapsed = (self._finished or time.monotonic()) - self._started
+        return (self.sent + self.failed) / elapsed if elapsed else 0.0
+
+    def stats(self):
+        """
+        Counters of the current or last run
+
+        Return:
+            stats: ``dict``
+
+                .. code-block:: json
+
+                    {"sent": 9998, "failed": 2, "throughput": 48.7, "rate": 50}
+        """
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "throughput": self.throughput,
+            "rate": self.limiter.bucket(self.mailgun.domain).rate,
+        }
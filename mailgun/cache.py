@@ -0,0 +1,226 @@
+"""Cache of address validation results"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parseaddr
+
+# a day for deliverable addresses, an hour for the rest
+TTL = 24 * 60 * 60
+NEGATIVE_TTL = 60 * 60
+
+
+def normalize_address(address: str):
+    """
+    Cache key of an address: the bare address, trimmed and lowercased
+
+    Example:
+
+        ``"Bikram <Bkrm.Dahal@Gmail.com> "`` gives ``"bkrm.dahal@gmail.com"``
+    """
+    return (parseaddr(address)[1] or address).strip().lower()
+
+
+class SQLiteValidationStore:
+    """
+    Validation results kept in a SQLite database, shared by the processes
+    of a host and kept across restarts.
+
+    Args:
+        path:``str``
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        db = self._connect()
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            with db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS validations "
+                    "(address TEXT PRIMARY KEY, expires REAL, payload TEXT)"
+                )
+        finally:
+            db.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, address: str):
+        """
+        Return:
+            ``(expires, payload)`` or ``None``
+        """
+        db = self._connect()
+        try:
+            row = db.execute(
+                "SELECT expires, payload FROM validations WHERE address = ?",
+                (address,),
+            ).fetchone()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, address: str, expires: float, payload: dict):
+        db = self._connect()
+        try:
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO validations (address, expires, payload) "
+                    "VALUES (?, ?, ?)",
+                    (address, expires, json.dumps(payload)),
+                )
+        finally:
+            db.close()
+
+    def purge(self, now: float = None):
+        """Drop expired results"""
+        db = self._connect()
+        try:
+            with db:
+                db.execute(
+                    "DELETE FROM validations WHERE expires <= ?", (now or time.time(),)
+                )
+        finally:
+            db.close()
+
+    def clear(self):
+        db = self._connect()
+        try:
+            with db:
+                db.execute("DELETE FROM validations")
+        finally:
+            db.close()
+
+
+class ValidationCache:
+    """
+    Thread-safe LRU cache of validation results with expiry.
+
+    Results of deliverable addresses are kept ``ttl`` seconds, the others
+    ``negative_ttl`` seconds, so a fixed address is re-checked sooner. With
+    a ``store`` , misses of the in-memory cache are looked up there and new
+    results are written through to it.
+
+    Args:
+        maxsize:``int``
+            results kept in memory.
+        ttl:``float``
+            seconds a deliverable result is kept.
+        negative_ttl:``float``
+            seconds an undeliverable result is kept.
+        store:``SQLiteValidationStore``
+            persistent store, or ``str`` path of its database.
+
+    Example:
+
+        .. code-block:: python
+
+            cache = ValidationCache(store="validations.db")
+            mailgun = Mailgun(validation_cache=cache)
+            mailgun.validated_email("bkrm.dahal@gmail.com")
+            print(cache.stats())
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+        store=None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        if isinstance(store, str):
+            store = SQLiteValidationStore(store)
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, address: str):
+        """
+        Cached validation payload of ``address`` , ``None`` when missing or
+        expired
+        """
+        key = normalize_address(address)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        if self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None and entry[0] > now:
+                with self._lock:
+                    self._remember(key, entry)
+                    self.hits += 1
+                return entry[1]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, address: str, payload: dict, valid: bool = True):
+        """
+        Cache the validation payload of ``address``
+
+        Args:
+            address: ``str``
+            payload: ``dict``
+                validation API response
+            valid: ``bool``
+                whether the address passed, picks ``ttl`` or ``negative_ttl``
+        """
+        key = normalize_address(address)
+        ttl = self.ttl if valid else self.negative_ttl
+        entry = (time.time() + ttl, payload)
+        with self._lock:
+            self._remember(key, entry)
+        if self.store is not None:
+            self.store.set(key, *entry)
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached result, in the store too"""
+        with self._lock:
+            self._entries.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Return:
+            stats: ``dict``
+
+                .. code-block:: json
+
+                    {"hits": 812, "misses": 188, "hit_rate": 0.812, "size": 188}
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
@@ -0,0 +1,169 @@
+"""Adaptive limit on the requests in flight"""
+import threading
+import time
+from collections import deque, namedtuple
+
+Decision = namedtuple("Decision", ["time", "old", "new", "reason"])
+Decision.__doc__ = """
+One change of the limit: ``reason`` is ``"healthy"`` , ``"overload"``
+(429 / 503 / connection error) or ``"latency"`` .
+"""
+
+OVERLOAD_STATUSES = frozenset({429, 503})
+
+
+class AdaptiveLimiter:
+    """
+    Additive increase / multiplicative decrease limit on concurrent
+    requests.
+
+    Every answered request grows the limit by ``increase / limit`` , about
+    ``increase`` per round of ``limit`` requests, as long as the limit is
+    actually used. A 429 / 503, a connection error or a latency above
+    ``latency_tolerance`` times the baseline multiplies it by ``decrease``
+    , at most once per smoothed latency so a burst of failures from one
+    round cuts it once. The baseline is the lowest smoothed latency seen,
+    drifting slowly up so it follows a slower API.
+
+    Args:
+        initial:``int``
+            starting limit.
+        min_limit:``int``
+        max_limit:``int``
+        increase:``float``
+            limit added per round of healthy requests.
+        decrease:``float``
+            factor applied on overload.
+        latency_tolerance:``float``
+            latency over the baseline treated as overload.
+        smoothing:``float``
+            weight of the newest latency in the moving average.
+        history:``int``
+            decisions kept in ``decisions`` .
+
+    Example:
+
+        .. code-block:: python
+
+            limiter = AdaptiveLimiter(initial=8, max_limit=64)
+            mailgun = Mailgun(concurrency_limiter=limiter)
+            for result in BulkSender(mailgun, workers=64).send(messages):
+                ...
+            print(limiter.limit, limiter.stats())
+    """
+
+    def __init__(
+        self,
+        initial: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        increase: float = 1,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        history: int = 100,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.decisions = deque(maxlen=history)
+        self.in_flight = 0
+        self.latency = None
+        self.baseline = None
+        self.increases = 0
+        self.decreases = 0
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        """Requests allowed in flight now"""
+        return max(int(self._limit), self.min_limit)
+
+    def acquire(self):
+        """
+        Block until a request may be sent
+        """
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, status: int = None, error: bool = False):
+        """
+        Report a finished request and adjust the limit
+
+        Args:
+            latency: ``float``
+                seconds the request took
+            status: ``int``
+                response status, ``None`` when it failed
+            error: ``bool``
+                the connection failed
+        """
+        with self._condition:
+            # the limit was in use if the request needed one of the last slots
+            saturated = self.in_flight >= self.limit - 1
+            self.in_flight -= 1
+            if not error:
+                self._observe(latency)
+
+            if error or status in OVERLOAD_STATUSES:
+                self._decrease("overload")
+            elif (
+                self.baseline and self.latency > self.baseline * self.latency_tolerance
+            ):
+                self._decrease("latency")
+            elif saturated and self._limit < self.max_limit:
+                old = self.limit
+                self._limit = min(
+                    self._limit + self.increase / self._limit, self.max_limit
+                )
+                if self.limit != old:
+                    self.increases += 1
+                    self.decisions.append(
+                        Decision(time.time(), old, self.limit, "healthy")
+                    )
+            self._condition.notify_all()
+
+    def _observe(self, latency: float):
+        if self.latency is None:
+            self.latency = self.baseline = latency
+            return
+        self.latency += self.smoothing * (latency - self.latency)
+        self.baseline = min(self.baseline * 1.001, self.latency)
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency or 0):
+            # the failures of one round only count once
+            return
+        old = self.limit
+        self._limit = max(self._limit * self.decrease, self.min_limit)
+        self._last_decrease = now
+        self.decreases += 1
+        self.decisions.append(Decision(time.time(), old, self.limit, reason))
+
+    def stats(self):
+        """
+        Return:
+            stats: ``dict``
+
+                .. code-block:: json
+
+                    {"limit": 24, "in_flight": 23, "latency": 0.182,
+                     "baseline": 0.121, "increases": 31, "decreases": 2}
+        """
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "latency": self.latency,
+                "baseline": self.baseline,
+                "increases": self.increases,
+                "decreases": self.decreases,
+            }
@@ -1,16 +1,31 @@
 """Parse body-mime"""
 import email
 import os
-import glob
-import zipfile
+import re
+import shutil
+import tempfile
+import time
+
+from .archive import extract_zip
+from .mime_stream import CHUNK_SIZE, StreamingMimeParser, safe_filename
 
 allowed_file = (".png", ".jpg", ".tiff", ".jpeg", ".pdf")
 
 
-def parse_email(email_string: str, email_id: str, output_dir: str = "tmp"):
+def parse_email(
+    email_string: str,
+    email_id: str,
+    output_dir: str = "tmp",
+    archive_limits: dict = None,
+    instrumentation=None,
+):
     """
     parse email and save the file
 
+    Attachments go to a new folder inside ``output_dir`` , named after
+    ``email_id`` and returned as ``workspace`` , so several emails can be
+    parsed at once. Remove it with ``cleanup_workspace`` when done.
+
     Args:
         email_string: ``str``
             string of email body-mime
@@ -18,6 +33,11 @@ def parse_email(email_string: str, email_id: str, output_dir: str = "tmp"):
             unique id for email
         output_dir: ``str``
             folder for attachments
+        archive_limits: ``dict``
+            keyword arguments for ``extract_zip`` , eg ``{"max_total_size": 10 ** 9}``
+        instrumentation: ``Instrumentation``
+            given the seconds spent parsing, writing attachments and
+            extracting archives
         
     Return:
         Email metadata dict: ``dict``
@@ -28,12 +48,16 @@ def parse_email(email_string: str, email_id: str, output_dir: str = "tmp"):
                 "from": bkrm.dahal@gmail.com,
                 "to": bikram.dahal@docsumo.com,
                 "date": "2019-01-01 22:00:00",
-                "subject": "Testing email"
+                "subject": "Testing email",
+                "files": ["tmp/id-k2x8/data.pdf"],
+                "workspace": "tmp/id-k2x8"
                 }
 
     """
 
+    start = time.perf_counter()
     msg = email.message_from_string(email_string)
+    parsed = time.perf_counter()
 
     # metdata
     metadata = {
@@ -43,19 +67,29 @@ def parse_email(email_string: str, email_id: str, output_dir: str = "tmp"):
         "subject": msg["Subject"],
     }
 
-    # make output dir
-    # if not os.path.exists(output_dir):
-    # if exist remove folder and make new folder
+    workspace = make_workspace(output_dir, email_id)
+    try:
+        saved = time.perf_counter()
+        written = _save_parts(msg, metadata, workspace)
+        extracted = time.perf_counter()
+        metadata["files"] = _extract_files(workspace, written, archive_limits)
+    except BaseException:
+        cleanup_workspace(workspace)
+        raise
+    if instrumentation is not None:
+        timings = {
+            "parse": parsed - start,
+            "attachments": extracted - saved,
+            "zip": time.perf_counter() - extracted,
+        }
+        instrumentation.after_parse(email_id, timings)
+    metadata["email_name"] = email_id
+    metadata["workspace"] = workspace
+    return metadata
 
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
 
-    files = glob.glob(os.path.join(output_dir, "*"))
-    try:
-        for f in files:
-            os.remove(f)
-    except:
-        print(">>>> No files")
+def _save_parts(msg, metadata: dict, workspace: str):
+    written = []
 
     # parse body and attachment
     if msg.is_multipart():
@@ -70,28 +104,140 @@ def parse_email(email_string: str, email_id: str, output_dir: str = "tmp"):
                 )  # decode
 
             elif part.get_filename():
-                filepath = os.path.join(output_dir, part.get_filename())
+                filepath = os.path.join(workspace, safe_filename(part.get_filename()))
                 with open(filepath, "wb") as f:
                     f.write(part.get_payload(decode=True))
+                written.append(filepath)
     else:
         metadata["body"] = str(msg.get_payload(decode=True))
+    return written
+
+
+def parse_email_stream(
+    source,
+    email_id: str,
+    output_dir: str = "tmp",
+    chunk_size: int = CHUNK_SIZE,
+    archive_limits: dict = None,
+    instrumentation=None,
+):
+    """
+    parse email without loading it in memory and save the file
+
+    The message is read ``chunk_size`` bytes at a time and base64 /
+    quoted-printable attachments are decoded straight to their files, so
+    memory use does not grow with the size of the email.
+
+    Args:
+        source: ``bytes`` , file object or iterable
+            body-mime as ``bytes`` / ``str`` , a binary file object or an
+            iterable of ``bytes`` chunks
+        email_id: ``str``
+            unique id for email
+        output_dir: ``str``
+            folder for the attachment workspaces
+        chunk_size: ``int``
+            bytes read at a time
+        archive_limits: ``dict``
+            keyword arguments for ``extract_zip``
+        instrumentation: ``Instrumentation``
+            given the ``parse`` and ``zip`` seconds, attachments are written
+            while parsing so their time is part of ``parse``
+
+    Return:
+        Email metadata dict, same as ``parse_email`` : ``dict``
+    """
+    workspace = make_workspace(output_dir, email_id)
+    try:
+        start = time.perf_counter()
+        parser = StreamingMimeParser(workspace, chunk_size)
+        for chunk in _read_chunks(source, chunk_size):
+            parser.feed(chunk)
+        metadata = parser.close()
+
+        extracted = time.perf_counter()
+        metadata["files"] = _extract_files(workspace, metadata["files"], archive_limits)
+    except BaseException:
+        cleanup_workspace(workspace)
+        raise
+    if instrumentation is not None:
+        timings = {
+            "parse": extracted - start,
+            "zip": time.perf_counter() - extracted,
+        }
+        instrumentation.after_parse(email_id, timings)
+    metadata["email_name"] = email_id
+    metadata["workspace"] = workspace
+    return metadata
 
-    # unzip file
-    file_paths = glob.glob(output_dir + "/*.zip")
 
-    if file_paths:
-        for f in file_paths:
-            with zipfile.ZipFile(f, "r") as zip_ref:
-                zip_ref.extractall(output_dir)
+def _read_chunks(source, chunk_size: int):
+    if isinstance(source, str):
+        source = source.encode("utf-8", "surrogateescape")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), chunk_size):
+            yield view[start : start + chunk_size].tobytes()
+        return
+    if not hasattr(source, "read"):
+        yield from source
+        return
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def make_workspace(output_dir: str, email_id: str = None):
+    """
+    Create a folder of its own for one email
+
+    Args:
+        output_dir: ``str``
+            parent folder, created if missing
+        email_id: ``str``
+            used as the folder name prefix
 
-    # all files
-    file_paths = glob.glob(output_dir + "/*")
+    Return:
+        folder path: ``str``
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if email_id:
+        prefix = re.sub(r"[^A-Za-z0-9._-]", "_", str(email_id))[:100] + "-"
+    else:
+        prefix = "email-"
+    return tempfile.mkdtemp(prefix=prefix, dir=output_dir)
+
+
+def cleanup_workspace(workspace):
+    """
+    Remove the attachments of a parsed email
+
+    Args:
+        workspace: ``dict`` or ``str``
+            metadata returned by ``parse_email`` or its ``workspace``
+    """
+    if isinstance(workspace, dict):
+        workspace = workspace["workspace"]
+    shutil.rmtree(workspace, ignore_errors=True)
+
+
+def _extract_files(workspace: str, written: list, archive_limits: dict = None):
+    # unzip file, only the allowed members and within the limits
+    file_paths = []
+    for f in written:
+        if f.endswith(".zip"):
+            file_paths += extract_zip(
+                f, workspace, allowed=allowed_file, **(archive_limits or {})
+            )
+        else:
+            file_paths.append(f)
+
+    # files produced by this parse
     tmp_file_path = []
-    for f in file_paths:
+    for f in dict.fromkeys(file_paths):
         _, ext = os.path.splitext(os.path.basename(f))
         if ext in allowed_file:
             tmp_file_path.append(f)
-
-    metadata["files"] = tmp_file_path
-    metadata["email_name"] = email_id
-    return metadata
+    return tmp_file_path
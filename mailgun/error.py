@@ -4,3 +4,15 @@ class NoAPIKey(Exception):
 
 class NoDomain(Exception):
     pass
+
+
+class ArchiveLimitExceeded(Exception):
+    pass
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class NoRecording(Exception):
+    pass
@@ -0,0 +1,246 @@
+"""Paginated access to the events API"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+MAX_PAGE_SIZE = 300
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def _put(buffer: queue.Queue, item, stop: threading.Event):
+    """Put unless the consumer has gone, ``False`` once it has"""
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def iter_pages(mailgun, filters: dict = None, page_size: int = MAX_PAGE_SIZE):
+    """
+    Yield the ``items`` of each events page, following ``paging.next``
+
+    Args:
+        mailgun: ``Mailgun``
+        filters: ``dict``
+            events API filters, eg ``{"event": "stored"}``
+        page_size: ``int``
+            events per page, at most 300
+
+    Return:
+        generator of ``list`` , a failed page raises ``requests.HTTPError``
+    """
+    params = dict(filters or {})
+    params["limit"] = min(page_size, MAX_PAGE_SIZE)
+    url = mailgun.base_url + "{}/events".format(mailgun.domain)
+    while url:
+        response = mailgun._request("GET", url, params=params)
+        # an error body has no items and would end the walk silently
+        response.raise_for_status()
+        page = response.json()
+        items = page.get("items") or []
+        if not items:
+            return
+        yield items
+        url = page.get("paging", {}).get("next")
+        # the next url carries the filters
+        params = None
+
+
+def iter_events(
+    mailgun, filters: dict = None, page_size: int = MAX_PAGE_SIZE, prefetch: int = 1
+):
+    """
+    Yield events one at a time across every page.
+
+    With ``prefetch`` above zero a background thread fetches the next pages
+    while the caller handles the current one, holding at most ``prefetch``
+    pages besides the current one in memory.
+
+    Args:
+        mailgun: ``Mailgun``
+        filters: ``dict``
+        page_size: ``int``
+        prefetch: ``int``
+            pages fetched ahead, ``0`` fetches only when a page is used up.
+
+    Return:
+        generator of event ``dict``
+    """
+    pages = iter_pages(mailgun, filters, page_size)
+    if prefetch <= 0:
+        for items in pages:
+            yield from items
+        return
+
+    buffer = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for items in pages:
+                if not _put(buffer, items, stop):
+                    return
+        except Exception as e:
+            _put(buffer, _Failure(e), stop)
+            return
+        _put(buffer, _DONE, stop)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            items = buffer.get()
+            if items is _DONE:
+                return
+            if isinstance(items, _Failure):
+                raise items.error
+            yield from items
+    finally:
+        # lets the producer exit after the page it is fetching
+        stop.set()
+
+
+def _timestamp(value):
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+def time_shards(begin, end, shard_size: float):
+    """
+    Split ``[begin, end)`` into consecutive ``(start, stop)`` epoch windows
+    """
+    begin, end = _timestamp(begin), _timestamp(end)
+    shards = []
+    while begin < end:
+        shards.append((begin, min(begin + shard_size, end)))
+        begin += shard_size
+    return shards
+
+
+def _shard_pages(mailgun, filters, start, stop, page_size, retries):
+    """
+    Pages of one shard in ascending order, each page fetch is retried with
+    exponential backoff until the shard has used ``retries`` retries
+    """
+    params = dict(filters or {})
+    params.update(
+        begin=start, end=stop, ascending="yes", limit=min(page_size, MAX_PAGE_SIZE)
+    )
+    url = mailgun.base_url + "{}/events".format(mailgun.domain)
+    failures = 0
+    while url:
+        try:
+            response = mailgun._request("GET", url, params=params)
+            response.raise_for_status()
+            page = response.json()
+        except Exception:
+            failures += 1
+            if failures > retries:
+                raise
+            time.sleep(min(0.1 * 2 ** (failures - 1), 5))
+            continue
+
+        # windows are half-open so an event on a boundary comes out once
+        items = [e for e in page.get("items") or [] if e["timestamp"] < stop]
+        if items:
+            yield items
+        if not page.get("items"):
+            return
+        url = page.get("paging", {}).get("next")
+        params = None
+
+
+def export_events(
+    mailgun,
+    begin,
+    end,
+    filters: dict = None,
+    shard_size: float = 3600,
+    concurrency: int = 4,
+    ordered: bool = True,
+    retries: int = 3,
+    page_size: int = MAX_PAGE_SIZE,
+    buffer_pages: int = 2,
+):
+    """
+    Fetch the events of a time window as concurrent time shards.
+
+    ``[begin, end)`` is split into ``shard_size`` second shards, up to
+    ``concurrency`` shards are paginated at once. With ``ordered`` events
+    come out in timestamp order, shards finished early wait in a buffer of
+    ``buffer_pages`` pages. Otherwise pages come out as soon as they arrive.
+
+    Args:
+        mailgun: ``Mailgun``
+        begin: ``float`` or ``datetime``
+            start of the window, epoch seconds
+        end: ``float`` or ``datetime``
+            end of the window, excluded
+        filters: ``dict``
+            events API filters, eg ``{"event": "delivered"}``
+        shard_size: ``float``
+            seconds per shard
+        concurrency: ``int``
+            shards fetched at once
+        ordered: ``bool``
+        retries: ``int``
+            failed page fetches retried per shard before the export fails
+        page_size: ``int``
+        buffer_pages: ``int``
+            pages buffered per shard, or per worker when unordered
+
+    Return:
+        generator of event ``dict``
+    """
+    shards = time_shards(begin, end, shard_size)
+    if not shards:
+        return
+    stop = threading.Event()
+    if ordered:
+        buffers = [queue.Queue(maxsize=buffer_pages) for _ in shards]
+    else:
+        shared = queue.Queue(maxsize=buffer_pages * concurrency)
+        buffers = [shared] * len(shards)
+
+    def run_shard(index, start, end):
+        buffer = buffers[index]
+        try:
+            for items in _shard_pages(mailgun, filters, start, end, page_size, retries):
+                if not _put(buffer, items, stop):
+                    return
+        except Exception as e:
+            _put(buffer, _Failure(e), stop)
+            return
+        _put(buffer, _DONE, stop)
+
+    executor = ThreadPoolExecutor(concurrency)
+    try:
+        # shards start in order, so the shard read next is always running
+        for index, (start, end) in enumerate(shards):
+            executor.submit(run_shard, index, start, end)
+
+        remaining = len(shards)
+        index = 0
+        while remaining:
+            items = buffers[index].get()
+            if items is _DONE:
+                remaining -= 1
+                if ordered:
+                    index += 1
+                continue
+            if isinstance(items, _Failure):
+                raise items.error
+            yield from items
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,430 @@
+"""Request hooks and latency metrics"""
+import bisect
+import re
+import threading
+from urllib.parse import unquote, urlsplit
+
+# seconds, the upper bounds of the latency histogram buckets
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+PARSE_STAGES = ("parse", "attachments", "zip")
+
+_VERSION = re.compile(r"v\d+")
+
+
+def endpoint_name(url: str, domain: str = None):
+    """
+    URL path with the domain, addresses and ids replaced by placeholders,
+    so all the calls to one endpoint share a name
+
+    Args:
+        url: ``str``
+        domain: ``str``
+            sending domain of the client
+
+    Return:
+        eg ``"{domain}/messages"`` , ``"{domain}/events/{page}"`` or
+        ``"lists/{list}/members/{address}"`` : ``str``
+    """
+    segments = urlsplit(url).path.strip("/").split("/")
+    if segments and _VERSION.fullmatch(segments[0]):
+        segments = segments[1:]
+    names = []
+    previous = None
+    for segment in segments:
+        # addresses may be percent-encoded, eg ``news%40mg.x.com``
+        address = "@" in unquote(segment)
+        if segment == domain or previous == "domains":
+            names.append("{domain}")
+        elif previous == "lists" and address:
+            names.append("{list}")
+        elif previous == "members" and address:
+            names.append("{address}")
+        elif previous == "events":
+            names.append("{page}")
+        elif previous in ("messages", "bulk"):
+            names.append("{id}")
+        else:
+            names.append(segment)
+        previous = segment
+    return "/".join(names)
+
+
+class RequestEvent:
+    """
+    One API call as the hooks see it, the same object is passed before and
+    after the call.
+
+    Args:
+        endpoint:``str``
+            path template from ``endpoint_name`` .
+        method:``str``
+        url:``str``
+        status:``int``
+            status of the last response, ``None`` before the call or when
+            it raised.
+        bytes_sent:``int``
+            request body size of the last attempt.
+        bytes_received:``int``
+            response body size, ``None`` for streamed responses without a
+            ``Content-Length`` .
+        latency:``float``
+            seconds from the first attempt to the last response, retry
+            waits included.
+        retries:``int``
+            attempts after the first one.
+        error:``Exception``
+            raised by the call.
+    """
+
+    __slots__ = (
+        "endpoint",
+        "method",
+        "url",
+        "status",
+        "bytes_sent",
+        "bytes_received",
+        "latency",
+        "retries",
+        "error",
+    )
+
+    def __init__(self, endpoint: str, method: str, url: str):
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.status = None
+        self.bytes_sent = 0
+        self.bytes_received = None
+        self.latency = None
+        self.retries = 0
+        self.error = None
+
+    def __repr__(self):
+        return "RequestEvent({} {} status={} latency={})".format(
+            self.method, self.endpoint, self.status, self.latency
+        )
+
+
+def request_size(request):
+    """Body size of a prepared request: ``int``"""
+    length = request.headers.get("Content-Length")
+    if length is not None:
+        return int(length)
+    body = request.body
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return 0
+
+
+def response_size(response, stream: bool = False):
+    """Body size of a response, ``None`` when streamed without a length"""
+    length = response.headers.get("Content-Length")
+    if length is not None:
+        return int(length)
+    if stream:
+        return None
+    return len(response.content)
+
+
+class Instrumentation:
+    """
+    Hooks called around every request of a client and after every parsed
+    email. Subclass it, or pass plain functions.
+
+    Args:
+        before:``callable``
+            called with the ``RequestEvent`` before the request is sent.
+        after:``callable``
+            called with the ``RequestEvent`` once the call is over.
+        parsed:``callable``
+            called with the email id and its ``{"parse": s, "attachments":
+            s, "zip": s}`` timings.
+
+    Example:
+
+        .. code-block:: python
+
+            def slow(event):
+                if event.latency > 1:
+                    log.warning("%s took %.1fs", event.endpoint, event.latency)
+
+            mailgun = Mailgun(instrumentation=Instrumentation(after=slow))
+    """
+
+    def __init__(self, before=None, after=None, parsed=None):
+        self._before = before
+        self._after = after
+        self._parsed = parsed
+
+    def before_request(self, event: RequestEvent):
+        if self._before is not None:
+            self._before(event)
+
+    def after_request(self, event: RequestEvent):
+        if self._after is not None:
+            self._after(event)
+
+    def after_parse(self, email_id: str, timings: dict):
+        if self._parsed is not None:
+            self._parsed(email_id, timings)
+
+
+class Histogram:
+    """
+    Counts of observations per bucket, percentiles are interpolated inside
+    the bucket they fall in.
+
+    Args:
+        buckets:``tuple``
+            sorted upper bounds, an infinite bucket is added.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float):
+        """
+        Estimated value below which ``q`` of the observations fall,
+        ``None`` without observations
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                value = lower + (upper - lower) * (rank - seen) / count
+                return min(value, self.max)
+            seen += count
+        return self.max
+
+    def cumulative(self):
+        """``(upper bound, count)`` pairs as Prometheus buckets"""
+        total = 0
+        bounds = self.buckets + (float("inf"),)
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            yield bound, total
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class _EndpointStats:
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.statuses = {}
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsCollector(Instrumentation):
+    """
+    Instrumentation keeping per endpoint latency histograms and counters,
+    and the timings of parsed emails. Recording an event is a bucket
+    lookup and a few additions under a lock.
+
+    Args:
+        buckets:``tuple``
+            latency bucket upper bounds in seconds.
+        prefix:``str``
+            name prefix of the Prometheus metrics.
+
+    Example:
+
+        .. code-block:: python
+
+            metrics = MetricsCollector()
+            mailgun = Mailgun(instrumentation=metrics)
+            ...
+            metrics.as_dict()["requests"]["POST {domain}/messages"]["latency"]["p99"]
+            open("mailgun.prom", "w").write(metrics.to_prometheus())
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix: str = "mailgun"):
+        super().__init__()
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._requests = {}
+        self._parse = {stage: Histogram(self.buckets) for stage in PARSE_STAGES}
+        self._lock = threading.Lock()
+
+    def after_request(self, event: RequestEvent):
+        key = (event.endpoint, event.method)
+        with self._lock:
+            stats = self._requests.get(key)
+            if stats is None:
+                stats = self._requests[key] = _EndpointStats(self.buckets)
+            if event.latency is not None:
+                stats.latency.observe(event.latency)
+            if event.status is not None:
+                stats.statuses[event.status] = stats.statuses.get(event.status, 0) + 1
+            if event.error is not None:
+                stats.errors += 1
+            stats.retries += event.retries
+            stats.bytes_sent += event.bytes_sent
+            stats.bytes_received += event.bytes_received or 0
+
+    def after_parse(self, email_id: str, timings: dict):
+        with self._lock:
+            for stage, seconds in timings.items():
+                histogram = self._parse.get(stage)
+                if histogram is None:
+                    histogram = self._parse[stage] = Histogram(self.buckets)
+                histogram.observe(seconds)
+
+    def reset(self):
+        """Forget everything recorded"""
+        with self._lock:
+            self._requests = {}
+            self._parse = {stage: Histogram(self.buckets) for stage in PARSE_STAGES}
+
+    def as_dict(self):
+        """
+        Return:
+            metrics: ``dict``
+
+                .. code-block:: json
+
+                    {
+                    "requests": {
+                        "POST {domain}/messages": {
+                            "count": 1200, "errors": 0, "retries": 3,
+                            "statuses": {"200": 1197, "429": 3},
+                            "bytes_sent": 2400000, "bytes_received": 96000,
+                            "latency": {"count": 1200, "sum": 210.4, "p50": 0.15,
+                                        "p95": 0.41, "p99": 0.8, "max": 1.2}
+                        }
+                    },
+                    "parse": {"parse": {...}, "attachments": {...}, "zip": {...}}
+                    }
+        """
+        with self._lock:
+            requests = {}
+            for (endpoint, method), stats in sorted(self._requests.items()):
+                requests["{} {}".format(method, endpoint)] = {
+                    "count": stats.latency.count,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "statuses": {str(s): n for s, n in sorted(stats.statuses.items())},
+                    "bytes_sent": stats.bytes_sent,
+                    "bytes_received": stats.bytes_received,
+                    "latency": stats.latency.as_dict(),
+                }
+            parse = {stage: h.as_dict() for stage, h in self._parse.items()}
+        return {"requests": requests, "parse": parse}
+
+    def to_prometheus(self):
+        """
+        Metrics in the Prometheus text exposition format
+
+        Return:
+            ``str``
+        """
+        prefix = self.prefix
+        lines = []
+
+        def header(name, kind, text):
+            lines.append("# HELP {}_{} {}".format(prefix, name, text))
+            lines.append("# TYPE {}_{} {}".format(prefix, name, kind))
+
+        def histogram(name, labels, values):
+            for bound, count in values.cumulative():
+                lines.append(
+                    '{}_{}_bucket{{{},le="{}"}} {}'.format(
+                        prefix, name, labels, _number(bound), count
+                    )
+                )
+            lines.append(
+                "{}_{}_sum{{{}}} {}".format(prefix, name, labels, _number(values.sum))
+            )
+            lines.append(
+                "{}_{}_count{{{}}} {}".format(prefix, name, labels, values.count)
+            )
+
+        with self._lock:
+            requests = sorted(self._requests.items())
+
+            header("request_duration_seconds", "histogram", "API call latency")
+            for (endpoint, method), stats in requests:
+                labels = 'endpoint="{}",method="{}"'.format(_label(endpoint), method)
+                histogram("request_duration_seconds", labels, stats.latency)
+
+            header("requests_total", "counter", "API calls by response status")
+            for (endpoint, method), stats in requests:
+                labels = 'endpoint="{}",method="{}"'.format(_label(endpoint), method)
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(
+                        '{}_requests_total{{{},status="{}"}} {}'.format(
+                            prefix, labels, status, count
+                        )
+                    )
+
+            counters = (
+                ("request_errors_total", "errors", "API calls that raised"),
+                ("request_retries_total", "retries", "attempts after the first"),
+                ("request_sent_bytes_total", "bytes_sent", "request body bytes"),
+                ("request_received_bytes_total", "bytes_received", "response bytes"),
+            )
+            for name, attribute, text in counters:
+                header(name, "counter", text)
+                for (endpoint, method), stats in requests:
+                    labels = 'endpoint="{}",method="{}"'.format(
+                        _label(endpoint), method
+                    )
+                    lines.append(
+                        "{}_{}{{{}}} {}".format(
+                            prefix, name, labels, getattr(stats, attribute)
+                        )
+                    )
+
+            header("parse_duration_seconds", "histogram", "email parsing time by stage")
+            for stage, values in self._parse.items():
+                histogram("parse_duration_seconds", 'stage="{}"'.format(stage), values)
+        return "\n".join(lines) + "\n"
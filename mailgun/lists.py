@@ -0,0 +1,283 @@
+"""Bulk mailing list membership"""
+import hashlib
+import json
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .utils import chunked
+
+# members accepted by one ``members.json`` call
+MAX_MEMBERS_PER_CALL = 1000
+# members per page of ``members/pages``
+MAX_MEMBERS_PAGE = 1000
+
+ChunkResult = namedtuple(
+    "ChunkResult", ["index", "start", "count", "error", "response"]
+)
+ChunkResult.__doc__ = """
+Outcome of one uploaded chunk: members ``start`` to ``start + count`` of
+the input, ``error`` (API message or exception) on failure.
+"""
+
+
+def member_payload(member):
+    """
+    One member as the ``members.json`` endpoint takes it
+
+    Args:
+        member: ``str`` or ``dict``
+            address, or ``address`` , ``name`` , ``vars`` and ``subscribed``
+
+    Return:
+        ``dict``
+    """
+    if isinstance(member, str):
+        return {"address": member}
+    payload = dict(member)
+    if isinstance(payload.get("vars"), str):
+        payload["vars"] = json.loads(payload["vars"])
+    return payload
+
+
+def list_url(mailgun, list_address: str):
+    """URL of a mailing list"""
+    return mailgun.base_url + "lists/{}".format(list_address)
+
+
+def upload_members(mailgun, list_address: str, members: list, upsert: bool = True):
+    """
+    Add up to ``MAX_MEMBERS_PER_CALL`` members in one call
+
+    Return:
+        ``requests.Response``
+    """
+    data = {
+        "members": json.dumps([member_payload(m) for m in members]),
+        "upsert": "yes" if upsert else "no",
+    }
+    # an upsert gives the same list when sent twice
+    return mailgun._request(
+        "POST",
+        list_url(mailgun, list_address) + "/members.json",
+        idempotent=upsert,
+        data=data,
+    )
+
+
+def _upload_chunk(mailgun, list_address, index, start, chunk, upsert):
+    try:
+        response = upload_members(mailgun, list_address, chunk, upsert)
+        payload = response.json()
+    except Exception as e:
+        return ChunkResult(index, start, len(chunk), e, None)
+    if not response.ok:
+        return ChunkResult(index, start, len(chunk), payload.get("message"), payload)
+    return ChunkResult(index, start, len(chunk), None, payload)
+
+
+def add_members(
+    mailgun,
+    list_address: str,
+    members,
+    upsert: bool = True,
+    workers: int = 4,
+    chunk_size: int = MAX_MEMBERS_PER_CALL,
+):
+    """
+    Upload members in chunks of ``chunk_size`` , several chunks at once
+
+    The input is read lazily, at most ``2 * workers`` chunks are held in
+    memory.
+
+    Args:
+        mailgun: ``Mailgun``
+        list_address: ``str``
+            eg ``"newsletter@mg.docsumo.com"``
+        members: ``iterable``
+            of addresses or member ``dict``
+        upsert: ``bool``
+            update members already on the list instead of skipping them
+        workers: ``int``
+            chunks uploaded at once
+        chunk_size: ``int``
+            members per call, at most 1000
+
+    Return:
+        generator of ``ChunkResult`` in completion order
+    """
+    if not 0 < chunk_size <= MAX_MEMBERS_PER_CALL:
+        raise ValueError(
+            "chunk_size must be between 1 and {}".format(MAX_MEMBERS_PER_CALL)
+        )
+
+    pending = set()
+    start = 0
+    with ThreadPoolExecutor(workers) as pool:
+        for index, chunk in enumerate(chunked(members, chunk_size)):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(
+                pool.submit(
+                    _upload_chunk, mailgun, list_address, index, start, chunk, upsert
+                )
+            )
+            start += len(chunk)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def iter_members(mailgun, list_address: str, page_size: int = MAX_MEMBERS_PAGE):
+    """
+    Yield the members of a list, following ``paging.next``
+
+    Args:
+        mailgun: ``Mailgun``
+        list_address: ``str``
+        page_size: ``int``
+            members per page, at most 1000
+
+    Return:
+        generator of member ``dict``
+    """
+    url = list_url(mailgun, list_address) + "/members/pages"
+    params = {"limit": min(page_size, MAX_MEMBERS_PAGE)}
+    while url:
+        response = mailgun._request("GET", url, params=params)
+        response.raise_for_status()
+        page = response.json()
+        items = page.get("items") or []
+        if not items:
+            return
+        yield from items
+        url = page.get("paging", {}).get("next")
+        # the next url carries the limit
+        params = None
+
+
+def _digest(value):
+    data = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest()
+
+
+def _fingerprint(member: dict):
+    """``(address, name digest, vars digest, subscribed)`` of a member"""
+    subscribed = member.get("subscribed", True)
+    if isinstance(subscribed, str):
+        subscribed = subscribed.lower() in ("yes", "true", "1")
+    return (
+        member["address"],
+        _digest(member.get("name") or ""),
+        _digest(member.get("vars") or {}),
+        bool(subscribed),
+    )
+
+
+def _changed(remote: tuple, member: dict):
+    """Whether the fields given in ``member`` differ from the remote ones"""
+    wanted = _fingerprint(member)
+    for position, field in ((1, "name"), (2, "vars"), (3, "subscribed")):
+        if field in member and wanted[position] != remote[position]:
+            return True
+    return False
+
+
+def _delete_member(mailgun, list_address: str, address: str):
+    url = list_url(mailgun, list_address) + "/members/{}".format(address)
+    try:
+        response = mailgun._request("DELETE", url)
+    except Exception as e:
+        return address, e
+    if not response.ok:
+        return address, response.json().get("message")
+    return address, None
+
+
+def sync_list(
+    mailgun,
+    list_address: str,
+    desired_members,
+    delete: bool = True,
+    workers: int = 4,
+    dry_run: bool = False,
+    page_size: int = MAX_MEMBERS_PAGE,
+):
+    """
+    Make a mailing list match ``desired_members`` with the fewest changes
+
+    The remote members are read page by page and kept as small digests of
+    their ``name`` , ``vars`` and ``subscribed`` . New members and members
+    with a changed field are upserted through ``members.json`` , remote
+    members missing from ``desired_members`` are deleted concurrently.
+    Only the fields a desired member has are compared, so plain addresses
+    never update a member.
+
+    Args:
+        mailgun: ``Mailgun``
+        list_address: ``str``
+        desired_members: ``iterable``
+            addresses or member ``dict`` , as ``add_members`` takes them
+        delete: ``bool``
+            remove the members that are not desired
+        workers: ``int``
+            calls made at once
+        dry_run: ``bool``
+            only work out the changes
+        page_size: ``int``
+
+    Return:
+        summary: ``dict``
+
+            .. code-block:: json
+
+                {
+                "added": ["new@docsumo.com"],
+                "updated": ["moved@docsumo.com"],
+                "deleted": ["gone@docsumo.com"],
+                "unchanged": 99997,
+                "errors": []
+                }
+    """
+    remote = {}
+    for member in iter_members(mailgun, list_address, page_size):
+        remote[member["address"].lower()] = _fingerprint(member)
+
+    changes = []
+    summary = {"added": [], "updated": [], "deleted": [], "unchanged": 0, "errors": []}
+    seen = set()
+    for member in desired_members:
+        member = member_payload(member)
+        key = member["address"].lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        current = remote.pop(key, None)
+        if current is None:
+            summary["added"].append(member["address"])
+        elif _changed(current, member):
+            summary["updated"].append(member["address"])
+        else:
+            summary["unchanged"] += 1
+            continue
+        changes.append(member)
+    if delete:
+        summary["deleted"] = [fingerprint[0] for fingerprint in remote.values()]
+    if dry_run:
+        return summary
+
+    for chunk in add_members(mailgun, list_address, changes, True, workers):
+        if chunk.error is not None:
+            members = changes[chunk.start : chunk.start + chunk.count]
+            summary["errors"].extend((m["address"], chunk.error) for m in members)
+    with ThreadPoolExecutor(workers) as pool:
+        for address, error in pool.map(
+            lambda address: _delete_member(mailgun, list_address, address),
+            summary["deleted"],
+        ):
+            if error is not None:
+                summary["errors"].append((address, error))
+    return summary
@@ -1,11 +1,156 @@
 """Mailgun class to send email and get extracted data"""
+import copy
 import os
 import json
+import time
+from email.utils import parseaddr
 
 import requests
 
-from .email_parsing import parse_email
+from .cache import ValidationCache
+from .concurrency import AdaptiveLimiter
+from .email_parsing import cleanup_workspace, parse_email, parse_email_stream
+from .events import MAX_PAGE_SIZE, export_events, iter_events
 from .error import NoAPIKey, NoDomain
+from .instrumentation import (
+    Instrumentation,
+    RequestEvent,
+    endpoint_name,
+    request_size,
+    response_size,
+)
+from .lists import (
+    MAX_MEMBERS_PAGE,
+    MAX_MEMBERS_PER_CALL,
+    add_members,
+    iter_members,
+    sync_list,
+)
+from .multipart import MultipartEncoder
+from .parallel import parse_many
+from .retry import CircuitBreaker, RetryPolicy, send_with_retry
+from .storage import CHUNK_SIZE, iter_mime
+from .transport import HTTPTransport, region_url
+from .utils import chunked
+from .validation import (
+    cancel_bulk_validation,
+    create_bulk_validation,
+    download_bulk_validation,
+    get_bulk_validation,
+    validate_many,
+    wait_bulk_validation,
+)
+
+MAX_BATCH_SIZE = 1000
+
+
+def resolve_credentials(apikey: str = None, domain: str = None):
+    """Api key and domain from arguments or ``MAILGUN_*`` env vars"""
+    if not apikey:
+        apikey = os.getenv("MAILGUN_API_KEY", None)
+        if not apikey:
+            raise NoAPIKey("Either pass apikey or set env `MAILGUN_API_KEY`")
+
+    if not domain:
+        domain = os.getenv("MAILGUN_DOMAIN", None)
+        if not domain:
+            raise NoDomain("Either pass domain or set env `MAILGUN_DOMAIN`")
+    return apikey, domain
+
+
+def message_data(
+    sender_email: str,
+    to: str,
+    subject: str,
+    html_body: str = None,
+    text_body: str = None,
+    extra_data: dict = None,
+):
+    """Form fields of a ``messages`` request"""
+    if text_body:
+        body = {"text": text_body}
+    else:
+        body = {}
+
+    if html_body:
+        body.update({"html": html_body})
+
+    data = {
+        "from": sender_email or "Rushabh Sheth, Docsumo <rushabh.sheth@docsumo.com>",
+        "to": to,
+        "subject": subject,
+    }
+    data.update(body)
+
+    if extra_data:
+        data.update(extra_data)
+    return data
+
+
+def template_data(
+    sender_email: str,
+    to: str,
+    subject: str,
+    template_name: str,
+    data: dict,
+    extra_data: dict = None,
+):
+    """Form fields of a templated ``messages`` request"""
+    payload = {
+        "from": sender_email or "Rushabh Sheth, Docsumo <rushabh.sheth@docsumo.com>",
+        "to": to,
+        "subject": subject,
+        "template": template_name,
+        "h:X-Mailgun-Variables": json.dumps(data),
+    }
+
+    if extra_data:
+        payload.update(extra_data)
+    return payload
+
+
+def batch_data(base: dict, chunk: list):
+    """
+    Form fields of one batch: ``to`` addresses and their ``recipient-variables``
+    """
+    recipient_variables = {}
+    for address, variables in chunk:
+        recipient_variables[parseaddr(address)[1] or address] = variables or {}
+    data = dict(base)
+    data["to"] = [address for address, _ in chunk]
+    data["recipient-variables"] = json.dumps(recipient_variables)
+    return data
+
+
+def batch_result(index: int, chunk: list, status: int = None, payload=None, error=None):
+    """
+    Outcome of one batch, with its ``(address, variables)`` pairs under
+    ``failed`` when it was not queued so they can be sent again
+    """
+    ok = error is None and status is not None and 200 <= status < 300
+    if not ok and error is None:
+        error = (payload or {}).get("message") or "HTTP {}".format(status)
+    result = {
+        "batch": index,
+        "recipients": len(chunk),
+        "status": status,
+        "ok": ok,
+        "error": error,
+        "response": payload,
+    }
+    if not ok:
+        result["failed"] = list(chunk)
+    return result
+
+
+def is_valid_risk(data: dict):
+    """Collapse a v4 validation response to ``True`` / ``False``"""
+    risk = data.get("risk", "empty")
+
+    if risk in ["empty", "low", "medium"]:
+        return True
+    else:
+        return False
 
 
 class Mailgun:
@@ -19,30 +164,193 @@ class Mailgun:
             domain to use for this class. You can also save env var as ``MAILGUN_DOMAIN`` .
         version:``str``
             Maingun API version.
+        pool_connections:``int``
+            number of per-host connection pools to keep.
+        pool_maxsize:``int``
+            maximum number of kept-alive connections per host.
+        pool_block:``bool``
+            block when every connection of a host is busy instead of opening
+            a throwaway connection.
+        keep_alive:``bool``
+            reuse connections between calls. Set ``False`` to close the
+            connection after every request.
+        timeout:``float``
+            default timeout in seconds for every request.
+        validation_cache:``ValidationCache``
+            cache of address validation results, ``None`` to validate on
+            every call.
+        retry:``RetryPolicy``
+            retries of failed requests, ``None`` to send every request once.
+        circuit_breaker:``CircuitBreaker``
+            fail fast while the API keeps failing.
+        concurrency_limiter:``AdaptiveLimiter``
+            limit on requests in flight that adapts to 429s and latency,
+            share it between the threads sending through this client.
+        instrumentation:``Instrumentation``
+            hooks called around every request and after parsed emails,
+            eg a ``MetricsCollector`` .
+        region:``str``
+            ``"us"`` or ``"eu"`` , the API the domain was created in.
+        api_url:``str``
+            API root overriding ``region`` , eg a local proxy.
+        transport:``HTTPTransport``
+            carries every request, eg an ``InMemoryTransport`` or a
+            ``RecordReplayTransport`` . The pool arguments only apply to the
+            default ``HTTPTransport`` .
+
+    The client owns its transport, a pooled HTTP session by default, call
+    ``close`` when done or use it as a context manager.
 
     Returns:
         Mailgun class object.            
     """
 
-    def __init__(self, apikey: str = None, domain: str = None, version: str = "v3"):
+    def __init__(
+        self,
+        apikey: str = None,
+        domain: str = None,
+        version: str = "v3",
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        timeout: float = None,
+        validation_cache: ValidationCache = None,
+        retry: RetryPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+        concurrency_limiter: AdaptiveLimiter = None,
+        instrumentation: Instrumentation = None,
+        region: str = "us",
+        api_url: str = None,
+        transport=None,
+    ):
 
-        if apikey:
-            self.apikey = apikey
+        self.apikey, self.domain = resolve_credentials(apikey, domain)
+        self.version = version
+        self.api_url = (api_url or region_url(region)).rstrip("/")
+        self.base_url = "{}/{}/".format(self.api_url, self.version)
+        self.validate_url = "{}/v4/address/validate".format(self.api_url)
+        self.auth = ("api", self.apikey)
+        self.timeout = timeout
+        self.validation_cache = validation_cache
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.concurrency_limiter = concurrency_limiter
+        self.instrumentation = instrumentation
+        if transport is None:
+            transport = HTTPTransport(
+                pool_connections, pool_maxsize, pool_block, keep_alive
+            )
+        self.transport = transport
+
+    @property
+    def session(self):
+        """``requests.Session`` of an HTTP transport, ``None`` for others"""
+        return getattr(self.transport, "session", None)
+
+    def _request(self, method: str, url: str, idempotent: bool = None, **kwargs):
+        """
+        Send a request through the pooled session, retried as ``retry``
+        allows, ``idempotent`` marks a call safe to send twice
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("auth", self.auth)
+        body = kwargs.get("data")
+        limiter = self.concurrency_limiter
+        instrumentation = self.instrumentation
+        attempts = 0
+
+        def send():
+            nonlocal attempts
+            attempts += 1
+            if limiter is None:
+                return self.transport.request(method, url, **kwargs)
+            limiter.acquire()
+            start = time.monotonic()
+            try:
+                response = self.transport.request(method, url, **kwargs)
+            except Exception:
+                limiter.release(time.monotonic() - start, error=True)
+                raise
+            limiter.release(time.monotonic() - start, response.status_code)
+            return response
+
+        def call():
+            return send_with_retry(
+                send,
+                method,
+                self.retry,
+                self.circuit_breaker,
+                idempotent,
+                getattr(body, "rewind", None),
+            )
+
+        if instrumentation is None:
+            return call()
+        event = RequestEvent(endpoint_name(url, self.domain), method, url)
+        instrumentation.before_request(event)
+        start = time.monotonic()
+        try:
+            response = call()
+        except Exception as e:
+            event.error = e
+            raise
         else:
-            self.apikey = os.getenv("MAILGUN_API_KEY", None)
-            if not self.apikey:
-                raise NoAPIKey("Either pass apikey or set env `MAILGUN_API_KEY`")
+            event.status = response.status_code
+            event.bytes_sent = request_size(response.request)
+            event.bytes_received = response_size(response, kwargs.get("stream", False))
+            return response
+        finally:
+            event.latency = time.monotonic() - start
+            event.retries = max(attempts - 1, 0)
+            instrumentation.after_request(event)
+
+    def options(self, **options):
+        """
+        Copy of the client with other settings for some calls, sharing its
+        connections
 
-        if domain:
-            self.domain = domain
-        else:
-            self.domain = os.getenv("MAILGUN_DOMAIN", None)
-            if not self.domain:
-                raise NoDomain("Either pass domain or set env `MAILGUN_DOMAIN`")
+        Args:
+            options: ``dict``
+                ``retry`` , ``circuit_breaker`` , ``concurrency_limiter`` ,
+                ``instrumentation`` , ``timeout`` or ``validation_cache``
 
-        self.version = version
-        self.base_url = "https://api.mailgun.net/{}/".format(self.version)
-        self.auth = ("api", self.apikey)
+        Return:
+            ``Mailgun``
+
+        Example:
+
+            .. code-block:: python
+
+                mailgun.options(retry=None, timeout=5).get_logs()
+        """
+        allowed = {
+            "retry",
+            "circuit_breaker",
+            "concurrency_limiter",
+            "instrumentation",
+            "timeout",
+            "validation_cache",
+        }
+        unknown = set(options) - allowed
+        if unknown:
+            raise TypeError("Unknown options: {}".format(", ".join(sorted(unknown))))
+        client = copy.copy(self)
+        for name, value in options.items():
+            setattr(client, name, value)
+        return client
+
+    def close(self):
+        """
+        Close the pooled connections
+        """
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def send_message(
         self,
@@ -66,7 +374,9 @@ class Mailgun:
             html_body: ``str``
             text_body: ``str``
             files: ``list``
-                list of files
+                list of files, each a path, ``bytes`` / ``memoryview`` , a
+                binary file object or a ``(filename, content)`` tuple, or an
+                ``AttachmentBundle`` reused across sends
             extra_data: ``dict``
                 extra data for tagging and tracking
 
@@ -92,40 +402,25 @@ class Mailgun:
                 files=["./data.pdf])
 
         """
-        if text_body:
-            body = {"text": text_body}
-        else:
-            body = {}
-
-        if html_body:
-            body.update({"html": html_body})
-
-        data = {
-            "from": sender_email
-            or "Rushabh Sheth, Docsumo <rushabh.sheth@docsumo.com>",
-            "to": to,
-            "subject": subject,
-        }
-        data.update(body)
+        data = message_data(sender_email, to, subject, html_body, text_body, extra_data)
+        return self._post_message(data, files).json()
 
-        if extra_data:
-            data.update(extra_data)
+    def _post_message(self, data: dict, files: list = None):
+        """
+        POST the form fields of a message, returns the ``requests.Response``
+        """
+        url = self.base_url + "{}/messages".format(self.domain)
 
-        # add files
+        # add files, streamed from disk or memory while the request is sent
         if files:
-            attachment = []
-            for f in files:
-                filename = os.path.basename(f)
-                with open(f, "rb") as f:
-                    object_buffer = f.read()
-                attachment.append(("attachment", (filename, object_buffer)))
-            url = self.base_url + "{}/messages".format(self.domain)
-            response = requests.post(url, auth=self.auth, data=data, files=attachment)
-
-        else:
-            url = self.base_url + "{}/messages".format(self.domain)
-            response = requests.post(url, auth=self.auth, data=data)
-        return response.json()
+            body = MultipartEncoder(data, [("attachment", f) for f in files])
+            try:
+                return self._request(
+                    "POST", url, data=body, headers={"Content-Type": body.content_type}
+                )
+            finally:
+                body.close()
+        return self._request("POST", url, data=data)
 
     def send_message_template(
         self,
@@ -173,21 +468,94 @@ class Mailgun:
                 {"company_name": "docsumo", "first_name": "bikram"})
 
         """
-        payload = {
-            "from": sender_email
-            or "Rushabh Sheth, Docsumo <rushabh.sheth@docsumo.com>",
-            "to": to,
-            "subject": subject,
-            "template": template_name,
-            "h:X-Mailgun-Variables": json.dumps(data),
-        }
+        payload = template_data(
+            sender_email, to, subject, template_name, data, extra_data
+        )
+        return self._post_message(payload).json()
+
+    def send_batch(
+        self,
+        sender_email: str,
+        recipients,
+        subject: str,
+        html_body: str = None,
+        text_body: str = None,
+        template_name: str = None,
+        data: dict = None,
+        extra_data: dict = None,
+        batch_size: int = MAX_BATCH_SIZE,
+    ):
+        """
+        Send a personalized email to many recipients with batch sending.
+
+        ``recipients`` is consumed lazily and split into batches of
+        ``batch_size`` (at most 1000, the Mailgun limit), one request per
+        batch. Use ``%recipient.<key>%`` in the body or template to insert
+        the recipient variables.
+
+        Args:
+            sender_email: ``str``
+            recipients: ``iterable``
+                ``(address, variables)`` pairs, ``variables`` is a ``dict``
+            subject: ``str``
+            html_body: ``str``
+            text_body: ``str``
+            template_name: ``str``
+                send a stored template instead of ``html_body`` / ``text_body``
+            data: ``dict``
+                template data shared by every recipient
+            extra_data: ``dict``
+                extra data for tagging and tracking
+            batch_size: ``int``
+
+        Return:
+            Result per batch: ``list``
 
-        if extra_data:
-            payload.update(extra_data)
+                .. code-block:: json
+
+                    [{
+                    'batch': 0,
+                    'recipients': 1000,
+                    'status': 200,
+                    'ok': True,
+                    'error': None,
+                    'response': {'id': '<...@mg.docsumo.com>', 'message': 'Queued. Thank you.'}
+                    }]
+
+                A batch that failed, with an API error or an exception, has
+                ``ok`` ``False`` , the ``error`` and its ``(address,
+                variables)`` pairs under ``failed`` , the next batches are
+                still sent.
+        """
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(
+                "batch_size must be between 1 and {}".format(MAX_BATCH_SIZE)
+            )
+
+        if template_name:
+            base = template_data(
+                sender_email, None, subject, template_name, data or {}, extra_data
+            )
+        else:
+            base = message_data(
+                sender_email, None, subject, html_body, text_body, extra_data
+            )
 
         url = self.base_url + "{}/messages".format(self.domain)
-        response = requests.post(url, auth=self.auth, data=payload)
-        return response.json()
+        results = []
+        for index, chunk in enumerate(chunked(recipients, batch_size)):
+            # a failed batch must not hide the batches already queued
+            try:
+                response = self._request("POST", url, data=batch_data(base, chunk))
+            except Exception as e:
+                results.append(batch_result(index, chunk, error=e))
+                continue
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = None
+            results.append(batch_result(index, chunk, response.status_code, payload))
+        return results
 
     def get_logs(self, params: dict = {"event": "stored"}):
         """
@@ -202,9 +570,89 @@ class Mailgun:
 
         """
         url = self.base_url + "{}/events".format(self.domain)
-        response = requests.get(url, auth=self.auth, params=params)
+        response = self._request("GET", url, params=params)
         return response.json()
 
+    def iter_events(
+        self, filters: dict = None, page_size: int = MAX_PAGE_SIZE, prefetch: int = 1
+    ):
+        """
+        Iterate every event matching the filters, page after page
+
+        Args:
+            filters: ``dict``
+                filter for logs, eg ``{"event": "stored"}``
+            page_size: ``int``
+                events per request, at most 300
+            prefetch: ``int``
+                pages fetched in the background ahead of the caller
+
+        Return:
+            generator of event ``dict``
+
+        Example:
+
+            .. code-block:: python
+
+                for event in mailgun.iter_events({"event": "stored"}):
+                    print(event["storage"]["url"])
+        """
+        return iter_events(self, filters, page_size, prefetch)
+
+    def export_events(
+        self,
+        begin,
+        end,
+        filters: dict = None,
+        shard_size: float = 3600,
+        concurrency: int = 4,
+        ordered: bool = True,
+        retries: int = 3,
+        page_size: int = MAX_PAGE_SIZE,
+    ):
+        """
+        Export the events of a time window with parallel time shards
+
+        Args:
+            begin: ``float`` or ``datetime``
+                start of the window, epoch seconds
+            end: ``float`` or ``datetime``
+                end of the window, excluded
+            filters: ``dict``
+                filter for logs, eg ``{"event": "delivered"}``
+            shard_size: ``float``
+                seconds per shard
+            concurrency: ``int``
+                shards fetched at once
+            ordered: ``bool``
+                yield in timestamp order, or as fast as pages arrive
+            retries: ``int``
+                failed page fetches retried per shard
+            page_size: ``int``
+
+        Return:
+            generator of event ``dict``
+
+        Example:
+
+            .. code-block:: python
+
+                events = mailgun.export_events(
+                    time.time() - 30 * 86400, time.time(), {"event": "delivered"},
+                    shard_size=6 * 3600, concurrency=8, ordered=False)
+        """
+        return export_events(
+            self,
+            begin,
+            end,
+            filters,
+            shard_size=shard_size,
+            concurrency=concurrency,
+            ordered=ordered,
+            retries=retries,
+            page_size=page_size,
+        )
+
     def mailing_list_create(self, list_name: str, description: str):
         """
         Create new mailing list
@@ -218,9 +666,9 @@ class Mailgun:
 
         """
         url = self.base_url + "lists"
-        response = requests.post(
+        response = self._request(
+            "POST",
             url,
-            auth=self.auth,
             data={
                 "address": "{}@{}".format(list_name, self.domain),
                 "description": description,
@@ -240,7 +688,7 @@ class Mailgun:
 
         """
         url = self.base_url + "lists/{}@{}".format(list_name, self.domain)
-        response = requests.delete(url, auth=self.auth)
+        response = self._request("DELETE", url)
         return response.json()
 
     def mailing_list_add_email(self, list_name: str, data: dict):
@@ -265,9 +713,84 @@ class Mailgun:
             Rsponses from API: ``dict``
         """
         url = self.base_url + "lists/{}@{}/members".format(list_name, self.domain)
-        response = requests.post(url, auth=self.auth, data=data)
+        response = self._request("POST", url, data=data)
         return response.json()
 
+    def mailing_list_add_members(
+        self,
+        list_name: str,
+        members,
+        upsert: bool = True,
+        workers: int = 4,
+        chunk_size: int = MAX_MEMBERS_PER_CALL,
+    ):
+        """
+        Add many users to mailing list, up to 1000 per call with several
+        calls at once
+
+        Args:
+            list_name: ``str``
+            members: ``iterable``
+                emails, or dicts of user data like ``mailing_list_add_email``
+            upsert: ``bool``
+                update users already on the list
+            workers: ``int``
+                calls made at once
+            chunk_size: ``int``
+                users per call
+
+        Return:
+            generator of ``ChunkResult`` ( ``index`` , ``start`` ,
+            ``count`` , ``error`` , ``response`` ) as each chunk is done
+        """
+        list_address = "{}@{}".format(list_name, self.domain)
+        return add_members(self, list_address, members, upsert, workers, chunk_size)
+
+    def mailing_list_members(self, list_name: str, page_size: int = MAX_MEMBERS_PAGE):
+        """
+        Iterate over the users of mailing list, page by page
+
+        Args:
+            list_name: ``str``
+            page_size: ``int``
+                users per call, at most 1000
+
+        Return:
+            generator of user ``dict``
+        """
+        list_address = "{}@{}".format(list_name, self.domain)
+        return iter_members(self, list_address, page_size)
+
+    def sync_list(
+        self,
+        list_name: str,
+        desired_members,
+        delete: bool = True,
+        workers: int = 4,
+        dry_run: bool = False,
+    ):
+        """
+        Make mailing list match ``desired_members`` , sending only the
+        users that are new, changed or gone
+
+        Args:
+            list_name: ``str``
+            desired_members: ``iterable``
+                emails, or dicts of user data like ``mailing_list_add_email``
+            delete: ``bool``
+                remove users that are not in ``desired_members``
+            workers: ``int``
+                calls made at once
+            dry_run: ``bool``
+                only report the changes
+
+        Return:
+            ``added`` , ``updated`` and ``deleted`` emails, ``unchanged``
+            count and ``errors`` : ``dict``
+        """
+        list_address = "{}@{}".format(list_name, self.domain)
+        return sync_list(self, list_address, desired_members, delete, workers, dry_run)
+
     def mailing_list_delete_email(self, list_name: str, email: str):
 
         """
@@ -284,7 +807,7 @@ class Mailgun:
         url = self.base_url + "lists/{}@{}/members/{}".format(
             list_name, self.domain, email
         )
-        response = requests.delete(url, auth=self.auth)
+        response = self._request("DELETE", url)
         return response.json()
 
     def mailing_list_update_email(self, list_name: str, email: str, data: dict):
@@ -311,7 +834,7 @@ class Mailgun:
         url = self.base_url + "lists/{}@{}/members/{}".format(
             list_name, self.domain, email
         )
-        response = requests.put(url, auth=self.auth, data=data)
+        response = self._request("PUT", url, data=data)
         return response.json()
 
     def validated_email(self, email: str):
@@ -326,20 +849,137 @@ class Mailgun:
 
         """
 
-        response = requests.get(
-            "https://api.mailgun.net/v4/address/validate",
-            auth=self.auth,
-            params={"address": email},
-        )
-
         # if validate
+        return is_valid_risk(self.validate_address(email))
+
+    def validate_address(self, email: str, raise_errors: bool = False):
+        """
+        Validate the Email, answering from ``validation_cache`` when it has
+        a fresh result
+
+        Args:
+            email: ``str``
+            raise_errors: ``bool``
+                raise ``requests.HTTPError`` , with the status and body, when
+                the API answers with an error instead of returning its body
+
+        Return:
+            Response from API: ``dict``
+
+                .. code-block:: json
+
+                    {
+                    "address": "bkrm.dahal@gmail.com",
+                    "result": "deliverable",
+                    "risk": "low"
+                    }
+        """
+        cache = self.validation_cache
+        if cache is not None:
+            data = cache.get(email)
+            if data is not None:
+                return data
+
+        response = self._request("GET", self.validate_url, params={"address": email})
+        if raise_errors and not response.ok:
+            raise requests.HTTPError(
+                "{} {}".format(response.status_code, response.text), response=response
+            )
         data = response.json()
-        risk = data.get("risk", "empty")
+        # failed calls are not validation results
+        if cache is not None and response.ok:
+            cache.set(email, data, is_valid_risk(data))
+        return data
 
-        if risk in ["empty", "low", "medium"]:
-            return True
-        else:
-            return False
+    def validate_many(
+        self,
+        addresses,
+        workers: int = 8,
+        rate: float = None,
+        ordered: bool = True,
+        check_locally: bool = True,
+    ):
+        """
+        Validate many Emails concurrently, each distinct address once
+
+        Args:
+            addresses: ``iterable``
+            workers: ``int``
+                threads calling the API
+            rate: ``float``
+                calls per second, ``None`` for no limit
+            ordered: ``bool``
+                yield in input order, otherwise as each address is done
+            check_locally: ``bool``
+                answer addresses with a bad syntax or reserved domain
+                without calling the API
+
+        Return:
+            generator of ``ValidationResult`` ( ``index`` , ``address`` ,
+            ``payload`` , ``error`` )
+        """
+        return validate_many(
+            self, addresses, workers, rate, ordered, check_locally=check_locally
+        )
+
+    def create_bulk_validation(self, list_id: str, addresses):
+        """
+        Start a bulk validation job, for lists too large for ``validate_many``
+
+        Args:
+            list_id: ``str``
+                name of the job
+            addresses: ``iterable``
+
+        Return:
+            Response from API: ``dict``
+        """
+        return create_bulk_validation(self, list_id, addresses)
+
+    def get_bulk_validation(self, list_id: str):
+        """
+        Status of a bulk validation job
+
+        Return:
+            Response from API: ``dict``
+        """
+        return get_bulk_validation(self, list_id)
+
+    def cancel_bulk_validation(self, list_id: str):
+        """
+        Cancel a bulk validation job
+
+        Return:
+            Response from API: ``dict``
+        """
+        return cancel_bulk_validation(self, list_id)
+
+    def wait_bulk_validation(
+        self, list_id: str, interval: float = 10, timeout: float = None
+    ):
+        """
+        Wait for a bulk validation job to finish
+
+        Return:
+            last job status, with ``download_url`` when done: ``dict``
+        """
+        return wait_bulk_validation(self, list_id, interval, timeout)
+
+    def download_bulk_validation(self, status: dict, destination, format: str = "csv"):
+        """
+        Save the results of a finished bulk validation job
+
+        Args:
+            status: ``dict``
+                returned by ``wait_bulk_validation``
+            destination: ``str`` or file object
+            format: ``str``
+                ``"csv"`` or ``"json"``
+
+        Return:
+            bytes written: ``int``
+        """
+        return download_bulk_validation(self, status, destination, format)
 
     def get_message_mime(self, url: str):
         """
@@ -355,9 +995,74 @@ class Mailgun:
         headers = {"Accept": "message/rfc2822"}
 
         # let's make a request to the API
-        r = requests.get(url, auth=self.auth, headers=headers)
+        r = self._request("GET", url, headers=headers)
         return r.json()
 
+    def iter_message_mime(self, url: str, chunk_size: int = CHUNK_SIZE):
+        """
+        download email mime in chunks, without holding the message in memory
+
+        Args:
+            url: ``str``
+                message storage url
+            chunk_size: ``int``
+
+        Return:
+            generator of raw body-mime ``bytes``
+        """
+        headers = {"Accept": "message/rfc2822"}
+        with self._request("GET", url, headers=headers, stream=True) as r:
+            r.raise_for_status()
+            yield from iter_mime(r, chunk_size)
+
+    def download_message_mime(
+        self, url: str, destination, chunk_size: int = CHUNK_SIZE
+    ):
+        """
+        save email mime to a file as it downloads
+
+        Args:
+            url: ``str``
+                message storage url
+            destination: ``str`` or file object
+                path, or a binary file object to write to
+
+        Return:
+            bytes written: ``int``
+        """
+        if isinstance(destination, (str, os.PathLike)):
+            with open(destination, "wb") as f:
+                return self.download_message_mime(url, f, chunk_size)
+
+        written = 0
+        for chunk in self.iter_message_mime(url, chunk_size):
+            destination.write(chunk)
+            written += len(chunk)
+        return written
+
+    def parse_stored_message(
+        self, url: str, email_id: str = None, save_attachment_dir: str = "tmp"
+    ):
+        """
+        download and parse email mime at once, attachments are written while
+        the message is still downloading
+
+        Args:
+            url: ``str``
+                message storage url
+            email_id: ``str``
+            save_attachment_dir: ``str``
+
+        Return:
+            Metadata and file saved in its own folder of tmp dir: ``dict``
+        """
+        return parse_email_stream(
+            self.iter_message_mime(url),
+            email_id,
+            save_attachment_dir,
+            instrumentation=self.instrumentation,
+        )
+
     def parse_email_mime(
         self, body_mime, email_id: str = None, save_attachment_dir: str = "tmp"
     ):
@@ -368,11 +1073,68 @@ class Mailgun:
             body-mime: ``str``
         
         Return:
-            Metadata and file saved in tmp dir: ``dict``
+            Metadata and file saved in its own folder of tmp dir: ``dict``
         """
-        metadata = parse_email(body_mime, email_id, save_attachment_dir)
+        metadata = parse_email(
+            body_mime,
+            email_id,
+            save_attachment_dir,
+            instrumentation=self.instrumentation,
+        )
         return metadata
 
+    def parse_email_mime_stream(
+        self, source, email_id: str = None, save_attachment_dir: str = "tmp"
+    ):
+        """
+        parse email-mime in chunks, decoding attachments straight to disk
+
+        Args:
+            source: ``bytes`` or file object
+                body-mime, or a binary file object to read it from
+
+        Return:
+            Metadata and file saved in tmp dir: ``dict``
+        """
+        return parse_email_stream(
+            source, email_id, save_attachment_dir, instrumentation=self.instrumentation
+        )
+
+    def parse_many(
+        self,
+        emails,
+        save_attachment_dir: str = "tmp",
+        processes: int = None,
+        max_pending: int = None,
+    ):
+        """
+        parse many email-mime on a process pool
+
+        Args:
+            emails: ``iterable``
+                ``(email_id, body_mime)`` pairs
+            save_attachment_dir: ``str``
+            processes: ``int``
+                worker processes, defaults to the number of CPUs
+            max_pending: ``int``
+                emails queued ahead of the results
+
+        Return:
+            generator of ``ParseResult`` ( ``email_id`` , ``metadata`` ,
+            ``error`` ) as each email is done
+        """
+        return parse_many(emails, save_attachment_dir, processes, max_pending)
+
+    def cleanup_email_mime(self, metadata: dict):
+        """
+        Remove the attachment folder of a parsed email
+
+        Args:
+            metadata: ``dict``
+                returned by ``parse_email_mime``
+        """
+        cleanup_workspace(metadata)
+
     def __str__(self):
         return "Mailgun API"
 
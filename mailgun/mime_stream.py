@@ -0,0 +1,286 @@
+"""Incremental MIME parser that decodes attachments straight to disk"""
+import binascii
+import os
+from email.parser import BytesHeaderParser
+
+CHUNK_SIZE = 64 * 1024
+# longest line that can still be a boundary (RFC 5322 line limit)
+MAX_LINE = 1000
+
+
+def safe_filename(filename: str):
+    """Attachment filename without any directory part"""
+    return os.path.basename(filename.replace("\\", "/")) or "attachment"
+
+
+class _RawDecoder:
+    """7bit / 8bit / binary content, written as is"""
+
+    def __init__(self, out):
+        self.out = out
+
+    def data(self, data: bytes):
+        self.out.write(data)
+
+    def newline(self, newline: bytes):
+        self.out.write(newline)
+
+    def close(self):
+        pass
+
+
+class _Base64Decoder(_RawDecoder):
+    def __init__(self, out):
+        super().__init__(out)
+        self._rest = b""
+
+    def data(self, data: bytes):
+        data = self._rest + b"".join(data.split())
+        usable = len(data) - len(data) % 4
+        if usable:
+            self.out.write(binascii.a2b_base64(data[:usable]))
+        self._rest = data[usable:]
+
+    def newline(self, newline: bytes):
+        pass
+
+    def close(self):
+        if self._rest.strip(b"="):
+            rest = self._rest + b"=" * (-len(self._rest) % 4)
+            try:
+                self.out.write(binascii.a2b_base64(rest))
+            except binascii.Error:
+                pass
+        self._rest = b""
+
+
+class _QuotedPrintableDecoder(_RawDecoder):
+    def __init__(self, out):
+        super().__init__(out)
+        self._rest = b""
+
+    def data(self, data: bytes):
+        data = self._rest + data
+        # keep an escape cut by the chunk edge for the next call
+        cut = data.rfind(b"=", max(0, len(data) - 2))
+        if cut == -1:
+            cut = len(data)
+        self.out.write(binascii.a2b_qp(data[:cut]))
+        self._rest = data[cut:]
+
+    def newline(self, newline: bytes):
+        if self._rest == b"=":
+            # soft line break
+            self._rest = b""
+            return
+        self.out.write(binascii.a2b_qp(self._rest) + newline)
+        self._rest = b""
+
+    def close(self):
+        self.out.write(binascii.a2b_qp(self._rest.rstrip(b"=")))
+        self._rest = b""
+
+
+_DECODERS = {
+    "base64": _Base64Decoder,
+    "quoted-printable": _QuotedPrintableDecoder,
+}
+
+
+class _TextSink:
+    """Collects a text part in memory"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data: bytes):
+        self.parts.append(data)
+
+    def getvalue(self):
+        return b"".join(self.parts)
+
+
+class StreamingMimeParser:
+    """
+    Parse a MIME message fed in chunks.
+
+    Headers are parsed with the standard library, bodies are decoded as they
+    arrive: attachments (parts with a filename) are written to
+    ``output_dir`` , ``text/plain`` bodies are kept as ``body`` and other
+    parts are skipped. Memory use depends on ``chunk_size`` and the header
+    sizes, not on the size of the message or its attachments.
+
+    Args:
+        output_dir:``str``
+            folder for attachments, must exist.
+        chunk_size:``int``
+            longest piece of a line held before it is decoded.
+
+    Example:
+
+        .. code-block:: python
+
+            parser = StreamingMimeParser("tmp")
+            for chunk in chunks:
+                parser.feed(chunk)
+            metadata = parser.close()
+    """
+
+    def __init__(self, output_dir: str, chunk_size: int = CHUNK_SIZE):
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.metadata = {}
+        self.files = []
+        self._buffer = bytearray()
+        self._boundaries = []
+        self._in_headers = True
+        self._headers = []
+        self._top = True
+        self._decoder = None
+        self._handle = None
+        self._text = None
+        self._pending = b""
+        self._midline = False
+
+    def feed(self, data: bytes):
+        """
+        Parse the next chunk of the message
+        """
+        self._buffer += data
+        while True:
+            end = self._buffer.find(b"\n")
+            if end == -1:
+                break
+            line = bytes(self._buffer[: end + 1])
+            del self._buffer[: end + 1]
+            self._line(line, complete=True)
+
+        # a long line, flushed in pieces unless it could be a boundary
+        if len(self._buffer) > self.chunk_size and not self._in_headers:
+            if (
+                self._midline
+                or not self._buffer.startswith(b"--")
+                or len(self._buffer) > MAX_LINE
+            ):
+                # a CR may be the first half of a CRLF still to come
+                keep = 1 if self._buffer.endswith(b"\r") else 0
+                line = bytes(self._buffer[: len(self._buffer) - keep])
+                del self._buffer[: len(line)]
+                self._line(line, complete=False)
+
+    def _line(self, line: bytes, complete: bool):
+        midline, self._midline = self._midline, not complete
+        if self._in_headers:
+            self._header_line(line)
+            return
+
+        if not midline and self._boundaries and line.startswith(b"--"):
+            marker = line.rstrip()
+            for depth in range(len(self._boundaries) - 1, -1, -1):
+                boundary = b"--" + self._boundaries[depth]
+                if marker == boundary:
+                    del self._boundaries[depth + 1 :]
+                    self._end_part()
+                    self._in_headers = True
+                    return
+                if marker == boundary + b"--":
+                    del self._boundaries[depth:]
+                    self._end_part()
+                    return
+
+        if complete:
+            stripped = line.rstrip(b"\r\n")
+            newline = line[len(stripped) :]
+        else:
+            stripped, newline = line, b""
+        if self._decoder is not None:
+            if self._pending and not midline:
+                self._decoder.newline(self._pending)
+            self._decoder.data(stripped)
+        self._pending = newline
+
+    def _header_line(self, line: bytes):
+        if line.strip():
+            self._headers.append(line)
+            return
+        headers = BytesHeaderParser().parsebytes(b"".join(self._headers))
+        self._headers = []
+        self._in_headers = False
+        self._start_part(headers)
+
+    def _start_part(self, headers):
+        if self._top:
+            self._top = False
+            self.metadata.update(
+                {
+                    "from": headers["From"],
+                    "to": headers["To"],
+                    "date": headers["Date"],
+                    "subject": headers["Subject"],
+                }
+            )
+
+        self._pending = b""
+        if headers.get_content_maintype() == "multipart":
+            boundary = headers.get_boundary()
+            if boundary:
+                self._boundaries.append(boundary.encode("utf-8"))
+            return
+
+        encoding = str(headers.get("Content-Transfer-Encoding", "")).strip().lower()
+        decoder = _DECODERS.get(encoding, _RawDecoder)
+        disposition = str(headers.get("Content-Disposition"))
+        filename = headers.get_filename()
+
+        if (
+            headers.get_content_type() == "text/plain"
+            and "attachment" not in disposition
+        ):
+            self._text = (_TextSink(), headers.get_content_charset() or "utf-8")
+            self._decoder = decoder(self._text[0])
+        elif filename:
+            path = os.path.join(self.output_dir, safe_filename(filename))
+            self._handle = open(path, "wb")
+            if path not in self.files:
+                self.files.append(path)
+            self._decoder = decoder(self._handle)
+        elif not self._boundaries:
+            # single part message that is not text/plain
+            self._text = (_TextSink(), headers.get_content_charset() or "utf-8")
+            self._decoder = decoder(self._text[0])
+
+    def _end_part(self):
+        if self._decoder is not None:
+            self._decoder.close()
+            self._decoder = None
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if self._text is not None:
+            sink, charset = self._text
+            try:
+                self.metadata["body"] = sink.getvalue().decode(charset, "replace")
+            except LookupError:
+                self.metadata["body"] = sink.getvalue().decode("utf-8", "replace")
+            self._text = None
+        self._pending = b""
+
+    def close(self):
+        """
+        Finish parsing
+
+        Return:
+            Email metadata with the written attachment paths as ``files`` : ``dict``
+        """
+        if self._buffer:
+            line = bytes(self._buffer)
+            self._buffer.clear()
+            self._line(line, complete=False)
+        if self._in_headers and self._headers:
+            self._header_line(b"\n")
+        if self._decoder is not None and self._pending and not self._boundaries:
+            # without a closing boundary the last line break is content
+            self._decoder.newline(self._pending)
+        self._end_part()
+        self.metadata["files"] = list(self.files)
+        return self.metadata
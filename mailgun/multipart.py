@@ -0,0 +1,222 @@
+"""Streaming multipart/form-data body for attachments"""
+import io
+import mimetypes
+import os
+import uuid
+from urllib.parse import quote
+
+CHUNK_SIZE = 64 * 1024
+
+
+def attachment_source(item, index: int = 0):
+    """
+    Normalize one ``files`` entry to ``(filename, source)``
+
+    An entry is a path, ``bytes`` / ``bytearray`` / ``memoryview`` , a
+    binary file object, an ``Attachment`` or a ``(filename, any of those)``
+    tuple.
+    """
+    if hasattr(item, "content") and hasattr(item, "filename"):
+        # ``Attachment`` from an ``AttachmentBundle``
+        return item.filename, item.content
+    if isinstance(item, tuple):
+        filename, source = item
+        return filename, source
+    if isinstance(item, (str, os.PathLike)):
+        return os.path.basename(os.fspath(item)), item
+    name = getattr(item, "name", None)
+    if isinstance(name, str):
+        return os.path.basename(name), item
+    return "attachment-{}".format(index), item
+
+
+def _source_size(source):
+    """Bytes left to read in ``source`` , ``None`` when it can't be told"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).nbytes
+    try:
+        position = source.tell()
+        end = source.seek(0, io.SEEK_END)
+        source.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _part_header(
+    boundary: str, name: str, filename: str = None, content_type: str = None
+):
+    disposition = 'form-data; name="{}"'.format(name.replace('"', "%22"))
+    if filename is not None:
+        try:
+            filename.encode("ascii")
+            disposition += '; filename="{}"'.format(filename.replace('"', "%22"))
+        except UnicodeEncodeError:
+            disposition += "; filename*=utf-8''{}".format(quote(filename))
+        content_type = (
+            content_type
+            or mimetypes.guess_type(filename)[0]
+            or "application/octet-stream"
+        )
+        header = "Content-Disposition: {}\r\nContent-Type: {}".format(
+            disposition, content_type
+        )
+    else:
+        header = "Content-Disposition: {}".format(disposition)
+    return "--{}\r\n{}\r\n\r\n".format(boundary, header).encode("utf-8")
+
+
+class MultipartEncoder:
+    """
+    ``multipart/form-data`` body read lazily in chunks.
+
+    Form fields are encoded up front, attachments are only read while the
+    body is sent, ``chunk_size`` bytes at a time, so sending large files
+    does not load them in memory. Pass it as ``data`` to ``requests`` with
+    ``content_type`` as the ``Content-Type`` header.
+
+    Args:
+        fields:``dict``
+            form fields, a ``list`` value is sent as a repeated field.
+        files:``list``
+            ``(field name, file entry)`` pairs, see ``attachment_source`` .
+        chunk_size:``int``
+    """
+
+    def __init__(self, fields: dict, files: list, chunk_size: int = CHUNK_SIZE):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self._segments = []
+
+        for name, value in fields.items():
+            for item in value if isinstance(value, (list, tuple)) else [value]:
+                if isinstance(item, str):
+                    item = item.encode("utf-8")
+                elif not isinstance(item, bytes):
+                    item = str(item).encode("utf-8")
+                self._segments.append(
+                    _part_header(self.boundary, name) + item + b"\r\n"
+                )
+
+        for index, (name, entry) in enumerate(files):
+            filename, source = attachment_source(entry, index)
+            content_type = getattr(entry, "content_type", None)
+            self._segments.append(
+                _part_header(self.boundary, name, filename, content_type)
+            )
+            self._segments.append(source)
+            self._segments.append(b"\r\n")
+        self._segments.append("--{}--\r\n".format(self.boundary).encode("utf-8"))
+
+        sizes = [
+            len(s) if isinstance(s, bytes) else _source_size(s) for s in self._segments
+        ]
+        self.len = None if None in sizes else sum(sizes)
+        self._starts = [_position(s) for s in self._segments]
+        self._index = 0
+        self._reader = None
+        self._opened = None
+
+    @property
+    def content_type(self):
+        return "multipart/form-data; boundary={}".format(self.boundary)
+
+    def _open(self, segment):
+        if isinstance(segment, (str, os.PathLike)):
+            self._opened = open(segment, "rb")
+            return self._opened
+        if isinstance(segment, (bytes, bytearray, memoryview)):
+            return _ViewReader(segment)
+        return segment
+
+    def _next_reader(self):
+        if self._opened is not None:
+            self._opened.close()
+            self._opened = None
+        if self._index >= len(self._segments):
+            return None
+        segment = self._segments[self._index]
+        self._index += 1
+        return self._open(segment)
+
+    def read(self, size: int = -1):
+        """
+        Read up to ``size`` bytes of the body, everything left when negative
+        """
+        out = []
+        remaining = size if size is not None and size >= 0 else None
+        while remaining is None or remaining > 0:
+            if self._reader is None:
+                self._reader = self._next_reader()
+                if self._reader is None:
+                    break
+            data = self._reader.read(
+                self.chunk_size
+                if remaining is None
+                else min(remaining, self.chunk_size)
+            )
+            if not data:
+                self._reader = None
+                continue
+            out.append(data)
+            if remaining is not None:
+                remaining -= len(data)
+        return b"".join(out)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def rewind(self):
+        """
+        Go back to the start of the body, to send it again
+
+        Return:
+            ``False`` when a file object can't seek back: ``bool``
+        """
+        self.close()
+        for segment, start in zip(self._segments, self._starts):
+            if start is None:
+                return False
+            if start is not True:
+                segment.seek(start)
+        self._index = 0
+        self._reader = None
+        return True
+
+    def close(self):
+        if self._opened is not None:
+            self._opened.close()
+            self._opened = None
+
+
+def _position(segment):
+    """
+    Where a file object segment starts, ``True`` for segments read from
+    the start every time and ``None`` when it can't be told
+    """
+    if isinstance(segment, (bytes, bytearray, memoryview, str, os.PathLike)):
+        return True
+    try:
+        return segment.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class _ViewReader:
+    """``read`` over a ``memoryview`` without copying the whole buffer"""
+
+    def __init__(self, view):
+        self._view = memoryview(view).cast("B")
+        self._position = 0
+
+    def read(self, size: int = -1):
+        end = len(self._view) if size < 0 else self._position + size
+        data = self._view[self._position : end].tobytes()
+        self._position += len(data)
+        return data
@@ -0,0 +1,109 @@
+"""Parse many emails on a process pool"""
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .email_parsing import parse_email, parse_email_stream
+
+ParseResult = namedtuple("ParseResult", ["email_id", "metadata", "error"])
+ParseResult.__doc__ = """
+Outcome of one email: ``metadata`` from ``parse_email`` on success,
+``error`` as ``"ExceptionName: message"`` on failure.
+"""
+
+
+def parse_one(email_id: str, body_mime, output_dir: str, archive_limits: dict = None):
+    """
+    Parse one email, returning failures instead of raising
+
+    Args:
+        email_id: ``str``
+        body_mime: ``str`` , ``bytes`` or ``os.PathLike``
+            body-mime, or the path of a file holding it
+        output_dir: ``str``
+        archive_limits: ``dict``
+
+    Return:
+        ``ParseResult``
+    """
+    try:
+        if isinstance(body_mime, os.PathLike):
+            with open(body_mime, "rb") as f:
+                metadata = parse_email_stream(
+                    f, email_id, output_dir, archive_limits=archive_limits
+                )
+        elif isinstance(body_mime, str):
+            metadata = parse_email(body_mime, email_id, output_dir, archive_limits)
+        else:
+            metadata = parse_email_stream(
+                body_mime, email_id, output_dir, archive_limits=archive_limits
+            )
+    except Exception as e:
+        return ParseResult(email_id, None, "{}: {}".format(type(e).__name__, e))
+    return ParseResult(email_id, metadata, None)
+
+
+def parse_many(
+    emails,
+    output_dir: str = "tmp",
+    processes: int = None,
+    max_pending: int = None,
+    archive_limits: dict = None,
+):
+    """
+    Parse emails on a pool of processes, yielding results as they complete
+
+    Every email gets its own workspace in ``output_dir`` , an email that
+    fails to parse comes back as a ``ParseResult`` with ``error`` set and
+    the batch goes on.
+
+    Args:
+        emails: ``iterable``
+            ``(email_id, body_mime)`` pairs, ``body_mime`` is a ``str`` ,
+            ``bytes`` or the ``pathlib.Path`` of a file holding it
+        output_dir: ``str``
+            folder for the attachment workspaces
+        processes: ``int``
+            worker processes, defaults to the number of CPUs
+        max_pending: ``int``
+            emails read ahead of the results, defaults to ``4 * processes``
+        archive_limits: ``dict``
+            keyword arguments for ``extract_zip``
+
+    Return:
+        generator of ``ParseResult`` in completion order
+
+    Example:
+
+        .. code-block:: python
+
+            for result in parse_many(stored_emails, processes=8):
+                if result.error:
+                    print(result.email_id, result.error)
+    """
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or 4 * processes
+    pending = {}
+
+    def collect(done):
+        for future in done:
+            email_id = pending.pop(future)
+            try:
+                yield future.result()
+            except Exception as e:
+                # the worker process itself died
+                yield ParseResult(email_id, None, "{}: {}".format(type(e).__name__, e))
+
+    with ProcessPoolExecutor(processes) as pool:
+        for email_id, body_mime in emails:
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+            future = pool.submit(
+                parse_one, email_id, body_mime, output_dir, archive_limits
+            )
+            pending[future] = email_id
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from collect(done)
@@ -0,0 +1,309 @@
+"""Inbound pipeline: stored events to parsed emails in concurrent stages"""
+import os
+import pathlib
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .events import _DONE, MAX_PAGE_SIZE, _Failure, _put, iter_events
+from .parallel import ParseResult, parse_one
+
+
+def _get(buffer: queue.Queue, stop: threading.Event):
+    """Get unless the pipeline is stopping, ``_DONE`` once it is"""
+    while not stop.is_set():
+        try:
+            return buffer.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+class _End:
+    """Last item of the results, after ``count`` parse results"""
+
+    def __init__(self, count: int, item):
+        self.count = count
+        self.item = item
+
+
+class _Stage:
+    """Counters of one stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, error: bool = False, size: int = 0):
+        with self._lock:
+            self.count += 1
+            self.errors += bool(error)
+            self.bytes += size
+
+
+class InboundPipeline:
+    """
+    Turn stored events into parsed emails with concurrent stages.
+
+    A thread pages through the ``stored`` events, ``fetch_workers`` threads
+    download each message to a spool file and ``processes`` worker
+    processes parse them. Stages are joined by queues of ``queue_size``
+    items, so a slow stage holds the earlier ones back instead of letting
+    events or messages pile up in memory.
+
+    Args:
+        mailgun:``Mailgun``
+        filters:``dict``
+            events API filters.
+        output_dir:``str``
+            folder for the attachment workspaces.
+        fetch_workers:``int``
+            threads downloading messages, keep the client ``pool_maxsize``
+            at least as large.
+        processes:``int``
+            parsing processes, defaults to the number of CPUs.
+        queue_size:``int``
+            items held between two stages.
+        spool_dir:``str``
+            folder for downloaded messages waiting to be parsed, defaults
+            to a temporary folder.
+        archive_limits:``dict``
+            keyword arguments for ``extract_zip`` .
+        page_size:``int``
+
+    Example:
+
+        .. code-block:: python
+
+            pipeline = InboundPipeline(mailgun, {"event": "stored", "begin": begin})
+            for result in pipeline.run():
+                if result.error:
+                    print(result.email_id, result.error)
+            print(pipeline.stats())
+    """
+
+    def __init__(
+        self,
+        mailgun,
+        filters: dict = {"event": "stored"},
+        output_dir: str = "tmp",
+        fetch_workers: int = 8,
+        processes: int = None,
+        queue_size: int = 32,
+        spool_dir: str = None,
+        archive_limits: dict = None,
+        page_size: int = MAX_PAGE_SIZE,
+    ):
+        self.mailgun = mailgun
+        self.filters = filters
+        self.output_dir = output_dir
+        self.fetch_workers = fetch_workers
+        self.processes = processes or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.spool_dir = spool_dir
+        self.archive_limits = archive_limits
+        self.page_size = page_size
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        # parses submitted but not yet yielded
+        self._slots = threading.Semaphore(self.queue_size)
+        self.stages = {name: _Stage(name) for name in ("events", "fetch", "parse")}
+        self._fetch_queue = queue.Queue(maxsize=self.queue_size)
+        self._parse_queue = queue.Queue(maxsize=self.queue_size)
+        self._in_flight = 0
+        self._started = None
+        self._finished = None
+
+    def _source(self, events, stop: threading.Event):
+        stage = self.stages["events"]
+        try:
+            for event in events:
+                stage.record()
+                if not _put(self._fetch_queue, event, stop):
+                    return
+        except Exception as e:
+            _put(self._fetch_queue, _Failure(e), stop)
+            return
+        _put(self._fetch_queue, _DONE, stop)
+
+    def _fetch(self, spool: str, stop: threading.Event):
+        stage = self.stages["fetch"]
+        while True:
+            event = _get(self._fetch_queue, stop)
+            if event is _DONE or isinstance(event, _Failure):
+                # hand the end on to the other fetch workers
+                _put(self._fetch_queue, event, stop)
+                return
+            _put(self._parse_queue, self._fetch_one(event, spool, stage), stop)
+
+    def _fetch_one(self, event: dict, spool: str, stage: _Stage):
+        email_id = event.get("id")
+        fd, path = tempfile.mkstemp(suffix=".eml", dir=spool)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                size = self.mailgun.download_message_mime(event["storage"]["url"], f)
+        except Exception as e:
+            os.remove(path)
+            stage.record(error=True)
+            return ParseResult(email_id, None, "{}: {}".format(type(e).__name__, e))
+        stage.record(size=size)
+        return email_id, pathlib.Path(path)
+
+    def _fetchers(self, spool: str, stop: threading.Event):
+        """Run the fetch workers, then pass the end of the events on"""
+        threads = [
+            threading.Thread(target=self._fetch, args=(spool, stop), daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        try:
+            end = self._fetch_queue.get_nowait()
+        except queue.Empty:
+            end = _DONE
+        _put(self._parse_queue, end, stop)
+
+    def _submit(self, pool, results: queue.Queue, stop: threading.Event):
+        """Hand fetched messages to the process pool as slots free up"""
+        submitted = 0
+        while True:
+            item = _get(self._parse_queue, stop)
+            if item is _DONE or isinstance(item, _Failure):
+                results.put(_End(submitted, item))
+                return
+            while not self._slots.acquire(timeout=0.1):
+                if stop.is_set():
+                    return
+            submitted += 1
+            if isinstance(item, ParseResult):
+                # the fetch failed, nothing to parse
+                results.put(item)
+                continue
+
+            email_id, path = item
+            with self._lock:
+                self._in_flight += 1
+            future = pool.submit(
+                parse_one, email_id, path, self.output_dir, self.archive_limits
+            )
+            future.add_done_callback(
+                lambda future, email_id=email_id, path=path: self._parsed(
+                    future, email_id, path, results
+                )
+            )
+
+    def _parsed(self, future, email_id: str, path: str, results: queue.Queue):
+        try:
+            result = future.result()
+        except Exception as e:
+            # the worker process itself died, or the run was cancelled
+            result = ParseResult(email_id, None, "{}: {}".format(type(e).__name__, e))
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        with self._lock:
+            self._in_flight -= 1
+        self.stages["parse"].record(error=result.error is not None)
+        results.put(result)
+
+    def run(self, events=None):
+        """
+        Fetch and parse every stored message, yielding each as soon as it
+        is parsed
+
+        Args:
+            events: ``iterable``
+                events to process, eg from ``EventPoller.poll`` , defaults
+                to paging through the events API with ``filters``
+
+        Return:
+            generator of ``ParseResult`` in completion order
+        """
+        self._reset()
+        if events is None:
+            events = iter_events(self.mailgun, self.filters, self.page_size)
+        stop = threading.Event()
+        results = queue.Queue()
+        spool = self.spool_dir or tempfile.mkdtemp(prefix="mailgun-spool-")
+        os.makedirs(spool, exist_ok=True)
+        pool = ProcessPoolExecutor(self.processes)
+        self._started = time.monotonic()
+        threads = [
+            threading.Thread(target=target, args=args, daemon=True)
+            for target, args in (
+                (self._source, (events, stop)),
+                (self._fetchers, (spool, stop)),
+                (self._submit, (pool, results, stop)),
+            )
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            yielded = 0
+            end = None
+            while end is None or yielded < end.count:
+                result = results.get()
+                if isinstance(result, _End):
+                    end = result
+                    continue
+                yielded += 1
+                self._slots.release()
+                yield result
+            if isinstance(end.item, _Failure):
+                raise end.item.error
+        finally:
+            stop.set()
+            self._finished = time.monotonic()
+            # nothing is submitted once the submitting thread is gone
+            threads[-1].join()
+            pool.shutdown(wait=True, cancel_futures=True)
+            if not self.spool_dir:
+                shutil.rmtree(spool, ignore_errors=True)
+
+    def stats(self):
+        """
+        Per stage counters of the current or last run, ``queue`` is the
+        number of items waiting for the stage
+
+        Return:
+            stats: ``dict``
+
+                .. code-block:: json
+
+                    {
+                    "events": {"count": 120, "errors": 0, "per_second": 40.1},
+                    "fetch": {"count": 118, "errors": 0, "per_second": 39.4,
+                              "bytes": 9437184, "queue": 2},
+                    "parse": {"count": 110, "errors": 1, "per_second": 36.7,
+                              "queue": 8, "in_flight": 8}
+                    }
+        """
+        if self._started is None:
+            elapsed = 0
+        else:
+            elapsed = (self._finished or time.monotonic()) - self._started
+        stats = {
+            name: {
+                "count": stage.count,
+                "errors": stage.errors,
+                "per_second": stage.count / elapsed if elapsed else 0.0,
+            }
+            for name, stage in self.stages.items()
+        }
+        stats["fetch"]["bytes"] = self.stages["fetch"].bytes
+        stats["fetch"]["queue"] = self._fetch_queue.qsize()
+        stats["parse"]["queue"] = self._parse_queue.qsize()
+        stats["parse"]["in_flight"] = self._in_flight
+        return stats
@@ -0,0 +1,221 @@
+"""Incremental event polling with durable checkpoints"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .events import MAX_PAGE_SIZE, iter_events
+
+# window Mailgun needs for events to become visible in the events API
+OVERLAP = 30 * 60
+
+
+class JSONCheckpoint:
+    """
+    Checkpoint kept in a JSON file, replaced atomically on every save.
+
+    Args:
+        path:``str``
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self):
+        """
+        Return:
+            ``(timestamp, seen)`` , ``seen`` maps event id to its timestamp
+        """
+        if not os.path.exists(self.path):
+            return None, {}
+        with open(self.path, "r") as f:
+            state = json.load(f)
+        return state.get("timestamp"), state.get("seen", {})
+
+    def save(self, timestamp: float, seen: dict):
+        tmp_path = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump({"timestamp": timestamp, "seen": seen}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class SQLiteCheckpoint:
+    """
+    Checkpoint kept in a SQLite database, several pollers can share one
+    file under different names.
+
+    Args:
+        path:``str``
+        name:``str``
+            poller name inside the database.
+    """
+
+    def __init__(self, path: str, name: str = "default"):
+        self.path = path
+        self.name = name
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints "
+                "(name TEXT PRIMARY KEY, timestamp REAL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS seen_events "
+                "(name TEXT, event_id TEXT, timestamp REAL, "
+                "PRIMARY KEY (name, event_id))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self):
+        db = self._connect()
+        try:
+            row = db.execute(
+                "SELECT timestamp FROM checkpoints WHERE name = ?", (self.name,)
+            ).fetchone()
+            seen = dict(
+                db.execute(
+                    "SELECT event_id, timestamp FROM seen_events WHERE name = ?",
+                    (self.name,),
+                )
+            )
+        finally:
+            db.close()
+        return (row[0] if row else None), seen
+
+    def save(self, timestamp: float, seen: dict):
+        db = self._connect()
+        try:
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO checkpoints (name, timestamp) VALUES (?, ?)",
+                    (self.name, timestamp),
+                )
+                db.execute("DELETE FROM seen_events WHERE name = ?", (self.name,))
+                db.executemany(
+                    "INSERT INTO seen_events (name, event_id, timestamp) "
+                    "VALUES (?, ?, ?)",
+                    [(self.name, k, v) for k, v in seen.items()],
+                )
+        finally:
+            db.close()
+
+
+class EventPoller:
+    """
+    Fetch only the events newer than a durable checkpoint.
+
+    Every poll reads from the checkpoint timestamp minus ``overlap`` seconds,
+    the window in which Mailgun may still add older events, and skips the
+    event ids already handled in that window. Progress is saved while
+    events are handled, so a restarted poller resumes where it stopped and
+    every event is handled at least once.
+
+    Args:
+        mailgun:``Mailgun``
+        checkpoint:``str`` or checkpoint object
+            path of a JSON file, or a ``JSONCheckpoint`` / ``SQLiteCheckpoint`` .
+        filters:``dict``
+            events API filters.
+        overlap:``float``
+            seconds re-read before the checkpoint.
+        start:``float``
+            epoch timestamp to start from without a checkpoint, defaults to
+            ``overlap`` seconds ago.
+        checkpoint_every:``int``
+            save after this many handled events.
+        page_size:``int``
+
+    Example:
+
+        .. code-block:: python
+
+            poller = EventPoller(mailgun, "stored.json", {"event": "stored"})
+            poller.run(lambda event: process(event["storage"]["url"]), interval=60)
+    """
+
+    def __init__(
+        self,
+        mailgun,
+        checkpoint,
+        filters: dict = {"event": "stored"},
+        overlap: float = OVERLAP,
+        start: float = None,
+        checkpoint_every: int = 100,
+        page_size: int = MAX_PAGE_SIZE,
+    ):
+        self.mailgun = mailgun
+        if isinstance(checkpoint, (str, os.PathLike)):
+            checkpoint = JSONCheckpoint(checkpoint)
+        self.checkpoint = checkpoint
+        self.filters = filters
+        self.overlap = overlap
+        self.checkpoint_every = checkpoint_every
+        self.page_size = page_size
+        self.timestamp, self.seen = checkpoint.load()
+        if self.timestamp is None and start is not None:
+            self.timestamp = start + overlap
+
+    def _save(self):
+        horizon = (self.timestamp or 0) - self.overlap
+        self.seen = {k: v for k, v in self.seen.items() if v >= horizon}
+        self.checkpoint.save(self.timestamp, self.seen)
+
+    def poll(self, handler=None):
+        """
+        Handle the events that arrived since the last poll
+
+        Args:
+            handler: ``callable``
+                called with each new event, when omitted the new events are
+                returned and checkpointed once all of them are read, a
+                failed poll leaves the checkpoint as it was.
+
+        Return:
+            new events: ``list`` , or their count with a ``handler``
+        """
+        collected = []
+        return_events = handler is None
+        if return_events:
+            handler = collected.append
+
+        timestamp = self.timestamp or time.time()
+        params = dict(self.filters or {})
+        params.update(begin=timestamp - self.overlap, ascending="yes")
+
+        # returned events are only handled once the poll returns them
+        previous = (self.timestamp, dict(self.seen))
+        handled = 0
+        completed = False
+        try:
+            for event in iter_events(self.mailgun, params, self.page_size):
+                if event["id"] in self.seen:
+                    continue
+                handler(event)
+                self.seen[event["id"]] = event["timestamp"]
+                self.timestamp = max(self.timestamp or 0, event["timestamp"])
+                handled += 1
+                if not return_events and handled % self.checkpoint_every == 0:
+                    self._save()
+            completed = True
+        finally:
+            if return_events and not completed:
+                # the collected events are lost with the exception
+                self.timestamp, self.seen = previous
+            else:
+                if self.timestamp is None:
+                    self.timestamp = timestamp
+                self._save()
+        return collected if return_events else handled
+
+    def run(self, handler, interval: float = 60, stop: threading.Event = None):
+        """
+        Poll every ``interval`` seconds until ``stop`` is set
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.poll(handler)
+            stop.wait(interval)
@@ -0,0 +1,283 @@
+"""Retry policy and circuit breaker shared by every endpoint"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from .error import CircuitOpen
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def retry_after(headers):
+    """
+    Seconds asked for by a ``Retry-After`` header, ``None`` without one
+
+    Args:
+        headers: ``dict``
+            response headers, seconds or an HTTP date
+    """
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RetryPolicy:
+    """
+    When and how long to wait before sending a request again.
+
+    A ``429`` means the request was turned away, so it is retried whatever
+    the method. Other retryable statuses and connection errors are only
+    retried for idempotent methods, or for calls marked idempotent, since
+    the request may have been handled already: a ``POST /messages`` sent
+    twice is two emails.
+
+    Args:
+        retries:``int``
+            attempts after the first one.
+        backoff:``float``
+            seconds of the first backoff, doubled on every retry.
+        max_backoff:``float``
+            longest backoff in seconds.
+        jitter:``bool``
+            wait a random time up to the backoff ("full jitter") so clients
+            that failed together do not retry together.
+        statuses:``set``
+            response statuses worth a retry.
+        methods:``set``
+            methods retried after a server error or a broken connection.
+        respect_retry_after:``bool``
+            wait as long as ``Retry-After`` asks, up to ``max_retry_after`` .
+        max_retry_after:``float``
+
+    Example:
+
+        .. code-block:: python
+
+            mailgun = Mailgun(retry=RetryPolicy(retries=5, backoff=1))
+            # sending is not idempotent, retry it only when rate limited
+            mailgun.options(retry=RetryPolicy(statuses={429})).send_message(...)
+    """
+
+    def __init__(
+        self,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30,
+        jitter: bool = True,
+        statuses=RETRY_STATUSES,
+        methods=IDEMPOTENT_METHODS,
+        respect_retry_after: bool = True,
+        max_retry_after: float = 120,
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(m.upper() for m in methods)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+    def replace(self, **changes):
+        """
+        Copy of the policy with some arguments changed
+        """
+        arguments = dict(vars(self))
+        arguments.update(changes)
+        return RetryPolicy(**arguments)
+
+    def is_retryable(self, method: str, status: int = None, idempotent: bool = None):
+        """
+        Whether a response ``status`` , or a connection error when ``None`` ,
+        is worth another attempt
+        """
+        if status is not None and status not in self.statuses:
+            return False
+        if status == 429:
+            return True
+        if idempotent is None:
+            idempotent = method.upper() in self.methods
+        return idempotent
+
+    def delay(self, attempt: int, headers: dict = None):
+        """
+        Seconds to wait before retry number ``attempt`` , counted from 1
+        """
+        if self.respect_retry_after and headers is not None:
+            wanted = retry_after(headers)
+            if wanted is not None:
+                return min(wanted, self.max_retry_after)
+        backoff = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the API keeps failing.
+
+    After ``failure_threshold`` failed calls in a row the circuit opens and
+    calls raise ``CircuitOpen`` without a request. ``reset_timeout``
+    seconds later one trial call is let through, its success closes the
+    circuit and its failure opens it again, a trial raising anything else
+    leaves the trial to the next call. Share one breaker between the
+    clients of a process.
+
+    Args:
+        failure_threshold:``int``
+        reset_timeout:``float``
+            seconds the circuit stays open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def before(self):
+        """
+        Raise ``CircuitOpen`` unless a call may go through now
+
+        Return:
+            whether the call is the trial of a half open circuit: ``bool``
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            waited = time.monotonic() - self._opened_at
+            if waited >= self.reset_timeout and not self._trial:
+                self._state = self.HALF_OPEN
+                self._trial = True
+                return True
+            raise CircuitOpen(
+                "Mailgun API failing, retry in {:.1f}s".format(
+                    max(self.reset_timeout - waited, 0)
+                )
+            )
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial = False
+
+    def release(self):
+        """
+        End a trial call that raised before telling success from failure,
+        the next call becomes the trial
+        """
+        with self._lock:
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+def send_with_retry(
+    send,
+    method: str,
+    policy: RetryPolicy = None,
+    breaker: CircuitBreaker = None,
+    idempotent: bool = None,
+    rewind=None,
+):
+    """
+    Call ``send`` until it gives a response worth keeping
+
+    Args:
+        send: ``callable``
+            sends the request, returns a ``requests.Response``
+        method: ``str``
+        policy: ``RetryPolicy``
+            ``None`` sends once
+        breaker: ``CircuitBreaker``
+        idempotent: ``bool``
+            overrides the policy ``methods`` for this call
+        rewind: ``callable``
+            puts the request body back at its start, returns ``False``
+            when it can't
+
+    Return:
+        last response: ``requests.Response`` , the last connection error is
+        raised
+    """
+    attempt = 0
+    while True:
+        trial = breaker is not None and breaker.before()
+        try:
+            response = send()
+        except (requests.ConnectionError, requests.Timeout):
+            if breaker is not None:
+                breaker.failure()
+            if (
+                policy is None
+                or attempt >= policy.retries
+                or not policy.is_retryable(method, None, idempotent)
+                or (rewind is not None and rewind() is False)
+            ):
+                raise
+            attempt += 1
+            time.sleep(policy.delay(attempt))
+            continue
+        except BaseException:
+            # a trial left unsettled would keep the circuit open for good
+            if trial:
+                breaker.release()
+            raise
+
+        failed = response.status_code >= 500 or response.status_code == 429
+        if breaker is not None:
+            if failed:
+                breaker.failure()
+            else:
+                breaker.success()
+        if (
+            policy is None
+            or attempt >= policy.retries
+            or not policy.is_retryable(method, response.status_code, idempotent)
+            or (rewind is not None and rewind() is False)
+        ):
+            return response
+        attempt += 1
+        delay = policy.delay(attempt, response.headers)
+        # give the connection back to the pool while waiting
+        response.close()
+        time.sleep(delay)
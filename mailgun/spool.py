@@ -0,0 +1,599 @@
+"""Durable local outbound spool drained by a background dispatcher"""
+import base64
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .error import CircuitOpen
+from .mailgun import message_data, template_data
+from .retry import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+DELIVERED = "delivered"
+DEAD = "dead"
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS outbound ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "message TEXT NOT NULL, "
+    "status TEXT NOT NULL, "
+    "attempts INTEGER NOT NULL DEFAULT 0, "
+    "available_at REAL NOT NULL, "
+    "lease_until REAL, "
+    "created_at REAL NOT NULL, "
+    "updated_at REAL NOT NULL, "
+    "message_id TEXT, "
+    "error TEXT)",
+    "CREATE INDEX IF NOT EXISTS outbound_ready ON outbound (status, available_at)",
+)
+
+
+def _encode_file(item):
+    if isinstance(item, str):
+        return item
+    if (
+        isinstance(item, tuple)
+        and len(item) == 2
+        and isinstance(item[1], (bytes, bytearray, memoryview))
+    ):
+        content = base64.b64encode(bytes(item[1])).decode("ascii")
+        return {"filename": item[0], "content": content}
+    raise TypeError(
+        "Spooled files must be paths or (filename, bytes), not {}".format(
+            type(item).__name__
+        )
+    )
+
+
+def _decode_file(item):
+    if isinstance(item, str):
+        return item
+    return item["filename"], base64.b64decode(item["content"])
+
+
+class OutboundSpool:
+    """
+    Messages waiting to be sent, kept in a SQLite database in WAL mode so
+    they survive restarts and several processes can share it.
+
+    Enqueueing is one insert on a connection kept per thread. With
+    ``synchronous`` ``"NORMAL"`` commits are not synced to disk one by
+    one: a spooled message survives the process dying, only a power loss
+    can drop the last ones. Use ``"FULL"`` to sync every commit.
+
+    Messages are ``pending`` , ``sending`` while a dispatcher holds them,
+    then ``delivered`` once the API accepted them or ``dead`` when they
+    can not be sent. A ``sending`` message whose lease ran out, because its
+    dispatcher died, is ``pending`` again.
+
+    Args:
+        path:``str``
+            database file.
+        lease:``float``
+            seconds a dispatcher holds a claimed message.
+        synchronous:``str``
+            SQLite ``synchronous`` setting.
+
+    Example:
+
+        .. code-block:: python
+
+            spool = OutboundSpool("/var/lib/app/outbound.db")
+            # in the web request, a local write
+            spool.enqueue("Docsumo <hello@docsumo.com>", user.email, "Welcome",
+                          text_body="Hi")
+
+            # in a worker process
+            with SpoolDispatcher(Mailgun(), spool, workers=8):
+                signal.pause()
+    """
+
+    def __init__(self, path: str, lease: float = 60, synchronous: str = "NORMAL"):
+        self.path = path
+        self.lease = lease
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        db = self._connect()
+        with db:
+            for statement in _SCHEMA:
+                db.execute(statement)
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous={}".format(self.synchronous))
+            self._local.db = db
+        return db
+
+    def close(self):
+        """Close the connection of the calling thread"""
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def _insert(self, rows):
+        now = time.time()
+        db = self._connect()
+        ids = []
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for message in rows:
+                cursor = db.execute(
+                    "INSERT INTO outbound "
+                    "(message, status, available_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (json.dumps(message), PENDING, now, now, now),
+                )
+                ids.append(cursor.lastrowid)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self._wakeup.set()
+        return ids
+
+    def enqueue_fields(self, data: dict, files: list = None):
+        """
+        Spool the form fields of a ``messages`` request
+
+        Args:
+            data: ``dict``
+                eg from ``message_data`` or ``template_data``
+            files: ``list``
+                paths or ``(filename, bytes)`` tuples
+
+        Return:
+            spool id: ``int``
+        """
+        message = {"data": data, "files": [_encode_file(f) for f in files or []]}
+        return self._insert([message])[0]
+
+    def enqueue(
+        self,
+        sender_email: str,
+        to: str,
+        subject: str,
+        html_body: str = None,
+        text_body: str = None,
+        files: list = None,
+        extra_data: dict = None,
+    ):
+        """
+        Spool a message, arguments as ``Mailgun.send_message`` takes them,
+        except that files must be paths or ``(filename, bytes)`` tuples
+
+        Return:
+            spool id: ``int``
+        """
+        data = message_data(sender_email, to, subject, html_body, text_body, extra_data)
+        return self.enqueue_fields(data, files)
+
+    def enqueue_template(
+        self,
+        sender_email: str,
+        to: str,
+        subject: str,
+        template_name: str,
+        data: dict,
+        extra_data: dict = None,
+    ):
+        """
+        Spool a templated message, see ``Mailgun.send_message_template``
+
+        Return:
+            spool id: ``int``
+        """
+        payload = template_data(
+            sender_email, to, subject, template_name, data, extra_data
+        )
+        return self.enqueue_fields(payload)
+
+    def enqueue_many(self, messages):
+        """
+        Spool many messages in one transaction
+
+        Args:
+            messages: ``iterable``
+                ``dict`` of ``enqueue`` keyword arguments, or of
+                ``enqueue_template`` ones when ``template_name`` is set
+
+        Return:
+            spool ids: ``list``
+        """
+        rows = []
+        for message in messages:
+            message = dict(message)
+            files = message.pop("files", None) or []
+            if "template_name" in message:
+                data = template_data(**message)
+            else:
+                data = message_data(**message)
+            rows.append({"data": data, "files": [_encode_file(f) for f in files]})
+        return self._insert(rows)
+
+    def claim(self, limit: int, now: float = None):
+        """
+        Take up to ``limit`` messages due for sending, oldest first
+
+        Return:
+            ``list`` of ``(id, data, files, attempts)`` , ``attempts``
+            counting this one
+        """
+        now = now or time.time()
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(
+                "SELECT id, message, attempts FROM outbound "
+                "WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_until < ?) "
+                "ORDER BY id LIMIT ?",
+                (PENDING, now, SENDING, now, limit),
+            ).fetchall()
+            db.executemany(
+                "UPDATE outbound SET status = ?, attempts = attempts + 1, "
+                "lease_until = ?, updated_at = ? WHERE id = ?",
+                [(SENDING, now + self.lease, now, row[0]) for row in rows],
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        claimed = []
+        for spool_id, message, attempts in rows:
+            message = json.loads(message)
+            files = [_decode_file(f) for f in message["files"]]
+            claimed.append((spool_id, message["data"], files, attempts + 1))
+        return claimed
+
+    def settle(self, outcomes):
+        """
+        Record what became of claimed messages, in one transaction
+
+        Args:
+            outcomes: ``iterable``
+                ``(id, status, message_id, error, retry_at)`` with status
+                ``DELIVERED`` , ``DEAD`` or ``PENDING`` to retry at
+                ``retry_at``
+        """
+        now = time.time()
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany(
+                "UPDATE outbound SET status = ?, message_id = ?, error = ?, "
+                "available_at = COALESCE(?, available_at), lease_until = NULL, "
+                "updated_at = ? WHERE id = ?",
+                [
+                    (status, message_id, error, retry_at, now, spool_id)
+                    for spool_id, status, message_id, error, retry_at in outcomes
+                ],
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def get(self, spool_id: int):
+        """
+        Return:
+            ``dict`` with ``status`` , ``attempts`` , ``message_id`` and
+            ``error`` , ``None`` for an unknown id
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT status, attempts, message_id, error FROM outbound WHERE id = ?",
+                (spool_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return dict(zip(("status", "attempts", "message_id", "error"), row))
+
+    def dead_letters(self, limit: int = 100):
+        """
+        Return:
+            ``list`` of ``dict`` with ``id`` , ``data`` , ``attempts`` and
+            ``error``
+        """
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT id, message, attempts, error FROM outbound "
+                "WHERE status = ? ORDER BY id LIMIT ?",
+                (DEAD, limit),
+            )
+            .fetchall()
+        )
+        return [
+            {
+                "id": spool_id,
+                "data": json.loads(message)["data"],
+                "attempts": attempts,
+                "error": error,
+            }
+            for spool_id, message, attempts, error in rows
+        ]
+
+    def requeue_dead(self, ids: list = None):
+        """
+        Send dead messages again, all of them or those in ``ids``
+
+        Return:
+            messages requeued: ``int``
+        """
+        now = time.time()
+        query = (
+            "UPDATE outbound SET status = ?, attempts = 0, available_at = ?, "
+            "updated_at = ? WHERE status = ?"
+        )
+        params = [PENDING, now, now, DEAD]
+        if ids is not None:
+            query += " AND id IN ({})".format(", ".join("?" * len(ids)))
+            params.extend(ids)
+        cursor = self._connect().execute(query, params)
+        self._wakeup.set()
+        return cursor.rowcount
+
+    def purge_delivered(self, older_than: float = 0):
+        """
+        Drop delivered messages settled more than ``older_than`` seconds ago
+
+        Return:
+            messages dropped: ``int``
+        """
+        cursor = self._connect().execute(
+            "DELETE FROM outbound WHERE status = ? AND updated_at <= ?",
+            (DELIVERED, time.time() - older_than),
+        )
+        return cursor.rowcount
+
+    def stats(self):
+        """
+        Return:
+            messages per status: ``dict``
+
+                .. code-block:: json
+
+                    {"pending": 12, "sending": 8, "delivered": 10450, "dead": 3}
+        """
+        counts = dict.fromkeys((PENDING, SENDING, DELIVERED, DEAD), 0)
+        counts.update(
+            self._connect().execute(
+                "SELECT status, COUNT(*) FROM outbound GROUP BY status"
+            )
+        )
+        return counts
+
+    def due(self, now: float = None):
+        """Messages claimable now or held by a dispatcher: ``int``"""
+        return (
+            self._connect()
+            .execute(
+                "SELECT COUNT(*) FROM outbound "
+                "WHERE (status = ? AND available_at <= ?) OR status = ?",
+                (PENDING, now or time.time(), SENDING),
+            )
+            .fetchone()[0]
+        )
+
+    def wait(self, timeout: float):
+        """Sleep until a message is spooled in this process or ``timeout``"""
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+
+class SpoolDispatcher:
+    """
+    Background threads draining an ``OutboundSpool`` through a ``Mailgun``
+    client.
+
+    Messages are claimed ``batch_size`` at a time, sent by ``workers``
+    threads and settled in one transaction per batch. Accepted messages
+    are ``delivered`` . A 429 or a server error or a broken connection puts
+    the message back with the ``retry`` backoff, other errors and messages
+    out of attempts are ``dead`` . A message is never lost but can be sent
+    twice if the API accepted it and the answer was lost. Database errors
+    in the background are logged and retried after ``poll_interval`` , only
+    ``stop`` ends the dispatcher.
+
+    Args:
+        mailgun:``Mailgun``
+        spool:``OutboundSpool``
+        workers:``int``
+            messages sent at once, keep the client ``pool_maxsize`` at
+            least as large.
+        batch_size:``int``
+            messages claimed per transaction.
+        poll_interval:``float``
+            seconds between looks at an empty spool, enqueues in this
+            process wake the dispatcher right away.
+        max_attempts:``int``
+            attempts before a message is dead.
+        retry:``RetryPolicy``
+            backoff between attempts, ``Retry-After`` is honored.
+    """
+
+    def __init__(
+        self,
+        mailgun,
+        spool: OutboundSpool,
+        workers: int = 4,
+        batch_size: int = 50,
+        poll_interval: float = 1.0,
+        max_attempts: int = 8,
+        retry: RetryPolicy = None,
+    ):
+        self.mailgun = mailgun
+        self.spool = spool
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry = retry or RetryPolicy(backoff=1, max_backoff=300)
+        self.delivered = 0
+        self.retried = 0
+        self.dead = 0
+        self.errors = 0
+        self.last_error = None
+        # outcomes of sent messages whose settle failed, settled first next time
+        self._unsettled = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+
+    def _send(self, claimed):
+        spool_id, data, files, attempts = claimed
+        try:
+            response = self.mailgun._post_message(data, files)
+        except (requests.ConnectionError, requests.Timeout, CircuitOpen) as e:
+            return self._failed(spool_id, attempts, str(e) or type(e).__name__, None)
+        except Exception as e:
+            return spool_id, DEAD, None, "{}: {}".format(type(e).__name__, e), None
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        if response.ok and payload.get("id"):
+            return spool_id, DELIVERED, payload["id"], None, None
+        error = "{} {}".format(response.status_code, payload.get("message", "")).strip()
+        if self.retry.is_retryable("POST", response.status_code, idempotent=True):
+            return self._failed(spool_id, attempts, error, response.headers)
+        return spool_id, DEAD, None, error, None
+
+    def _failed(self, spool_id, attempts, error, headers):
+        if attempts >= self.max_attempts:
+            return spool_id, DEAD, None, error, None
+        retry_at = time.time() + self.retry.delay(attempts, headers)
+        return spool_id, PENDING, None, error, retry_at
+
+    def drain_once(self):
+        """
+        Claim, send and settle one batch
+
+        Return:
+            messages handled: ``int``
+        """
+        if self._unsettled:
+            self._settle(self._unsettled)
+            self._unsettled = []
+        batch = self.spool.claim(self.batch_size)
+        if not batch:
+            return 0
+        if self._pool is None:
+            outcomes = [self._send(claimed) for claimed in batch]
+        else:
+            outcomes = list(self._pool.map(self._send, batch))
+        try:
+            self._settle(outcomes)
+        except Exception:
+            # the messages went out, keep their outcomes so they are not
+            # sent again once their lease runs out
+            self._unsettled = outcomes
+            raise
+        return len(batch)
+
+    def _settle(self, outcomes):
+        self.spool.settle(outcomes)
+        for outcome in outcomes:
+            if outcome[1] == DELIVERED:
+                self.delivered += 1
+            elif outcome[1] == DEAD:
+                self.dead += 1
+            else:
+                self.retried += 1
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    handled = self.drain_once()
+                except Exception as e:
+                    self.errors += 1
+                    self.last_error = e
+                    logger.exception("Spool dispatcher failed, retrying")
+                    self._stop.wait(self.poll_interval)
+                    continue
+                if handled < self.batch_size:
+                    self.spool.wait(self.poll_interval)
+        finally:
+            self.spool.close()
+
+    def start(self):
+        """Start draining in the background"""
+        if self._thread is not None:
+            raise RuntimeError("Dispatcher already started")
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(self.workers)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        """
+        Stop once the batch in flight is settled, messages left stay in the
+        spool for the next start
+        """
+        self._stop.set()
+        self.spool._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def drain(self, timeout: float = None):
+        """
+        Send until no message is due, in the calling thread when the
+        dispatcher is not started. Messages waiting for a retry later are
+        left.
+
+        Return:
+            ``True`` if nothing is due, ``False`` on ``timeout``
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            if self._thread is None:
+                if not self.drain_once():
+                    return True
+                continue
+            if not self.spool.due():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stats(self):
+        """
+        Return:
+            ``dict`` of this dispatcher ``delivered`` , ``retried`` ,
+            ``dead`` and ``errors`` counts and the spool ``stats``
+        """
+        return {
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dead": self.dead,
+            "errors": self.errors,
+            "spool": self.spool.stats(),
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,159 @@
+"""Streaming download of stored messages"""
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+_ESCAPES = {
+    ord('"'): b'"',
+    ord("\\"): b"\\",
+    ord("/"): b"/",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+}
+# end of a run of plain string characters
+_SPECIAL = re.compile(rb'["\\]')
+# longest key compared, longer strings are skipped without being kept
+_MAX_KEY = 64
+
+
+class JsonFieldStream:
+    """
+    Decode one string field of a top-level JSON object fed in chunks.
+
+    The value is returned piece by piece as UTF-8 bytes while the JSON
+    arrives, the rest of the document is scanned and dropped, so the field
+    is never held in memory as a whole.
+
+    Args:
+        field:``str``
+            key of the field, eg ``"body-mime"`` .
+    """
+
+    def __init__(self, field: str):
+        self.field = field.encode("utf-8")
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        # the key just read, until the next token
+        self._last_string = None
+        # the key matched and its value comes next
+        self._value_next = False
+        self._in_value = False
+        self._key = bytearray()
+        self._escape = None
+        self._high_surrogate = None
+
+    def feed(self, data: bytes):
+        """
+        Scan the next chunk of the JSON
+
+        Return:
+            decoded bytes of the field found in ``data`` : ``bytes``
+        """
+        out = bytearray()
+        i, n = 0, len(data)
+        while i < n and not self.done:
+            if self._in_string:
+                i = self._string(data, i, out)
+                continue
+            c = data[i]
+            i += 1
+            if c in b" \t\r\n":
+                continue
+            if c == 0x3A:  # :
+                self._value_next = self._depth == 1 and self._last_string == self.field
+                self._last_string = None
+                continue
+            self._last_string = None
+            if c == 0x22:  # "
+                self._in_string = True
+                self._in_value = self._value_next
+                self._key.clear()
+            elif c in b"{[":
+                self._depth += 1
+            elif c in b"}]":
+                self._depth -= 1
+            self._value_next = False
+        return bytes(out)
+
+    def _string(self, data: bytes, i: int, out: bytearray):
+        sink = out if self._in_value else None
+        if self._escape is not None:
+            self._unescape(data[i], sink)
+            return i + 1
+        # take the run up to the next quote or backslash in one slice
+        match = _SPECIAL.search(data, i)
+        if match is None:
+            self._write(data[i:], sink)
+            return len(data)
+        end = match.start()
+        self._write(data[i:end], sink)
+        if data[end] == 0x22:
+            self._in_string = False
+            if self._in_value:
+                self.done = True
+            else:
+                self._last_string = bytes(self._key)
+        else:
+            self._escape = bytearray()
+        return end + 1
+
+    def _write(self, data: bytes, sink):
+        if sink is not None:
+            sink += data
+        elif len(self._key) <= _MAX_KEY:
+            self._key += data
+
+    def _unescape(self, c: int, sink):
+        escape = self._escape
+        escape.append(c)
+        if escape[0] != ord("u"):
+            self._escape = None
+            self._write(_ESCAPES.get(escape[0], bytes(escape)), sink)
+            return
+        if len(escape) < 5:
+            return
+        self._escape = None
+        code = int(escape[1:5], 16)
+        if 0xD800 <= code < 0xDC00:
+            # high half of a surrogate pair, wait for the low half
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + code - 0xDC00
+        self._high_surrogate = None
+        self._write(chr(code).encode("utf-8", "surrogatepass"), sink)
+
+
+def iter_mime(response, chunk_size: int = CHUNK_SIZE):
+    """
+    Yield the raw MIME of a stored message response in chunks
+
+    Mailgun answers ``Accept: message/rfc2822`` with JSON holding the
+    message as ``body-mime`` , which is decoded as it arrives. Any other
+    content type is taken as the raw message.
+
+    Args:
+        response: ``requests.Response``
+            opened with ``stream=True``
+        chunk_size: ``int``
+
+    Return:
+        generator of ``bytes``
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if "json" not in content_type:
+        for chunk in response.iter_content(chunk_size):
+            yield chunk
+        return
+
+    field = JsonFieldStream("body-mime")
+    for chunk in response.iter_content(chunk_size):
+        data = field.feed(chunk)
+        if data:
+            yield data
+        if field.done:
+            return
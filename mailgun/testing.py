@@ -0,0 +1,476 @@
+"""In-process stand-in for the Mailgun HTTP API, for tests and benchmarks"""
+import base64
+import csv
+import io
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+
+class StubMailgun:
+    """
+    Request handler emulating the Mailgun endpoints used by the client.
+
+    Every handled request is recorded in ``requests`` as
+    ``(method, path, query)`` .
+
+    Args:
+        domain:``str``
+            domain the stub answers for.
+        latency:``float``
+            seconds every request waits before it is answered.
+        throttle:``float``
+            share of requests answered ``429`` , at random.
+        retry_after:``float``
+            ``Retry-After`` of the throttled answers.
+    """
+
+    def __init__(
+        self,
+        domain: str = "example.com",
+        latency: float = 0,
+        throttle: float = 0,
+        retry_after: float = 0,
+    ):
+        self.domain = domain
+        self.latency = latency
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.throttled = 0
+        self.requests = []
+        self.lists = {}
+        self.stored = {}
+        self.sent = []
+        self.event_log = []
+        self.bulk_jobs = {}
+        self._failures = []
+        self._lock = threading.Lock()
+        self._message_count = 0
+        self._routes = [
+            ("POST", r"/v3/(?P<domain>[^/]+)/messages", self.messages),
+            ("GET", r"/v3/(?P<domain>[^/]+)/events", self.events),
+            ("GET", r"/v3/(?P<domain>[^/]+)/events/(?P<token>[^/]+)", self.events),
+            ("POST", r"/v3/lists", self.list_create),
+            ("DELETE", r"/v3/lists/(?P<address>[^/]+)", self.list_delete),
+            ("POST", r"/v3/lists/(?P<address>[^/]+)/members", self.member_add),
+            (
+                "POST",
+                r"/v3/lists/(?P<address>[^/]+)/members\.json",
+                self.members_upload,
+            ),
+            (
+                "GET",
+                r"/v3/lists/(?P<address>[^/]+)/members/pages",
+                self.member_pages,
+            ),
+            (
+                "PUT",
+                r"/v3/lists/(?P<address>[^/]+)/members/(?P<member>[^/]+)",
+                self.member_update,
+            ),
+            (
+                "DELETE",
+                r"/v3/lists/(?P<address>[^/]+)/members/(?P<member>[^/]+)",
+                self.member_delete,
+            ),
+            ("GET", r"/v4/address/validate", self.validate),
+            ("POST", r"/v4/address/validate/bulk/(?P<list_id>[^/]+)", self.bulk_create),
+            ("GET", r"/v4/address/validate/bulk/(?P<list_id>[^/]+)", self.bulk_status),
+            (
+                "DELETE",
+                r"/v4/address/validate/bulk/(?P<list_id>[^/]+)",
+                self.bulk_cancel,
+            ),
+            (
+                "GET",
+                r"/v4/address/validate/bulk/(?P<list_id>[^/]+)/download",
+                self.bulk_download,
+            ),
+            (
+                "GET",
+                r"/v3/domains/(?P<domain>[^/]+)/messages/(?P<key>[^/]+)",
+                self.stored_message,
+            ),
+        ]
+
+    def handle(self, method: str, path: str, query: dict, headers: dict, body: bytes):
+        """
+        Dispatch one request
+
+        Return:
+            ``(status, headers, body)`` tuple
+        """
+        with self._lock:
+            self.requests.append((method, path, query))
+            failure = self._failures.pop(0) if self._failures else None
+            if failure is None and self.throttle and random.random() < self.throttle:
+                self.throttled += 1
+                failure = (429, self.retry_after)
+        if self.latency:
+            time.sleep(self.latency)
+        if failure:
+            status, retry_after = failure
+            status, headers, body = self._json(status, {"message": "Injected failure"})
+            if retry_after is not None:
+                headers["Retry-After"] = str(retry_after)
+            return status, headers, body
+        for route_method, pattern, view in self._routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                status, payload = view(query, headers, body, **match.groupdict())
+                if isinstance(payload, bytes):
+                    return status, {"Content-Type": "application/zip"}, payload
+                return self._json(status, payload)
+        return self._json(404, {"message": "Not Found"})
+
+    def inject_failures(self, count: int, status: int = 503, retry_after=None):
+        """
+        Answer the next ``count`` requests with ``status`` , and a
+        ``Retry-After`` header when ``retry_after`` is set
+        """
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def _json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        return status, {"Content-Type": "application/json"}, body
+
+    def messages(self, query, headers, body, domain):
+        fields = _fields(headers, body)
+        with self._lock:
+            self._message_count += 1
+            count = self._message_count
+            self.sent.append(fields)
+        return 200, {
+            "id": "<{}@{}>".format(count, domain),
+            "message": "Queued. Thank you.",
+        }
+
+    def add_events(self, events: list):
+        """
+        Add events served by ``/events`` , each needs ``id`` , ``event`` and
+        ``timestamp``
+        """
+        with self._lock:
+            self.event_log.extend(events)
+            self.event_log.sort(key=lambda e: e["timestamp"])
+
+    def events(self, query, headers, body, domain, token=None):
+        if token:
+            params = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        else:
+            params = {k: v[0] for k, v in query.items()}
+            params["offset"] = 0
+
+        begin, end = params.get("begin"), params.get("end")
+        if "ascending" in params:
+            ascending = params["ascending"] == "yes"
+        elif begin and end:
+            ascending = float(begin) < float(end)
+        else:
+            ascending = bool(begin)
+        if begin and end:
+            low, high = sorted((float(begin), float(end)))
+        elif begin:
+            low, high = (float(begin), None) if ascending else (None, float(begin))
+        elif end:
+            low, high = (None, float(end)) if ascending else (float(end), None)
+        else:
+            low = high = None
+        wanted = set(params["event"].split(" OR ")) if params.get("event") else None
+
+        with self._lock:
+            items = [
+                e
+                for e in self.event_log
+                if (low is None or e["timestamp"] >= low)
+                and (high is None or e["timestamp"] <= high)
+                and (wanted is None or e["event"] in wanted)
+            ]
+        if not ascending:
+            items.reverse()
+
+        offset, limit = params["offset"], int(params.get("limit", 100))
+        page = items[offset : offset + limit]
+        params["offset"] = offset + len(page)
+        token = base64.urlsafe_b64encode(json.dumps(params).encode("utf-8"))
+        host = {k.lower(): v for k, v in headers.items()}.get("host", "localhost")
+        next_url = "http://{}/v3/{}/events/{}".format(host, domain, token.decode())
+        return 200, {"items": page, "paging": {"next": next_url}}
+
+    def list_create(self, query, headers, body):
+        address = _form(body).get("address")
+        self.lists[address] = {}
+        return 200, {"message": "Mailing list has been created"}
+
+    def list_delete(self, query, headers, body, address):
+        self.lists.pop(address, None)
+        return 200, {"message": "Mailing list has been removed"}
+
+    def member_add(self, query, headers, body, address):
+        member = _form(body)
+        self.lists.setdefault(address, {})[member.get("address")] = member
+        return 200, {"message": "Mailing list member has been created"}
+
+    def members_upload(self, query, headers, body, address):
+        form = _form(body)
+        upsert = form.get("upsert", "no") == "yes"
+        members = self.lists.setdefault(address, {})
+        for member in json.loads(form["members"]):
+            if isinstance(member, str):
+                member = {"address": member}
+            if member["address"] in members and not upsert:
+                continue
+            members[member["address"]] = member
+        return 200, {
+            "list": {"address": address, "members_count": len(members)},
+            "message": "Mailing list has been updated",
+        }
+
+    def member_pages(self, query, headers, body, address):
+        """Members sorted by address, ``page=next`` starts after ``address``"""
+        limit = int(query.get("limit", ["100"])[0])
+        after = query.get("address", [""])[0] if "page" in query else ""
+        with self._lock:
+            members = sorted(self.lists.get(address, {}).values(), key=_address)
+        items = [_member(m) for m in members if m["address"] > after][:limit]
+        host = {k.lower(): v for k, v in headers.items()}.get("host", "localhost")
+        url = "http://{}/v3/lists/{}/members/pages".format(host, address)
+        paging = {"first": "{}?limit={}".format(url, limit)}
+        if items:
+            paging["next"] = "{}?page=next&address={}&limit={}".format(
+                url, quote(items[-1]["address"]), limit
+            )
+        return 200, {"items": items, "paging": paging}
+
+    def member_update(self, query, headers, body, address, member):
+        members = self.lists.setdefault(address, {})
+        members.setdefault(member, {"address": member}).update(_form(body))
+        return 200, {"message": "Mailing list member has been updated"}
+
+    def member_delete(self, query, headers, body, address, member):
+        self.lists.get(address, {}).pop(member, None)
+        return 200, {"message": "Mailing list member has been deleted"}
+
+    def validate(self, query, headers, body):
+        address = query.get("address", [""])[0]
+        risk = "low" if "@" in address else "high"
+        return 200, {"address": address, "risk": risk}
+
+    def bulk_create(self, query, headers, body, list_id):
+        _, content = _fields(headers, body)["file"][0]
+        rows = csv.DictReader(io.StringIO(content.decode("utf-8")))
+        results = [
+            self.validate({"address": [row["email"]]}, {}, b"")[1] for row in rows
+        ]
+        with self._lock:
+            self.bulk_jobs[list_id] = {"results": results, "polls": 0}
+        return 202, {"id": list_id, "message": "The validation job was submitted."}
+
+    def bulk_status(self, query, headers, body, list_id):
+        """A job is processing on its first poll and done on the next"""
+        with self._lock:
+            job = self.bulk_jobs.get(list_id)
+            if job is None:
+                return 404, {"message": "Validation job not found"}
+            job["polls"] += 1
+            done = job["polls"] > 1
+        status = {
+            "id": list_id,
+            "quantity": len(job["results"]),
+            "records_processed": len(job["results"]) if done else 0,
+            "status": "uploaded" if done else "processing",
+        }
+        if done:
+            host = {k.lower(): v for k, v in headers.items()}.get("host", "localhost")
+            url = "http://{}/v4/address/validate/bulk/{}/download".format(host, list_id)
+            status["download_url"] = {"csv": url, "json": url + "?format=json"}
+        return 200, status
+
+    def bulk_cancel(self, query, headers, body, list_id):
+        with self._lock:
+            self.bulk_jobs.pop(list_id, None)
+        return 200, {"message": "Validation job canceled."}
+
+    def bulk_download(self, query, headers, body, list_id):
+        """Results as a zip archive holding one CSV file"""
+        with self._lock:
+            job = self.bulk_jobs.get(list_id)
+        if job is None:
+            return 404, {"message": "Validation job not found"}
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(["address", "risk"])
+        for result in job["results"]:
+            writer.writerow([result["address"], result["risk"]])
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as z:
+            z.writestr("{}.csv".format(list_id), text.getvalue())
+        return 200, archive.getvalue()
+
+    def stored_message(self, query, headers, body, domain, key):
+        if key not in self.stored:
+            return 404, {"message": "Message not found"}
+        return 200, {"body-mime": self.stored[key]}
+
+    def store_message(self, key: str, body_mime: str):
+        """
+        Keep a message for the storage endpoint
+
+        Return:
+            path of the stored message: ``str``
+        """
+        self.stored[key] = body_mime
+        return "/v3/domains/{}/messages/{}".format(self.domain, key)
+
+
+def _address(member: dict):
+    return member["address"]
+
+
+def _member(member: dict):
+    """A stored member as the API lists it"""
+    variables = member.get("vars") or {}
+    if isinstance(variables, str):
+        variables = json.loads(variables)
+    subscribed = member.get("subscribed", True)
+    if isinstance(subscribed, str):
+        subscribed = subscribed.lower() in ("yes", "true", "1")
+    return {
+        "address": member["address"],
+        "name": member.get("name", ""),
+        "vars": variables,
+        "subscribed": subscribed,
+    }
+
+
+def _form(body: bytes):
+    return {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+
+
+def _fields(headers: dict, body: bytes):
+    """
+    Form fields of an urlencoded or multipart body as lists, attachments as
+    ``(filename, content)`` tuples
+    """
+    content_type = ""
+    for key, value in headers.items():
+        if key.lower() == "content-type":
+            content_type = value
+    if not content_type.startswith("multipart/"):
+        return parse_qs(body.decode("utf-8"))
+
+    message = BytesParser().parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    fields = {}
+    for part in message.get_payload():
+        name = part.get_param("name", header="content-disposition")
+        content = part.get_payload(decode=True)
+        if part.get_filename():
+            value = (part.get_filename(), content)
+        else:
+            value = content.decode("utf-8")
+        fields.setdefault(name, []).append(value)
+    return fields
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stub.connections += 1
+
+    def _dispatch(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = self._read_chunked()
+        else:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+        split = urlsplit(self.path)
+        status, headers, payload = self.server.stub.app.handle(
+            self.command, split.path, parse_qs(split.query), dict(self.headers), body
+        )
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            if not size:
+                self.rfile.readline()
+                return b"".join(chunks)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    Serve a ``StubMailgun`` over local HTTP on a background thread.
+
+    Args:
+        app:``StubMailgun``
+            request handler, a new ``StubMailgun`` when omitted.
+        host:``str``
+        port:``int``
+            ``0`` picks a free port.
+
+    Example:
+
+        .. code-block:: python
+
+            with StubServer() as server:
+                mail = Mailgun("key", "example.com")
+                mail.base_url = server.base_url()
+                mail.send_message(...)
+    """
+
+    def __init__(self, app: StubMailgun = None, host: str = "127.0.0.1", port: int = 0):
+        self.app = app or StubMailgun()
+        self.connections = 0
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def base_url(self, version: str = "v3"):
+        """URL to assign to ``Mailgun.base_url``"""
+        return "{}/{}/".format(self.url, version)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,271 @@
+"""Transports carrying the client requests: HTTP, in memory or recorded"""
+import base64
+import io
+import json
+import threading
+from collections import defaultdict, deque
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .error import NoRecording
+
+# API root of each Mailgun region
+API_URLS = {"us": "https://api.mailgun.net", "eu": "https://api.eu.mailgun.net"}
+_TRANSFER_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def region_url(region: str = "us"):
+    """
+    API root of a region
+
+    Args:
+        region: ``str``
+            ``"us"`` or ``"eu"``
+
+    Return:
+        ``str``
+    """
+    try:
+        return API_URLS[region.lower()]
+    except KeyError:
+        raise ValueError(
+            "Unknown region {!r}, expected one of {}".format(
+                region, ", ".join(sorted(API_URLS))
+            )
+        ) from None
+
+
+class HTTPTransport:
+    """
+    Requests over a pooled keep-alive ``requests.Session`` , the default.
+
+    Args:
+        pool_connections:``int``
+            number of per-host connection pools to keep.
+        pool_maxsize:``int``
+            maximum number of kept-alive connections per host.
+        pool_block:``bool``
+            block when every connection of a host is busy.
+        keep_alive:``bool``
+            ``False`` closes the connection after every request.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+    ):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+        self.session = session
+
+    def request(self, method: str, url: str, **kwargs):
+        """
+        Send a request, keyword arguments as ``requests.request`` takes them
+
+        Return:
+            ``requests.Response``
+        """
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def _prepare(method: str, url: str, kwargs: dict):
+    request = requests.Request(
+        method,
+        url,
+        params=kwargs.get("params"),
+        data=kwargs.get("data"),
+        files=kwargs.get("files"),
+        json=kwargs.get("json"),
+        headers=kwargs.get("headers"),
+        auth=kwargs.get("auth"),
+    )
+    return request.prepare()
+
+
+def _body(prepared):
+    body = prepared.body
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if isinstance(body, bytes):
+        return body
+    if hasattr(body, "read"):
+        return body.read()
+    return b"".join(body)
+
+
+def make_response(prepared, status: int, headers: dict, body: bytes):
+    """
+    A ``requests.Response`` answering ``prepared`` , read lazily from
+    ``body`` so streaming works like over HTTP
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.headers.setdefault("Content-Length", str(len(body)))
+    response.raw = io.BytesIO(body)
+    response.url = prepared.url
+    response.request = prepared
+    response.reason = "OK" if status < 400 else "Error"
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+class InMemoryTransport:
+    """
+    Answer requests in the same process with a ``StubMailgun`` , no socket
+    involved, for tests and load simulations of code using the client.
+
+    Args:
+        app:``StubMailgun``
+            a new one when omitted, set its ``latency`` or ``throttle`` to
+            simulate a slow or rate limiting API.
+
+    Example:
+
+        .. code-block:: python
+
+            transport = InMemoryTransport()
+            mailgun = Mailgun("key", "example.com", transport=transport)
+            mailgun.send_message(...)
+            transport.app.sent
+    """
+
+    def __init__(self, app=None):
+        if app is None:
+            from .testing import StubMailgun
+
+            app = StubMailgun()
+        self.app = app
+
+    def request(self, method: str, url: str, **kwargs):
+        prepared = _prepare(method, url, kwargs)
+        split = urlsplit(prepared.url)
+        headers = dict(prepared.headers)
+        headers.setdefault("Host", split.netloc)
+        status, response_headers, body = self.app.handle(
+            method, split.path, parse_qs(split.query), headers, _body(prepared)
+        )
+        return make_response(prepared, status, response_headers, body)
+
+    def close(self):
+        pass
+
+
+class RecordReplayTransport:
+    """
+    Record the responses of another transport to a cassette file, or play
+    them back without it.
+
+    The cassette holds one JSON object per line with the method, URL and
+    response. In ``"replay"`` mode every request gets the next recorded
+    response of the same method and URL, request bodies are not compared,
+    and a request with no recorded response left raises ``NoRecording`` .
+    Request headers and credentials are never written.
+
+    Args:
+        cassette:``str``
+            path of the cassette file.
+        mode:``str``
+            ``"record"`` or ``"replay"`` .
+        transport:
+            transport recorded, a new ``HTTPTransport`` when omitted.
+
+    Example:
+
+        .. code-block:: python
+
+            recorder = RecordReplayTransport("sync.jsonl", "record")
+            Mailgun(transport=recorder).sync_list("newsletter", members)
+            recorder.close()
+
+            # later, without network
+            Mailgun(transport=RecordReplayTransport("sync.jsonl"))
+    """
+
+    def __init__(self, cassette: str, mode: str = "replay", transport=None):
+        if mode not in ("record", "replay"):
+            raise ValueError("mode must be 'record' or 'replay'")
+        self.cassette = cassette
+        self.mode = mode
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._recordings = defaultdict(deque)
+        self._file = None
+        if mode == "record":
+            if self.transport is None:
+                self.transport = HTTPTransport()
+            self._file = open(cassette, "a", encoding="utf-8")
+        else:
+            self._load()
+
+    def _load(self):
+        with open(self.cassette, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings[(entry["method"], entry["url"])].append(entry)
+
+    def request(self, method: str, url: str, **kwargs):
+        if self.mode == "replay":
+            prepared = _prepare(method, url, kwargs)
+            with self._lock:
+                recorded = self._recordings.get((method, prepared.url))
+                entry = recorded.popleft() if recorded else None
+            if entry is None:
+                raise NoRecording("No recorded response for {} {}".format(method, url))
+            if "body_base64" in entry:
+                body = base64.b64decode(entry["body_base64"])
+            else:
+                body = entry["body"].encode("utf-8")
+            return make_response(prepared, entry["status"], entry["headers"], body)
+
+        # only the url is needed, the body may be a stream sent once
+        prepared = _prepare(method, url, {"params": kwargs.get("params")})
+        response = self.transport.request(method, url, **kwargs)
+        body = response.content
+        # the body is kept decoded, its transfer headers no longer apply
+        headers = {
+            key: value
+            for key, value in response.headers.items()
+            if key.lower() not in _TRANSFER_HEADERS
+        }
+        entry = {
+            "method": method,
+            "url": prepared.url,
+            "status": response.status_code,
+            "headers": headers,
+        }
+        try:
+            entry["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["body_base64"] = base64.b64encode(body).decode("ascii")
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+        return make_response(response.request, response.status_code, headers, body)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.transport is not None:
+            self.transport.close()
@@ -0,0 +1,21 @@
+"""Small helpers shared by the clients"""
+from itertools import islice
+
+
+def chunked(iterable, size: int):
+    """
+    Yield lists of at most ``size`` items, consuming ``iterable`` lazily
+
+    Args:
+        iterable: ``iterable``
+        size: ``int``
+
+    Return:
+        generator of ``list``
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,321 @@
+"""Validation of many addresses, one call per address or as bulk jobs"""
+import csv
+import io
+import itertools
+import re
+import tempfile
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .bulk import TokenBucket
+from .cache import normalize_address
+from .multipart import MultipartEncoder
+
+ValidationResult = namedtuple(
+    "ValidationResult", ["index", "address", "payload", "error"]
+)
+ValidationResult.__doc__ = """
+Outcome of one input address: ``payload`` is the validation API response,
+or the local verdict when it has ``checked_locally`` , ``error`` the
+exception of a failed call.
+"""
+
+# RFC 2606 / RFC 6761 names that never receive mail
+RESERVED_TLDS = {"test", "example", "invalid", "localhost", "local"}
+RESERVED_DOMAINS = {"example.com", "example.net", "example.org"}
+
+_LABEL = re.compile(r"(?!-)[a-z0-9-]{1,63}(?<!-)")
+_LOCAL = re.compile(r"[a-z0-9!#$%&'*+/=?^_`{|}~.-]+")
+
+
+def local_check(address: str):
+    """
+    Verdict for an address that can not pass validation, without calling
+    the API
+
+    Args:
+        address: ``str``
+
+    Return:
+        undeliverable payload: ``dict`` , ``None`` when only the API can tell
+    """
+    key = normalize_address(address)
+    local, _, domain = key.rpartition("@")
+    reason = None
+    if (
+        not local
+        or len(key) > 254
+        or len(local) > 64
+        or not _LOCAL.fullmatch(local)
+        or local.startswith(".")
+        or local.endswith(".")
+        or ".." in local
+    ):
+        reason = "invalid_syntax"
+    else:
+        try:
+            labels = domain.encode("idna").decode("ascii").split(".")
+        except UnicodeError:
+            labels = []
+        if (
+            len(labels) < 2
+            or not all(_LABEL.fullmatch(label) for label in labels)
+            or labels[-1].isdigit()
+        ):
+            reason = "invalid_domain"
+        elif labels[-1] in RESERVED_TLDS or ".".join(labels[-2:]) in RESERVED_DOMAINS:
+            reason = "reserved_domain"
+    if reason is None:
+        return None
+    return {
+        "address": address,
+        "is_disposable_address": False,
+        "is_role_address": False,
+        "reason": [reason],
+        "result": "undeliverable",
+        "risk": "high",
+        "checked_locally": True,
+    }
+
+
+def validate_many(
+    mailgun,
+    addresses,
+    workers: int = 8,
+    rate: float = None,
+    ordered: bool = True,
+    max_in_flight: int = None,
+    check_locally: bool = True,
+):
+    """
+    Validate many addresses concurrently, each distinct address once
+
+    Addresses are normalized like ``ValidationCache`` keys, so duplicates
+    share one call, and with ``check_locally`` those failing ``local_check``
+    never reach the API. Calls go through ``validate_address`` , a client
+    ``validation_cache`` is used too.
+
+    Args:
+        mailgun: ``Mailgun``
+        addresses: ``iterable``
+            of ``str``
+        workers: ``int``
+            threads calling the API
+        rate: ``float``
+            calls per second, ``None`` for no limit
+        ordered: ``bool``
+            yield in input order, otherwise as each address is validated
+        max_in_flight: ``int``
+            calls submitted at once, defaults to ``4 * workers``
+        check_locally: ``bool``
+
+    Return:
+        generator of ``ValidationResult`` , one per input address, a call
+        answered with an HTTP error has it as ``error`` and no ``payload``
+
+    Example:
+
+        .. code-block:: python
+
+            for result in validate_many(mailgun, emails, workers=16, rate=50):
+                if result.payload and result.payload["risk"] == "high":
+                    print(result.address, result.payload["reason"])
+    """
+    bucket = TokenBucket(rate)
+    max_in_flight = max_in_flight or 4 * workers
+    # input read ahead of the first unanswered address, in order mode
+    max_waiting = 8 * max_in_flight
+    # verdict of every distinct address seen, so duplicates cost nothing
+    resolved = {}
+    running = {}
+    waiting = deque()
+    waiters = {}
+
+    def call(address):
+        bucket.acquire()
+        # an error body, eg of a throttled call, is not a verdict
+        return mailgun.validate_address(address, raise_errors=True)
+
+    def result(index, address, key):
+        payload, error = resolved[key]
+        return ValidationResult(index, address, payload, error)
+
+    def settle(done):
+        for future in done:
+            key = running.pop(future)
+            try:
+                resolved[key] = (future.result(), None)
+            except Exception as e:
+                resolved[key] = (None, e)
+            queued = waiters.pop(key)
+            if not ordered:
+                for index, address in queued:
+                    yield result(index, address, key)
+
+    def flush():
+        while waiting and waiting[0][2] in resolved:
+            yield result(*waiting.popleft())
+
+    with ThreadPoolExecutor(workers) as pool:
+        for index, address in enumerate(addresses):
+            key = normalize_address(address)
+            if key not in resolved and key not in waiters:
+                payload = local_check(address) if check_locally else None
+                if payload is not None:
+                    resolved[key] = (payload, None)
+                else:
+                    running[pool.submit(call, address)] = key
+                    waiters[key] = []
+
+            if ordered:
+                waiting.append((index, address, key))
+                yield from flush()
+            elif key in resolved:
+                yield result(index, address, key)
+            else:
+                waiters[key].append((index, address))
+
+            while running and (
+                len(running) >= max_in_flight or len(waiting) >= max_waiting
+            ):
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                yield from settle(done)
+                yield from flush()
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            yield from settle(done)
+            yield from flush()
+
+
+def bulk_validation_url(mailgun, list_id: str = None):
+    """URL of the bulk validation jobs, or of one job"""
+    url = mailgun.validate_url + "/bulk"
+    return url + "/" + list_id if list_id else url
+
+
+def create_bulk_validation(mailgun, list_id: str, addresses):
+    """
+    Start a bulk validation job for a list of addresses
+
+    The addresses are written to a CSV file, spilled to disk past a few
+    megabytes, and uploaded as the job input.
+
+    Args:
+        mailgun: ``Mailgun``
+        list_id: ``str``
+            name of the job
+        addresses: ``iterable``
+            of ``str``
+
+    Return:
+        Response from API: ``dict``
+    """
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as f:
+        # a TextIOWrapper needs a SpooledTemporaryFile of Python 3.11, rows
+        # are encoded one at a time instead
+        row = io.StringIO()
+        writer = csv.writer(row)
+        for address in itertools.chain(["email"], addresses):
+            writer.writerow([address])
+            f.write(row.getvalue().encode("utf-8"))
+            row.seek(0)
+            row.truncate()
+        f.seek(0)
+        body = MultipartEncoder({}, [("file", ("{}.csv".format(list_id), f))])
+        try:
+            response = mailgun._request(
+                "POST",
+                bulk_validation_url(mailgun, list_id),
+                data=body,
+                headers={"Content-Type": body.content_type},
+            )
+        finally:
+            body.close()
+    return response.json()
+
+
+def get_bulk_validation(mailgun, list_id: str):
+    """
+    Status of a bulk validation job, with its ``download_url`` once done
+
+    Return:
+        Response from API: ``dict``
+    """
+    return mailgun._request("GET", bulk_validation_url(mailgun, list_id)).json()
+
+
+def cancel_bulk_validation(mailgun, list_id: str):
+    """
+    Cancel a bulk validation job
+
+    Return:
+        Response from API: ``dict``
+    """
+    return mailgun._request("DELETE", bulk_validation_url(mailgun, list_id)).json()
+
+
+def wait_bulk_validation(
+    mailgun, list_id: str, interval: float = 10, timeout: float = None
+):
+    """
+    Poll a bulk validation job until its results can be downloaded or it
+    failed
+
+    Args:
+        mailgun: ``Mailgun``
+        list_id: ``str``
+        interval: ``float``
+            seconds between polls
+        timeout: ``float``
+            seconds before giving up with ``TimeoutError``
+
+    Return:
+        last job status: ``dict``
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        status = get_bulk_validation(mailgun, list_id)
+        if status.get("download_url") or status.get("status") == "failed":
+            return status
+        if deadline is not None and time.monotonic() + interval > deadline:
+            raise TimeoutError(
+                "Bulk validation {} is still {}".format(list_id, status.get("status"))
+            )
+        time.sleep(interval)
+
+
+def download_bulk_validation(
+    mailgun, status: dict, destination, format: str = "csv", chunk_size: int = 65536
+):
+    """
+    Save the results of a finished bulk validation job
+
+    Args:
+        mailgun: ``Mailgun``
+        status: ``dict``
+            returned by ``wait_bulk_validation``
+        destination: ``str`` or file object
+        format: ``str``
+            ``"csv"`` or ``"json"`` , both are zip archives
+
+    Return:
+        bytes written: ``int``
+    """
+    if isinstance(destination, str):
+        with open(destination, "wb") as f:
+            return download_bulk_validation(mailgun, status, f, format, chunk_size)
+
+    url = status["download_url"][format]
+    # a pre-signed link, the API credentials must not be sent along
+    response = mailgun.transport.request(
+        "GET", url, stream=True, timeout=mailgun.timeout
+    )
+    with response:
+        response.raise_for_status()
+        written = 0
+        for chunk in response.iter_content(chunk_size):
+            destination.write(chunk)
+            written += len(chunk)
+    return written
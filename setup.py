@@ -13,9 +13,10 @@ setup(
     author="Docsumo",
     author_email="hello@docsumo.com",
     license="MIT",
-    python_requires=">=3",
+    python_requires=">=3.9",
     packages=["mailgun"],
     install_requires=["requests"],
+    extras_require={"async": ["aiohttp"]},
     classifiers=[
         "Intended Audience :: Education",
         "Intended Audience :: Science/Research",
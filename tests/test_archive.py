@@ -0,0 +1,75 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun.archive import extract_zip
+from mailgun.email_parsing import allowed_file
+from mailgun.error import ArchiveLimitExceeded
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return buffer.getvalue()
+
+
+class TestExtractZip(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self.dir.name, "out")
+        os.makedirs(self.out)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def archive(self, members):
+        path = os.path.join(self.dir.name, "in.zip")
+        with open(path, "wb") as f:
+            f.write(zip_bytes(members))
+        return path
+
+    def test_filters_members_and_follows_nested(self):
+        path = self.archive(
+            {
+                "a.pdf": b"pdf",
+                "big.iso": os.urandom(10000),
+                "scans/b.png": b"png",
+                "inner.zip": zip_bytes({"c.jpg": b"jpg", "d.exe": b"exe"}),
+                "../escape.pdf": b"nope",
+            }
+        )
+        extracted = extract_zip(path, self.out, allowed=allowed_file)
+        names = sorted(os.path.relpath(p, self.out) for p in extracted)
+        self.assertEqual(names, ["a.pdf", "c.jpg", os.path.join("scans", "b.png")])
+        self.assertEqual(sorted(os.listdir(self.out)), ["a.pdf", "c.jpg", "scans"])
+        self.assertFalse(os.path.exists(os.path.join(self.dir.name, "escape.pdf")))
+
+    def test_not_nested(self):
+        path = self.archive({"inner.zip": zip_bytes({"c.jpg": b"jpg"})})
+        self.assertEqual(
+            extract_zip(path, self.out, allowed=allowed_file, nested=False), []
+        )
+
+    def test_zip_bomb_ratio(self):
+        path = self.archive({"bomb.pdf": b"\0" * (20 * 1024 * 1024)})
+        with self.assertRaises(ArchiveLimitExceeded):
+            extract_zip(path, self.out, allowed=allowed_file)
+        self.assertEqual(os.listdir(self.out), [])
+
+    def test_total_size_and_members(self):
+        path = self.archive({"{}.pdf".format(i): os.urandom(1000) for i in range(5)})
+        with self.assertRaises(ArchiveLimitExceeded):
+            extract_zip(path, self.out, max_total_size=3500)
+        with self.assertRaises(ArchiveLimitExceeded):
+            extract_zip(path, self.out, max_members=4)
+        self.assertEqual(len(extract_zip(path, self.out)), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
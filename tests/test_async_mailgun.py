@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import RetryPolicy, async_mailgun
+from mailgun.testing import StubServer
+
+
+@unittest.skipIf(async_mailgun.aiohttp is None, "aiohttp not installed")
+class TestAsyncMailgun(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def client(self, **kwargs):
+        mail = async_mailgun.AsyncMailgun("key", "example.com", **kwargs)
+        mail.base_url = self.server.base_url()
+        mail.validate_url = self.server.base_url("v4") + "address/validate"
+        return mail
+
+    def test_concurrent_sends_share_pool(self):
+        async def run():
+            async with self.client(concurrency=8) as mail:
+                return await asyncio.gather(
+                    *[
+                        mail.send_message("a@example.com", "b@example.com", "hi", "x")
+                        for _ in range(200)
+                    ]
+                )
+
+        results = asyncio.run(run())
+        self.assertEqual(len({r["id"] for r in results}), 200)
+        self.assertLessEqual(self.server.connections, 8)
+
+    def test_api_surface(self):
+        path = self.server.app.store_message("key1", "Subject: hi\n\nhello")
+
+        async def run():
+            async with self.client() as mail:
+                await mail.mailing_list_create("test", "Welcome")
+                await mail.mailing_list_add_email("test", {"address": "b@example.com"})
+                await mail.mailing_list_update_email(
+                    "test", "b@example.com", {"name": "Bob"}
+                )
+                valid = await mail.validated_email("b@example.com")
+                mime = await mail.get_message_mime(self.server.url + path)
+                return valid, mime
+
+        valid, mime = asyncio.run(run())
+        self.assertTrue(valid)
+        self.assertEqual(mime["body-mime"], "Subject: hi\n\nhello")
+        self.assertEqual(
+            self.server.app.lists["test@example.com"]["b@example.com"]["name"], "Bob"
+        )
+
+    def test_send_batch_failure(self):
+        recipients = [("user{}@example.com".format(i), {}) for i in range(4)]
+        self.server.app.inject_failures(1, status=400)
+
+        async def run():
+            async with self.client() as mail:
+                return await mail.send_batch(
+                    "a@example.com", recipients, "Hi", text_body="x", batch_size=2
+                )
+
+        results = asyncio.run(run())
+        self.assertEqual([r["ok"] for r in results], [False, True])
+        self.assertEqual(results[0]["status"], 400)
+        self.assertEqual(results[0]["failed"], recipients[:2])
+        self.assertEqual(results[1]["response"]["message"], "Queued. Thank you.")
+
+    def test_retry(self):
+        async def run():
+            async with self.client(retry=RetryPolicy(backoff=0.001)) as mail:
+                self.server.app.inject_failures(2, status=503)
+                logs = await mail.get_logs()
+                self.server.app.inject_failures(1, status=429)
+                sent = await mail.send_message(
+                    "a@example.com",
+                    "b@example.com",
+                    "hi",
+                    "x",
+                    files=[("a.txt", b"abc")],
+                )
+                return logs, sent
+
+        logs, sent = asyncio.run(run())
+        self.assertEqual(logs["items"], [])
+        self.assertIn("id", sent)
+        self.assertEqual(self.server.app.sent[-1]["attachment"], [("a.txt", b"abc")])
+        self.assertEqual(len(self.server.app.requests), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import AttachmentBundle, Mailgun
+from mailgun.testing import StubServer
+
+PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "files", "data.pdf")
+
+
+class TestAttachmentBundle(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+        with open(PDF, "rb") as f:
+            self.pdf = f.read()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_reused_across_threads(self):
+        with AttachmentBundle(
+            [PDF, ("notes.txt", b"shared notes")], mmap_threshold=1
+        ) as bundle:
+            self.assertIsNotNone(bundle.attachments[0]._mmap)
+
+            def send():
+                self.mail.send_message(
+                    "a@example.com", "b@example.com", "hi", "x", files=bundle
+                )
+
+            threads = [threading.Thread(target=send) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(self.server.app.sent), 8)
+        for sent in self.server.app.sent:
+            self.assertEqual(
+                sent["attachment"],
+                [("data.pdf", self.pdf), ("notes.txt", b"shared notes")],
+            )
+
+    def test_small_files_are_read(self):
+        bundle = AttachmentBundle([PDF])
+        self.assertIsNone(bundle.attachments[0]._mmap)
+        self.assertEqual(bundle.attachments[0].size, len(self.pdf))
+        bundle.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Mailgun
+from mailgun.multipart import MultipartEncoder
+from mailgun.testing import StubServer
+
+PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "files", "data.pdf")
+
+
+class SpyReader(io.BytesIO):
+    largest_read = 0
+
+    def read(self, size=-1):
+        self.largest_read = max(self.largest_read, size)
+        return super().read(size)
+
+
+class TestStreamingAttachments(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_paths_bytes_and_file_objects(self):
+        with open(PDF, "rb") as f:
+            pdf = f.read()
+        r = self.mail.send_message(
+            "a@example.com",
+            "b@example.com",
+            "hi",
+            text_body="x",
+            files=[
+                PDF,
+                ("report.pdf", b"generated"),
+                ("view.txt", memoryview(b"from a view")),
+                io.BytesIO(b"anonymous"),
+            ],
+        )
+        self.assertEqual(r["message"], "Queued. Thank you.")
+        sent = self.server.app.sent[0]
+        self.assertEqual(
+            sent["attachment"],
+            [
+                ("data.pdf", pdf),
+                ("report.pdf", b"generated"),
+                ("view.txt", b"from a view"),
+                ("attachment-3", b"anonymous"),
+            ],
+        )
+        self.assertEqual(sent["text"], ["x"])
+
+    def test_reads_in_chunks(self):
+        source = SpyReader(os.urandom(1024 * 1024))
+        body = MultipartEncoder({"to": "b@example.com"}, [("attachment", source)])
+        total = sum(len(chunk) for chunk in body)
+        self.assertEqual(total, body.len)
+        self.assertLessEqual(source.largest_read, body.chunk_size)
+
+    def test_unknown_size_is_chunked(self):
+        class Pipe:
+            def __init__(self):
+                self.data = io.BytesIO(b"piped")
+
+            def read(self, size=-1):
+                return self.data.read(size)
+
+        body = MultipartEncoder({}, [("attachment", ("pipe.bin", Pipe()))])
+        self.assertIsNone(body.len)
+        self.mail.send_message(
+            "a@example.com", "b@example.com", "hi", files=[("pipe.bin", Pipe())]
+        )
+        self.assertEqual(
+            self.server.app.sent[0]["attachment"], [("pipe.bin", b"piped")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
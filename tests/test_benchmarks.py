@@ -0,0 +1,46 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from benchmarks.suite import regressions, run
+from mailgun import Mailgun, RetryPolicy
+from mailgun.testing import StubMailgun, StubServer
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_throttled_stub(self):
+        with StubServer(StubMailgun(throttle=0.5)) as server:
+            mail = Mailgun(
+                "key", "example.com", retry=RetryPolicy(retries=20, backoff=0)
+            )
+            mail.base_url = server.base_url()
+            for _ in range(20):
+                self.assertEqual(mail.get_logs()["items"], [])
+            self.assertGreater(server.app.throttled, 0)
+            self.assertEqual(len(server.app.requests), 20 + server.app.throttled)
+
+    def test_suite(self):
+        config = {
+            "messages": 50,
+            "workers": 4,
+            "events": 700,
+            "members": 1500,
+            "parse_mb": 0.1,
+            "latency": 0,
+            "throttle": 0.1,
+        }
+        results = run(config, ["send", "events", "lists", "parse"], isolate=False)
+        self.assertEqual(results["send"]["failed"], 0)
+        self.assertEqual(results["events"]["events"], 700)
+        self.assertEqual(results["lists"]["failed_chunks"], 0)
+        self.assertEqual(len(results["parse"]["corpora"]), 4)
+        for result in results.values():
+            self.assertGreater(result["peak_rss_mb"], 0)
+
+        baseline = {"results": {"send": {"requests_per_second": 1e9}}}
+        self.assertEqual(regressions(results, baseline, 0.2)[0][0], "send")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import BulkSender, Mailgun, TokenBucket
+from mailgun.testing import StubServer
+
+
+def messages(count):
+    for i in range(count):
+        yield {
+            "sender_email": "a@example.com",
+            "to": "user{}@example.com".format(i),
+            "subject": "hi",
+            "text_body": "x",
+        }
+
+
+class TestBulkSender(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_send_all(self):
+        sender = BulkSender(self.mail, workers=4, max_in_flight=6)
+        results = list(sender.send(messages(50)))
+        self.assertEqual(sorted(r.index for r in results), list(range(50)))
+        self.assertTrue(all(r.message_id for r in results))
+        self.assertEqual(sender.stats()["sent"], 50)
+        self.assertGreater(sender.throughput, 0)
+
+    def test_errors_are_results(self):
+        sender = BulkSender(self.mail, workers=2)
+        results = list(sender.send([{"to": "b@example.com"}]))
+        self.assertIsInstance(results[0].error, TypeError)
+        self.assertEqual(sender.stats()["failed"], 1)
+
+    def test_rate_limit(self):
+        sender = BulkSender(self.mail, workers=4, rate=100, burst=1)
+        start = time.monotonic()
+        list(sender.send(messages(21)))
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+        sender.set_rate(None)
+        self.assertIsNone(sender.stats()["rate"])
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=50, burst=5)
+        start = time.monotonic()
+        for _ in range(10):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_pause(self):
+        bucket = TokenBucket(rate=50)
+        bucket.set_rate(0)
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (bucket.acquire(), done.set()))
+        thread.start()
+        self.assertFalse(done.wait(0.3))
+        bucket.set_rate(None)
+        self.assertTrue(done.wait(1))
+        thread.join()
+        with self.assertRaises(ValueError):
+            bucket.set_rate(-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
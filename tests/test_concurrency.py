@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import AdaptiveLimiter, BulkSender, Mailgun
+from mailgun.testing import StubServer
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def run_round(self, limiter, latency=0.01, status=200):
+        for _ in range(limiter.limit):
+            limiter.acquire()
+        for _ in range(limiter.stats()["in_flight"]):
+            limiter.release(latency, status)
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=4, max_limit=8)
+        for _ in range(20):
+            self.run_round(limiter)
+        self.assertEqual(limiter.limit, 8)
+        self.assertTrue(all(d.reason == "healthy" for d in limiter.decisions))
+        self.assertEqual([d.new for d in limiter.decisions], [5, 6, 7, 8])
+
+    def test_idle_limit_does_not_grow(self):
+        limiter = AdaptiveLimiter(initial=4)
+        for _ in range(50):
+            limiter.acquire()
+            limiter.release(0.01, 200)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_multiplicative_decrease(self):
+        limiter = AdaptiveLimiter(initial=16, min_limit=2)
+        # one round of 429s cuts the limit once
+        self.run_round(limiter, status=429)
+        self.assertEqual(limiter.limit, 8)
+        time.sleep(0.02)
+        self.run_round(limiter, status=429)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.decisions[-1].reason, "overload")
+
+        # one slow answer lifts the smoothed latency to about 0.1s
+        time.sleep(0.15)
+        limiter.acquire()
+        limiter.release(0.5, 200)
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(limiter.decisions[-1].reason, "latency")
+
+    def test_blocks_at_limit(self):
+        limiter = AdaptiveLimiter(initial=1)
+        limiter.acquire()
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        limiter.release(0.01, 200)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+
+class TestClientLimiter(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.limiter = AdaptiveLimiter(initial=2, max_limit=16)
+        self.mail = Mailgun(
+            "key", "example.com", pool_maxsize=16, concurrency_limiter=self.limiter
+        )
+        self.mail.base_url = self.server.base_url()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_self_tunes(self):
+        messages = [
+            {
+                "sender_email": "a@x.com",
+                "to": "b@x.com",
+                "subject": "s",
+                "text_body": "t",
+            }
+        ] * 300
+        # a slow sub-millisecond stub makes latency noisy, only watch 429s
+        self.limiter.latency_tolerance = float("inf")
+        results = list(BulkSender(self.mail, workers=16).send(messages))
+        self.assertTrue(all(r.error is None for r in results))
+        grown = self.limiter.limit
+        self.assertGreater(grown, 2)
+
+        self.server.app.inject_failures(1, status=429)
+        self.mail.get_logs()
+        self.assertLess(self.limiter.limit, grown)
+        self.assertEqual(self.limiter.decisions[-1].reason, "overload")
+        self.assertEqual(self.limiter.stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+import unittest
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun.email_parsing import (
+    cleanup_workspace,
+    parse_email,
+    parse_email_stream,
+)
+
+PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "files", "data.pdf")
+
+
+def make_email():
+    with open(PDF, "rb") as f:
+        pdf = f.read()
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        z.writestr("scan.png", b"\x89PNG" + os.urandom(5000))
+        z.writestr("notes.docx", b"skipped")
+
+    msg = EmailMessage()
+    msg["From"] = "bkrm.dahal@gmail.com"
+    msg["To"] = "bikram.dahal@docsumo.com"
+    msg["Date"] = "Mon, 01 Jan 2019 22:00:00 +0000"
+    msg["Subject"] = "Testing email"
+    msg.set_content("Hello,\nplease find the invoice attached.\n")
+    msg.add_alternative("<p>Hello</p>", subtype="html")
+    msg.add_attachment(pdf, maintype="application", subtype="pdf", filename="data.pdf")
+    msg.add_attachment(
+        "line one=\nnaïve line two\n" * 50,
+        subtype="plain",
+        cte="quoted-printable",
+        filename="notes.txt",
+    )
+    msg.add_attachment(
+        archive.getvalue(),
+        maintype="application",
+        subtype="zip",
+        filename="scans.zip",
+    )
+    return msg.as_bytes(), pdf
+
+
+class TestParseEmailStream(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.raw, self.pdf = make_email()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def out(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def test_matches_parse_email(self):
+        expected = parse_email(self.raw.decode("utf-8"), "1", self.out("a"))
+        for chunk_size in (7, 1024, 1 << 20):
+            metadata = parse_email_stream(
+                io.BytesIO(self.raw), "1", self.out("b"), chunk_size=chunk_size
+            )
+            for key in ("from", "to", "date", "subject", "body", "email_name"):
+                self.assertEqual(metadata[key], expected[key])
+            self.assertEqual(
+                sorted(os.path.basename(f) for f in metadata["files"]),
+                ["data.pdf", "scan.png"],
+            )
+            with open(os.path.join(metadata["workspace"], "data.pdf"), "rb") as f:
+                self.assertEqual(f.read(), self.pdf)
+            notes = os.path.join(expected["workspace"], "notes.txt")
+            with open(notes, "rb") as a:
+                notes = os.path.join(metadata["workspace"], "notes.txt")
+                with open(notes, "rb") as b:
+                    self.assertEqual(a.read(), b.read())
+
+    def test_crlf_quoted_printable(self):
+        msg = EmailMessage()
+        msg["Subject"] = "crlf"
+        msg.set_content("body")
+        msg.add_attachment(
+            "long line {} of soft breaks, naïve\n".format("x" * 300) * 20,
+            subtype="plain",
+            cte="quoted-printable",
+            filename="notes.txt",
+        )
+        # small chunks split the CRLF of some soft line breaks
+        raw = msg.as_bytes().replace(b"\n", b"\r\n")
+        expected = parse_email(raw.decode("utf-8"), "1", self.out("a"))
+        with open(os.path.join(expected["workspace"], "notes.txt"), "rb") as f:
+            notes = f.read()
+        for chunk_size in (8, 76, 77):
+            metadata = parse_email_stream(
+                io.BytesIO(raw), "1", self.out("b"), chunk_size=chunk_size
+            )
+            self.assertEqual(metadata["body"], expected["body"])
+            with open(os.path.join(metadata["workspace"], "notes.txt"), "rb") as f:
+                self.assertEqual(f.read(), notes)
+
+    def test_single_part(self):
+        raw = b"From: a@example.com\r\nSubject: hi\r\n\r\nplain body\r\n"
+        metadata = parse_email_stream(raw, "2", self.out("c"))
+        self.assertEqual(metadata["subject"], "hi")
+        self.assertEqual(metadata["body"], "plain body\r\n")
+        self.assertEqual(metadata["files"], [])
+
+    def test_memory_does_not_grow_with_attachment(self):
+        msg = EmailMessage()
+        msg["Subject"] = "big"
+        msg.set_content("body")
+        msg.add_attachment(
+            os.urandom(8 * 1024 * 1024),
+            maintype="application",
+            subtype="pdf",
+            filename="big.pdf",
+        )
+        source = io.BytesIO(msg.as_bytes())
+
+        tracemalloc.start()
+        metadata = parse_email_stream(source, "3", self.out("d"))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        self.assertEqual(os.path.getsize(metadata["files"][0]), 8 * 1024 * 1024)
+        self.assertLess(peak, 1024 * 1024)
+
+
+class TestWorkspaces(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.raw, _ = make_email()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_parallel_parses_keep_their_files(self):
+        def parse(index):
+            if index % 2:
+                return parse_email(self.raw.decode("utf-8"), "same/id", self.dir.name)
+            return parse_email_stream(self.raw, "same/id", self.dir.name)
+
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(parse, range(16)))
+
+        self.assertEqual(len({m["workspace"] for m in results}), 16)
+        for metadata in results:
+            self.assertEqual(len(metadata["files"]), 2)
+            for f in metadata["files"]:
+                self.assertTrue(f.startswith(metadata["workspace"]))
+                self.assertTrue(os.path.exists(f))
+            self.assertTrue(
+                os.path.basename(metadata["workspace"]).startswith("same_id-")
+            )
+
+        for metadata in results:
+            cleanup_workspace(metadata)
+        self.assertEqual(os.listdir(self.dir.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
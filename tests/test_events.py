@@ -0,0 +1,121 @@
+import os
+import sys
+import unittest
+from itertools import islice
+
+import requests
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Mailgun
+from mailgun.testing import StubServer
+
+
+def make_events(count, start=1_600_000_000):
+    return [
+        {
+            "id": "event-{}".format(i),
+            "event": "stored" if i % 2 else "delivered",
+            "timestamp": start + i,
+        }
+        for i in range(count)
+    ]
+
+
+class TestIterEvents(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.server.app.add_events(make_events(1000))
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_follows_paging(self):
+        events = list(self.mail.iter_events({}, page_size=100, prefetch=2))
+        self.assertEqual(len(events), 1000)
+        self.assertEqual(events[0]["id"], "event-999")
+        # 10 pages and the empty one ending the walk
+        self.assertEqual(len(self.server.app.requests), 11)
+
+    def test_filters_and_no_prefetch(self):
+        events = list(
+            self.mail.iter_events(
+                {"event": "stored", "ascending": "yes"}, page_size=300, prefetch=0
+            )
+        )
+        self.assertEqual(len(events), 500)
+        self.assertEqual(events[0]["id"], "event-1")
+
+    def test_failed_page_raises(self):
+        events = self.mail.iter_events(page_size=300, prefetch=0)
+        self.assertEqual(len(list(islice(events, 300))), 300)
+        self.server.app.inject_failures(1, status=429)
+        with self.assertRaises(requests.HTTPError):
+            list(events)
+
+    def test_failed_page_raises_with_prefetch(self):
+        self.server.app.inject_failures(1, status=500)
+        with self.assertRaises(requests.HTTPError):
+            list(self.mail.iter_events(page_size=100, prefetch=2))
+
+    def test_stop_early(self):
+        events = list(islice(self.mail.iter_events(page_size=50), 120))
+        self.assertEqual(len(events), 120)
+
+
+class TestExportEvents(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.server.app.add_events(make_events(1000))
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+        self.begin, self.end = 1_600_000_000, 1_600_001_000
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_ordered(self):
+        events = list(
+            self.mail.export_events(
+                self.begin, self.end, shard_size=70, concurrency=4, page_size=25
+            )
+        )
+        self.assertEqual(len(events), 1000)
+        timestamps = [e["timestamp"] for e in events]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_unordered_with_filter(self):
+        events = list(
+            self.mail.export_events(
+                self.begin,
+                self.end,
+                {"event": "delivered"},
+                shard_size=100,
+                concurrency=8,
+                ordered=False,
+            )
+        )
+        self.assertEqual(len(events), 500)
+        self.assertEqual(len({e["id"] for e in events}), 500)
+
+    def test_retry_budget(self):
+        self.server.app.inject_failures(2)
+        events = list(
+            self.mail.export_events(self.begin, self.end, shard_size=500, concurrency=1)
+        )
+        self.assertEqual(len(events), 1000)
+
+        self.server.app.inject_failures(3)
+        with self.assertRaises(requests.HTTPError):
+            list(
+                self.mail.export_events(
+                    self.begin, self.end, shard_size=1000, retries=2
+                )
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
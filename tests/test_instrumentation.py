@@ -0,0 +1,120 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Instrumentation, Mailgun, MetricsCollector, RetryPolicy
+from mailgun.instrumentation import Histogram, endpoint_name
+from mailgun.testing import StubServer
+from tests.test_email_parsing import make_email
+
+
+class TestMetrics(unittest.TestCase):
+    def test_endpoint_name(self):
+        base = "https://api.mailgun.net/v3/"
+        cases = {
+            base + "mg.x.com/messages": "{domain}/messages",
+            base
+            + "lists/news@mg.x.com/members/a@b.com": "lists/{list}/members/{address}",
+            base + "lists/news@mg.x.com/members.json": "lists/{list}/members.json",
+            base
+            + "lists/news%40mg.x.com/members/a%40b.com": "lists/{list}/members/{address}",
+            base + "mg.x.com/events": "{domain}/events",
+            base + "mg.x.com/events/WzMsIHsiYiI6": "{domain}/events/{page}",
+            "https://storage.mailgun.net/v3/domains/mg.x.com/messages/AgEF": (
+                "domains/{domain}/messages/{id}"
+            ),
+            "https://api.mailgun.net/v4/address/validate/bulk/job1": (
+                "address/validate/bulk/{id}"
+            ),
+        }
+        for url, name in cases.items():
+            self.assertEqual(endpoint_name(url, "mg.x.com"), name)
+
+    def test_histogram(self):
+        histogram = Histogram((0.1, 0.2, 0.5, 1.0))
+        for value in [0.05] * 50 + [0.15] * 45 + [0.7] * 5:
+            histogram.observe(value)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.1)
+        self.assertLessEqual(histogram.quantile(0.95), 0.2)
+        self.assertGreater(histogram.quantile(0.99), 0.5)
+        self.assertLessEqual(histogram.quantile(0.99), 0.7)
+        self.assertEqual(list(histogram.cumulative())[-1], (float("inf"), 100))
+
+
+class TestClientHooks(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.metrics = MetricsCollector()
+        self.mail = Mailgun("key", "example.com", instrumentation=self.metrics)
+        self.mail.base_url = self.server.base_url()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+        shutil.rmtree(self.folder)
+
+    def test_hooks(self):
+        events = []
+        hooks = Instrumentation(
+            before=lambda e: events.append(("before", e.endpoint, e.status)),
+            after=lambda e: events.append(("after", e.endpoint, e.status)),
+        )
+        self.mail.options(instrumentation=hooks).get_logs()
+        self.assertEqual(
+            events,
+            [("before", "{domain}/events", None), ("after", "{domain}/events", 200)],
+        )
+
+    def test_request_metrics(self):
+        for _ in range(3):
+            self.mail.send_message("a@x.com", "b@x.com", "Hi", text_body="hello")
+        self.server.app.inject_failures(1, status=503)
+        self.mail.options(retry=RetryPolicy(backoff=0)).get_logs()
+
+        requests = self.metrics.as_dict()["requests"]
+        send = requests["POST {domain}/messages"]
+        self.assertEqual(send["count"], 3)
+        self.assertEqual(send["statuses"], {"200": 3})
+        self.assertGreater(send["bytes_sent"], 0)
+        self.assertGreater(send["bytes_received"], 0)
+        self.assertIsNotNone(send["latency"]["p99"])
+        events = requests["GET {domain}/events"]
+        self.assertEqual(events["retries"], 1)
+        self.assertEqual(events["statuses"], {"200": 1})
+
+        text = self.metrics.to_prometheus()
+        self.assertIn(
+            'mailgun_requests_total{endpoint="{domain}/messages",method="POST",'
+            'status="200"} 3',
+            text,
+        )
+        self.assertIn(
+            'mailgun_request_duration_seconds_bucket{endpoint="{domain}/messages",'
+            'method="POST",le="+Inf"} 3',
+            text,
+        )
+        self.assertIn(
+            'mailgun_request_retries_total{endpoint="{domain}/events",method="GET"} 1',
+            text,
+        )
+
+    def test_parse_timings(self):
+        raw, _ = make_email()
+        self.mail.parse_email_mime(raw.decode("utf-8"), "one", self.folder)
+        self.mail.parse_email_mime_stream(raw, "two", self.folder)
+        parse = self.metrics.as_dict()["parse"]
+        self.assertEqual(parse["parse"]["count"], 2)
+        self.assertEqual(parse["attachments"]["count"], 1)
+        self.assertEqual(parse["zip"]["count"], 2)
+        self.assertIn(
+            'mailgun_parse_duration_seconds_count{stage="zip"} 2',
+            self.metrics.to_prometheus(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
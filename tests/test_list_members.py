@@ -0,0 +1,122 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Mailgun
+from mailgun.testing import StubServer
+
+LIST = "newsletter@example.com"
+
+
+class TestAddMembers(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def members(self, count):
+        for i in range(count):
+            if i % 2:
+                yield "user{}@docsumo.com".format(i)
+            else:
+                yield {
+                    "address": "user{}@docsumo.com".format(i),
+                    "name": "User {}".format(i),
+                    "vars": '{"plan": "free"}',
+                    "subscribed": True,
+                }
+
+    def test_chunks(self):
+        results = list(
+            self.mail.mailing_list_add_members("newsletter", self.members(2500))
+        )
+        self.assertEqual(sorted(r.count for r in results), [500, 1000, 1000])
+        self.assertEqual(sorted(r.start for r in results), [0, 1000, 2000])
+        self.assertTrue(all(r.error is None for r in results))
+        self.assertEqual(len(self.server.app.requests), 3)
+
+        members = self.server.app.lists[LIST]
+        self.assertEqual(len(members), 2500)
+        self.assertEqual(members["user0@docsumo.com"]["vars"], {"plan": "free"})
+
+    def test_upsert_and_failures(self):
+        list(self.mail.mailing_list_add_members("newsletter", ["a@docsumo.com"]))
+        self.server.app.inject_failures(1)
+        update = [{"address": "a@docsumo.com", "name": "A"}]
+        result = next(
+            self.mail.mailing_list_add_members("newsletter", update, upsert=False)
+        )
+        self.assertEqual(result.error, "Injected failure")
+
+        list(self.mail.mailing_list_add_members("newsletter", update, upsert=False))
+        self.assertNotIn("name", self.server.app.lists[LIST]["a@docsumo.com"])
+        list(self.mail.mailing_list_add_members("newsletter", update))
+        self.assertEqual(self.server.app.lists[LIST]["a@docsumo.com"]["name"], "A")
+
+        with self.assertRaises(ValueError):
+            next(self.mail.mailing_list_add_members("newsletter", [], chunk_size=1001))
+
+
+class TestSyncList(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+        self.remote = [
+            {
+                "address": "user{:04}@docsumo.com".format(i),
+                "name": "User {}".format(i),
+                "vars": {"plan": "free"},
+            }
+            for i in range(3000)
+        ]
+        list(self.mail.mailing_list_add_members("newsletter", self.remote))
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_iter_members(self):
+        members = list(self.mail.mailing_list_members("newsletter", page_size=700))
+        self.assertEqual(len(members), 3000)
+        self.assertEqual(len({m["address"] for m in members}), 3000)
+        self.assertEqual(members[0]["vars"], {"plan": "free"})
+
+    def test_sync(self):
+        desired = [dict(m) for m in self.remote[:-2]]
+        desired[5]["vars"] = {"plan": "pro"}
+        desired[6]["subscribed"] = False
+        # only the address is given, nothing to compare
+        desired[7] = desired[7]["address"].upper()
+        desired.append({"address": "new@docsumo.com", "name": "New"})
+
+        plan = self.mail.sync_list("newsletter", desired, dry_run=True)
+        self.assertEqual(plan["added"], ["new@docsumo.com"])
+        self.assertEqual(
+            plan["updated"], ["user0005@docsumo.com", "user0006@docsumo.com"]
+        )
+        self.assertEqual(
+            plan["deleted"], ["user2998@docsumo.com", "user2999@docsumo.com"]
+        )
+        self.assertEqual(plan["unchanged"], 2996)
+
+        del self.server.app.requests[:]
+        summary = self.mail.sync_list("newsletter", desired, workers=2)
+        self.assertEqual(summary, plan)
+        members = self.server.app.lists[LIST]
+        self.assertEqual(len(members), 2999)
+        self.assertEqual(members["user0005@docsumo.com"]["vars"], {"plan": "pro"})
+        # 3 member pages and the empty one, 1 upload and 2 deletes
+        self.assertEqual(len(self.server.app.requests), 7)
+
+        again = self.mail.sync_list("newsletter", desired)
+        self.assertEqual(again["unchanged"], 2999)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Mailgun
+from tests.test_email_parsing import make_email
+
+
+class TestParseMany(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.raw, _ = make_email()
+        self.mail = Mailgun("key", "example.com")
+
+    def tearDown(self):
+        self.mail.close()
+        self.dir.cleanup()
+
+    def test_parse_many(self):
+        path = pathlib.Path(self.dir.name, "stored.eml")
+        path.write_bytes(self.raw)
+
+        def emails():
+            for i in range(12):
+                yield "str-{}".format(i), self.raw.decode("utf-8")
+            yield "bytes", self.raw
+            yield "path", path
+            yield "broken", None
+
+        output_dir = os.path.join(self.dir.name, "out")
+        results = {
+            r.email_id: r
+            for r in self.mail.parse_many(
+                emails(), output_dir, processes=2, max_pending=3
+            )
+        }
+        self.assertEqual(len(results), 15)
+        self.assertIn("TypeError", results.pop("broken").error)
+        for result in results.values():
+            self.assertIsNone(result.error)
+            self.assertEqual(result.metadata["subject"], "Testing email")
+            self.assertEqual(len(result.metadata["files"]), 2)
+        self.assertEqual(len(os.listdir(output_dir)), 14)
+
+
+if __name__ == "__main__":
+    unittest.main()
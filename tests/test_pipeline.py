@@ -0,0 +1,85 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import InboundPipeline, Mailgun
+from mailgun.testing import StubServer
+from tests.test_email_parsing import make_email
+
+
+class TestInboundPipeline(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.raw, self.pdf = make_email()
+        self.server = StubServer().start()
+        events = []
+        for i in range(20):
+            key = "key{}".format(i)
+            if i != 7:
+                self.server.app.store_message(key, self.raw.decode("utf-8"))
+            url = self.server.url + "/v3/domains/example.com/messages/" + key
+            events.append(
+                {
+                    "id": "event-{}".format(i),
+                    "event": "stored",
+                    "timestamp": 1_600_000_000 + i,
+                    "storage": {"key": key, "url": url},
+                }
+            )
+        events.append({"id": "other", "event": "delivered", "timestamp": 1})
+        self.server.app.add_events(events)
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+        self.spool = os.path.join(self.dir.name, "spool")
+        self.pipeline = InboundPipeline(
+            self.mail,
+            output_dir=os.path.join(self.dir.name, "out"),
+            fetch_workers=4,
+            processes=2,
+            queue_size=3,
+            spool_dir=self.spool,
+            page_size=5,
+        )
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+        self.dir.cleanup()
+
+    def test_run(self):
+        results = {r.email_id: r for r in self.pipeline.run()}
+        self.assertEqual(len(results), 20)
+        self.assertIn("404", results.pop("event-7").error)
+        for result in results.values():
+            self.assertIsNone(result.error)
+            with open(result.metadata["files"][0], "rb") as f:
+                self.assertEqual(f.read(), self.pdf)
+        # downloaded messages are removed once parsed
+        self.assertEqual(os.listdir(self.spool), [])
+
+        stats = self.pipeline.stats()
+        self.assertEqual(stats["events"]["count"], 20)
+        self.assertEqual(stats["fetch"]["errors"], 1)
+        self.assertEqual(stats["fetch"]["bytes"], 19 * len(self.raw))
+        self.assertEqual(stats["parse"]["count"], 19)
+        self.assertEqual(stats["parse"]["in_flight"], 0)
+
+    def test_source_failure(self):
+        def events():
+            yield {"id": "x", "storage": {"url": self.server.url + "/missing"}}
+            raise RuntimeError("events API down")
+
+        with self.assertRaises(RuntimeError):
+            list(self.pipeline.run(events()))
+
+    def test_stop_early(self):
+        results = self.pipeline.run()
+        next(results)
+        results.close()
+        self.assertLessEqual(self.pipeline.stats()["events"]["count"], 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import EventPoller, Instrumentation, Mailgun, SQLiteCheckpoint
+from mailgun.testing import StubServer
+
+START = 1_600_000_000
+
+
+def stored(index, timestamp):
+    return {"id": "event-{}".format(index), "event": "stored", "timestamp": timestamp}
+
+
+class TestEventPoller(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+        self.dir.cleanup()
+
+    def poller(self, checkpoint):
+        return EventPoller(self.mail, checkpoint, start=START, page_size=10)
+
+    def test_only_new_events_with_late_arrivals(self):
+        path = os.path.join(self.dir.name, "checkpoint.json")
+        self.server.app.add_events([stored(i, START + i) for i in range(25)])
+        self.assertEqual(len(self.poller(path).poll()), 25)
+
+        # one new event and one that showed up late inside the overlap window
+        self.server.app.add_events([stored(25, START + 100), stored(26, START + 5.5)])
+        events = self.poller(path).poll()
+        self.assertEqual({e["id"] for e in events}, {"event-25", "event-26"})
+        self.assertEqual(self.poller(path).poll(), [])
+
+    def test_resume_after_crash(self):
+        checkpoint = SQLiteCheckpoint(os.path.join(self.dir.name, "poll.db"))
+        self.server.app.add_events([stored(i, START + i) for i in range(30)])
+        handled = []
+
+        def crash_at_20(event):
+            if len(handled) == 20:
+                raise RuntimeError("worker died")
+            handled.append(event["id"])
+
+        with self.assertRaises(RuntimeError):
+            self.poller(checkpoint).poll(crash_at_20)
+
+        count = self.poller(checkpoint).poll(lambda event: handled.append(event["id"]))
+        self.assertEqual(count, 10)
+        self.assertEqual(handled, ["event-{}".format(i) for i in range(30)])
+
+    def test_failed_poll_without_handler(self):
+        path = os.path.join(self.dir.name, "checkpoint.json")
+        self.server.app.add_events([stored(i, START + i) for i in range(10)])
+        calls = []
+
+        def fail_second_page(event):
+            calls.append(event)
+            if len(calls) == 2:
+                raise requests.ConnectionError("connection reset")
+
+        failing = self.mail.options(
+            instrumentation=Instrumentation(before=fail_second_page)
+        )
+        poller = EventPoller(failing, path, start=START, page_size=3)
+        with self.assertRaises(requests.ConnectionError):
+            poller.poll()
+
+        events = self.poller(path).poll()
+        self.assertEqual(
+            [e["id"] for e in events], ["event-{}".format(i) for i in range(10)]
+        )
+        # the same poller, after its failure, returns them too
+        self.assertEqual(len(poller.poll()), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import CircuitBreaker, Mailgun, RetryPolicy
+from mailgun.error import CircuitOpen
+from mailgun.retry import retry_after
+from mailgun.testing import StubServer
+from mailgun.transport import InMemoryTransport
+
+FAST = RetryPolicy(retries=3, backoff=0.001, jitter=False)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_retryable(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable("GET", 503))
+        self.assertFalse(policy.is_retryable("GET", 404))
+        self.assertFalse(policy.is_retryable("POST", 503))
+        self.assertTrue(policy.is_retryable("POST", 503, idempotent=True))
+        # a rate limited request was not handled
+        self.assertTrue(policy.is_retryable("POST", 429))
+        self.assertFalse(policy.is_retryable("POST", None))
+
+    def test_delay(self):
+        policy = RetryPolicy(backoff=1, max_backoff=3, jitter=False)
+        self.assertEqual([policy.delay(a) for a in (1, 2, 3)], [1, 2, 3])
+        for _ in range(100):
+            self.assertLessEqual(policy.replace(jitter=True).delay(2), 2)
+        self.assertEqual(policy.delay(1, {"Retry-After": "7"}), 7)
+        self.assertEqual(
+            policy.replace(max_retry_after=5).delay(1, {"Retry-After": "7"}), 5
+        )
+        self.assertAlmostEqual(
+            retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}), 0
+        )
+
+
+class TestClientRetry(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com", retry=FAST)
+        self.mail.base_url = self.server.base_url()
+        self.server.app.add_events(
+            [{"id": "e1", "event": "stored", "timestamp": 1_600_000_000}]
+        )
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_get_is_retried(self):
+        self.server.app.inject_failures(2, status=502)
+        self.assertEqual(len(self.mail.get_logs()["items"]), 1)
+        self.assertEqual(len(self.server.app.requests), 3)
+
+    def test_gives_up(self):
+        self.server.app.inject_failures(10, status=500)
+        self.assertEqual(self.mail.get_logs()["message"], "Injected failure")
+        self.assertEqual(len(self.server.app.requests), 4)
+
+    def test_post_only_on_429(self):
+        self.server.app.inject_failures(1, status=503)
+        response = self.mail.send_message("a@x.com", "b@x.com", "Hi", text_body="Hi")
+        self.assertEqual(response["message"], "Injected failure")
+
+        self.server.app.inject_failures(1, status=429, retry_after=0.2)
+        start = time.monotonic()
+        response = self.mail.send_message("a@x.com", "b@x.com", "Hi", text_body="Hi")
+        self.assertIn("id", response)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    def test_attachments_sent_again(self):
+        with tempfile.NamedTemporaryFile(suffix=".txt") as f:
+            f.write(b"x" * 100000)
+            f.flush()
+            with open(f.name, "rb") as handle:
+                handle.read(10)
+                self.server.app.inject_failures(1, status=429)
+                self.mail.send_message(
+                    "a@x.com",
+                    "b@x.com",
+                    "Hi",
+                    text_body="Hi",
+                    files=[f.name, ("data.bin", b"abc"), handle],
+                )
+        sent = self.server.app.sent[-1]["attachment"]
+        self.assertEqual([len(content) for _, content in sent], [100000, 3, 99990])
+
+    def test_per_call_options(self):
+        self.server.app.inject_failures(1, status=503)
+        once = self.mail.options(retry=None)
+        self.assertEqual(once.get_logs()["message"], "Injected failure")
+        self.assertIs(once.session, self.mail.session)
+        self.assertIs(self.mail.retry, FAST)
+        with self.assertRaises(TypeError):
+            self.mail.options(retries=1)
+
+    def test_connection_errors(self):
+        mail = Mailgun("key", "example.com", retry=FAST)
+        mail.base_url = "http://127.0.0.1:9/v3/"
+        with self.assertRaises(requests.ConnectionError):
+            mail.get_logs()
+        mail.close()
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.2)
+        self.mail = Mailgun("key", "example.com", circuit_breaker=self.breaker)
+        self.mail.base_url = self.server.base_url()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_opens_and_recovers(self):
+        self.server.app.inject_failures(3)
+        for _ in range(3):
+            self.mail.get_logs()
+        self.assertEqual(self.breaker.state, "open")
+        with self.assertRaises(CircuitOpen):
+            self.mail.get_logs()
+        self.assertEqual(len(self.server.app.requests), 3)
+
+        time.sleep(0.2)
+        self.assertEqual(self.breaker.state, "half_open")
+        self.server.app.inject_failures(1)
+        self.mail.get_logs()
+        # the failed trial opens the circuit again
+        with self.assertRaises(CircuitOpen):
+            self.mail.get_logs()
+
+        time.sleep(0.2)
+        self.mail.get_logs()
+        self.assertEqual(self.breaker.state, "closed")
+        self.mail.get_logs()
+
+    def test_trial_raising(self):
+        class Flaky(InMemoryTransport):
+            errors = []
+
+            def request(self, method, url, **kwargs):
+                if self.errors:
+                    raise self.errors.pop(0)
+                return super().request(method, url, **kwargs)
+
+        transport = Flaky()
+        mail = Mailgun("key", "example.com", transport=transport)
+        mail.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+        transport.errors += [
+            requests.ConnectionError("reset"),
+            requests.exceptions.ChunkedEncodingError("cut"),
+        ]
+        with self.assertRaises(requests.ConnectionError):
+            mail.get_logs()
+        time.sleep(0.1)
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            mail.get_logs()
+        # the next call is the trial again and closes the circuit
+        self.assertIn("items", mail.get_logs())
+        self.assertEqual(mail.circuit_breaker.state, "closed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Instrumentation, Mailgun
+from mailgun.testing import StubServer
+
+
+class TestSendBatch(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_chunks_lazily_with_recipient_variables(self):
+        def recipients():
+            for i in range(2500):
+                yield "user{}@example.com".format(i), {"n": i}
+
+        results = self.mail.send_batch(
+            "a@example.com", recipients(), "Hi %recipient.n%", text_body="x"
+        )
+        self.assertEqual([r["recipients"] for r in results], [1000, 1000, 500])
+        self.assertEqual(len(self.server.app.sent), 3)
+
+        last = self.server.app.sent[-1]
+        self.assertEqual(len(last["to"]), 500)
+        variables = json.loads(last["recipient-variables"][0])
+        self.assertEqual(variables["user2499@example.com"], {"n": 2499})
+
+    def test_template_and_display_names(self):
+        results = self.mail.send_batch(
+            "a@example.com",
+            [("Bob <bob@example.com>", {"first_name": "Bob"})],
+            "Hello",
+            template_name="welcome_email",
+            data={"company_name": "docsumo"},
+            batch_size=10,
+        )
+        self.assertEqual(results[0]["response"]["message"], "Queued. Thank you.")
+        sent = self.server.app.sent[0]
+        self.assertEqual(sent["template"], ["welcome_email"])
+        variables = json.loads(sent["recipient-variables"][0])
+        self.assertIn("bob@example.com", variables)
+
+    def test_failed_batch_does_not_stop_the_others(self):
+        recipients = [("user{}@example.com".format(i), {}) for i in range(25)]
+        self.server.app.inject_failures(1, status=400)
+        results = self.mail.send_batch(
+            "a@example.com", recipients, "Hi", text_body="x", batch_size=10
+        )
+        self.assertEqual([r["ok"] for r in results], [False, True, True])
+        self.assertEqual(results[0]["status"], 400)
+        self.assertEqual(results[0]["error"], "Injected failure")
+        self.assertEqual(results[0]["failed"], recipients[:10])
+        self.assertIsNone(results[1]["error"])
+        self.assertNotIn("failed", results[1])
+        self.assertEqual(len(self.server.app.sent), 2)
+
+    def test_batch_raising(self):
+        calls = []
+
+        def before(event):
+            calls.append(event)
+            if len(calls) == 2:
+                raise requests.ConnectionError("connection reset")
+
+        self.mail.instrumentation = Instrumentation(before=before)
+        recipients = [("user{}@example.com".format(i), {}) for i in range(3)]
+        results = self.mail.send_batch(
+            "a@example.com", recipients, "Hi", text_body="x", batch_size=1
+        )
+        self.assertEqual([r["ok"] for r in results], [True, False, True])
+        self.assertIsNone(results[1]["status"])
+        self.assertIsInstance(results[1]["error"], requests.ConnectionError)
+        self.assertEqual(results[1]["failed"], recipients[1:2])
+        self.assertEqual(len(self.server.app.sent), 2)
+
+    def test_batch_size_limit(self):
+        with self.assertRaises(ValueError):
+            self.mail.send_batch("a@example.com", [], "Hi", batch_size=1001)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Mailgun
+from mailgun.testing import StubServer
+
+
+class TestPooledSession(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.base_url = self.server.base_url()
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_connection_reused_across_endpoints(self):
+        for _ in range(5):
+            r = self.mail.send_message("a@example.com", "b@example.com", "hi", "body")
+            self.assertEqual(r["message"], "Queued. Thank you.")
+        self.mail.mailing_list_create("test", "Welcome Email")
+        self.mail.mailing_list_add_email("test", {"address": "b@example.com"})
+        self.mail.get_logs()
+        self.assertEqual(self.server.connections, 1)
+
+    def test_keep_alive_disabled(self):
+        with Mailgun("key", "example.com", keep_alive=False) as mail:
+            mail.base_url = self.server.base_url()
+            for _ in range(3):
+                mail.send_message("a@example.com", "b@example.com", "hi", "body")
+        self.assertEqual(self.server.connections, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import InMemoryTransport, Mailgun, OutboundSpool, SpoolDispatcher
+from mailgun.retry import RetryPolicy
+from mailgun.testing import StubMailgun
+
+
+class TestSpool(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "outbound.db")
+        self.spool = OutboundSpool(self.path)
+        self.app = StubMailgun()
+        self.mail = Mailgun("key", "example.com", transport=InMemoryTransport(self.app))
+        self.fast = RetryPolicy(backoff=0, jitter=False)
+
+    def tearDown(self):
+        self.spool.close()
+        self.folder.cleanup()
+
+    def test_enqueue_latency(self):
+        self.spool.enqueue("a@example.com", "warmup@example.com", "hi", text_body="x")
+        start = time.perf_counter()
+        for i in range(200):
+            self.spool.enqueue(
+                "a@example.com", "b{}@example.com".format(i), "hi", text_body="x"
+            )
+        per_message = (time.perf_counter() - start) / 200
+        self.assertLess(per_message, 0.005)
+        self.assertEqual(self.spool.stats()["pending"], 201)
+
+    def test_survives_restart(self):
+        first = self.spool.enqueue(
+            "a@example.com", "b@example.com", "hi", files=[("a.txt", b"abc")]
+        )
+        self.spool.enqueue_template(
+            "a@example.com", "c@example.com", "hi", "welcome", {"name": "C"}
+        )
+        self.spool.close()
+
+        spool = OutboundSpool(self.path)
+        dispatcher = SpoolDispatcher(self.mail, spool, retry=self.fast)
+        self.assertTrue(dispatcher.drain())
+        self.assertEqual(len(self.app.sent), 2)
+        self.assertEqual(self.app.sent[0]["attachment"], [("a.txt", b"abc")])
+        self.assertEqual(self.app.sent[1]["template"], ["welcome"])
+        status = spool.get(first)
+        self.assertEqual(status["status"], "delivered")
+        self.assertEqual(status["message_id"], "<1@example.com>")
+        self.assertEqual(spool.purge_delivered(), 2)
+        spool.close()
+
+    def test_retry_and_dead_letters(self):
+        self.app.inject_failures(2, status=429)
+        self.spool.enqueue_many(
+            [
+                {
+                    "sender_email": "a@example.com",
+                    "to": "b@example.com",
+                    "subject": "1",
+                },
+                {
+                    "sender_email": "a@example.com",
+                    "to": "c@example.com",
+                    "subject": "2",
+                },
+            ]
+        )
+        dispatcher = SpoolDispatcher(self.mail, self.spool, retry=self.fast)
+        dispatcher.drain()
+        self.assertEqual(self.spool.stats()["delivered"], 2)
+        self.assertEqual(dispatcher.stats()["retried"], 2)
+
+        self.app.inject_failures(1, status=400)
+        self.app.inject_failures(3, status=503)
+        bad = self.spool.enqueue("a@example.com", "d@example.com", "bad")
+        flaky = self.spool.enqueue("a@example.com", "e@example.com", "flaky")
+        dispatcher.max_attempts = 3
+        dispatcher.drain()
+        self.assertEqual(self.spool.get(bad)["status"], "dead")
+        self.assertEqual(self.spool.get(bad)["attempts"], 1)
+        self.assertEqual(self.spool.get(flaky)["status"], "dead")
+        self.assertEqual(self.spool.get(flaky)["attempts"], 3)
+        dead = self.spool.dead_letters()
+        self.assertEqual([d["id"] for d in dead], [bad, flaky])
+        self.assertIn("400", dead[0]["error"])
+
+        self.assertEqual(self.spool.requeue_dead([flaky]), 1)
+        dispatcher.drain()
+        self.assertEqual(self.spool.get(flaky)["status"], "delivered")
+
+    def test_expired_lease(self):
+        spool_id = self.spool.enqueue("a@example.com", "b@example.com", "hi")
+        self.assertEqual(len(self.spool.claim(10)), 1)
+        # the dispatcher holding it died, nobody else gets it before the lease ends
+        self.assertEqual(self.spool.claim(10), [])
+        claimed = self.spool.claim(10, now=time.time() + self.spool.lease + 1)
+        self.assertEqual([(c[0], c[3]) for c in claimed], [(spool_id, 2)])
+
+    def test_background(self):
+        with SpoolDispatcher(self.mail, self.spool, workers=4, batch_size=10) as d:
+            self.spool.enqueue_many(
+                {
+                    "sender_email": "a@example.com",
+                    "to": "u{}@example.com".format(i),
+                    "subject": "s",
+                }
+                for i in range(95)
+            )
+            self.assertTrue(d.drain(timeout=10))
+        self.assertEqual(len(self.app.sent), 95)
+        self.assertEqual(d.stats()["spool"]["delivered"], 95)
+
+    def test_settle_failure(self):
+        settle = self.spool.settle
+        failures = []
+
+        def flaky(outcomes):
+            if not failures:
+                failures.append(outcomes)
+                raise sqlite3.OperationalError("database is locked")
+            settle(outcomes)
+
+        self.spool.settle = flaky
+        first = self.spool.enqueue("a@example.com", "b@example.com", "1")
+        with SpoolDispatcher(self.mail, self.spool, poll_interval=0.01) as d:
+            self.assertTrue(d.drain(timeout=5))
+            second = self.spool.enqueue("a@example.com", "c@example.com", "2")
+            self.assertTrue(d.drain(timeout=5))
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(d.stats()["errors"], 1)
+        self.assertEqual(self.spool.get(first)["status"], "delivered")
+        self.assertEqual(self.spool.get(second)["status"], "delivered")
+        # the first message was sent once, its outcome kept across the failure
+        self.assertEqual(len(self.app.sent), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
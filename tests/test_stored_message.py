@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Mailgun
+from mailgun.storage import JsonFieldStream
+from mailgun.testing import StubServer
+from tests.test_email_parsing import make_email
+
+
+class TestJsonFieldStream(unittest.TestCase):
+    def decode(self, document: bytes, chunk_size: int):
+        field = JsonFieldStream("body-mime")
+        chunks = [
+            field.feed(document[i : i + chunk_size])
+            for i in range(0, len(document), chunk_size)
+        ]
+        self.assertTrue(field.done)
+        return b"".join(chunks).decode("utf-8")
+
+    def test_any_chunking(self):
+        body = 'Subject: café \U0001f600\r\n\r\n"quoted" \\ / \t' + "x" * 3000
+        for ensure_ascii in (True, False):
+            document = json.dumps(
+                {
+                    "body-html": '"body-mime": "not this"',
+                    "nested": {"body-mime": "nor this"},
+                    "list": [1, "body-mime"],
+                    "empty": None,
+                    "body-mime": body,
+                    "after": 1,
+                },
+                ensure_ascii=ensure_ascii,
+            ).encode("utf-8")
+            for chunk_size in (1, 2, 5, 64, len(document)):
+                self.assertEqual(self.decode(document, chunk_size), body)
+
+
+class TestStoredMessage(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.raw, self.pdf = make_email()
+        self.server = StubServer().start()
+        path = self.server.app.store_message("key1", self.raw.decode("utf-8"))
+        self.url = self.server.url + path
+        self.mail = Mailgun("key", "example.com")
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+        self.dir.cleanup()
+
+    def test_download_to_file(self):
+        path = os.path.join(self.dir.name, "message.eml")
+        written = self.mail.download_message_mime(self.url, path, chunk_size=1024)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), self.raw)
+        self.assertEqual(written, len(self.raw))
+
+        out = io.BytesIO()
+        self.mail.download_message_mime(self.url, out)
+        self.assertEqual(out.getvalue(), self.raw)
+
+    def test_parse_while_downloading(self):
+        metadata = self.mail.parse_stored_message(self.url, "key1", self.dir.name)
+        expected = self.mail.parse_email_mime_stream(self.raw, "key1", self.dir.name)
+        self.assertEqual(
+            [os.path.basename(f) for f in metadata["files"]],
+            [os.path.basename(f) for f in expected["files"]],
+        )
+        self.assertEqual(metadata["body"], expected["body"])
+        with open(metadata["files"][0], "rb") as f:
+            self.assertEqual(f.read(), self.pdf)
+
+    def test_missing_message(self):
+        with self.assertRaises(requests.HTTPError):
+            self.mail.download_message_mime(self.url + "x", io.BytesIO())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import InMemoryTransport, Mailgun, RecordReplayTransport
+from mailgun.error import NoRecording
+from mailgun.testing import StubServer
+from tests.test_email_parsing import make_email
+
+
+class TestRegion(unittest.TestCase):
+    def test_urls(self):
+        mail = Mailgun("key", "example.com", region="eu")
+        self.assertEqual(mail.base_url, "https://api.eu.mailgun.net/v3/")
+        self.assertEqual(
+            mail.validate_url, "https://api.eu.mailgun.net/v4/address/validate"
+        )
+        mail = Mailgun("key", "example.com", api_url="http://localhost:8080/")
+        self.assertEqual(mail.base_url, "http://localhost:8080/v3/")
+        with self.assertRaises(ValueError):
+            Mailgun("key", "example.com", region="mars")
+
+
+class TestInMemoryTransport(unittest.TestCase):
+    def setUp(self):
+        self.transport = InMemoryTransport()
+        self.mail = Mailgun("key", "example.com", transport=self.transport)
+        self.app = self.transport.app
+
+    def test_endpoints(self):
+        response = self.mail.send_message(
+            "a@example.com", "b@example.com", "hi", files=[("a.txt", b"abc")]
+        )
+        self.assertEqual(response["message"], "Queued. Thank you.")
+        self.assertEqual(self.app.sent[0]["attachment"], [("a.txt", b"abc")])
+        self.assertIsNone(self.mail.session)
+
+        self.app.add_events(
+            [{"id": str(i), "event": "stored", "timestamp": i} for i in range(250)]
+        )
+        events = list(self.mail.iter_events({"event": "stored"}, page_size=100))
+        self.assertEqual(len(events), 250)
+
+        with tempfile.TemporaryDirectory() as folder:
+            raw, pdf = make_email()
+            path = self.app.store_message("key1", raw.decode("utf-8"))
+            metadata = self.mail.parse_stored_message(
+                self.mail.api_url + path, "m1", folder
+            )
+            with open(os.path.join(metadata["workspace"], "data.pdf"), "rb") as f:
+                self.assertEqual(f.read(), pdf)
+
+    def test_presigned_download(self):
+        self.mail.create_bulk_validation("job", ["a@gmail.com", "b@gmail.com"])
+        status = self.mail.wait_bulk_validation("job", interval=0)
+        out = io.BytesIO()
+        self.mail.download_bulk_validation(status, out)
+        with zipfile.ZipFile(out) as z:
+            self.assertIn("a@gmail.com", z.read("job.csv").decode())
+
+
+class TestRecordReplay(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cassette = os.path.join(self.folder.name, "calls.jsonl")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def calls(self, mail):
+        return [
+            mail.send_message("a@example.com", "b@example.com", "hi", "body"),
+            mail.mailing_list_create("news", "News"),
+            mail.send_message("a@example.com", "c@example.com", "hi", "body"),
+            mail.get_logs(),
+        ]
+
+    def test_replay(self):
+        with StubServer() as server:
+            recorder = RecordReplayTransport(self.cassette, "record")
+            mail = Mailgun("secret-api-key", "example.com", transport=recorder)
+            mail.base_url = server.base_url()
+            recorded = self.calls(mail)
+            mail.close()
+        with open(self.cassette) as f:
+            self.assertNotIn("secret-api-key", f.read())
+
+        # the server is gone, answers come from the cassette
+        mail = Mailgun(
+            "key", "example.com", transport=RecordReplayTransport(self.cassette)
+        )
+        mail.base_url = server.base_url()
+        self.assertEqual(self.calls(mail), recorded)
+        self.assertEqual(recorded[2]["id"], "<2@example.com>")
+        with self.assertRaises(NoRecording):
+            mail.get_logs()
+
+
+if __name__ == "__main__":
+    unittest.main()
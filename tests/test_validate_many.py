@@ -0,0 +1,132 @@
+import io
+import os
+import sys
+import unittest
+import zipfile
+
+import requests
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Mailgun, ValidationCache
+from mailgun.testing import StubServer
+from mailgun.validation import local_check
+
+
+class TestLocalCheck(unittest.TestCase):
+    def test_short_circuit(self):
+        for address in (
+            "not-an-address",
+            "a..b@gmail.com",
+            "a@localhost",
+            "a@-bad-.com",
+            "a@1.2.3.4",
+            "someone@example.com",
+            "someone@mail.test",
+        ):
+            payload = local_check(address)
+            self.assertEqual(payload["risk"], "high", address)
+            self.assertTrue(payload["checked_locally"])
+
+        for address in ("Bikram <bkrm.dahal@gmail.com>", "a+tag@bücher.de"):
+            self.assertIsNone(local_check(address), address)
+
+
+class TestValidateMany(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.validate_url = self.server.url + "/v4/address/validate"
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def calls(self):
+        return [r for r in self.server.app.requests if r[1] == "/v4/address/validate"]
+
+    def addresses(self):
+        for i in range(300):
+            yield "user{}@docsumo.com".format(i % 100)
+            if i % 50 == 0:
+                yield "bad address {}".format(i)
+        yield "User1@Docsumo.com"
+
+    def test_ordered(self):
+        addresses = list(self.addresses())
+        results = list(self.mail.validate_many(addresses, workers=4, rate=None))
+        self.assertEqual([r.index for r in results], list(range(len(addresses))))
+        self.assertEqual([r.address for r in results], addresses)
+        for result in results:
+            self.assertIsNone(result.error)
+            expected = "high" if result.address.startswith("bad") else "low"
+            self.assertEqual(result.payload["risk"], expected)
+        # one call per distinct deliverable-looking address
+        self.assertEqual(len(self.calls()), 100)
+
+    def test_as_completed(self):
+        addresses = list(self.addresses())
+        results = list(self.mail.validate_many(addresses, workers=4, ordered=False))
+        self.assertEqual(sorted(r.index for r in results), list(range(len(addresses))))
+        self.assertEqual(len(self.calls()), 100)
+
+    def test_errors_and_cache(self):
+        self.mail.validation_cache = ValidationCache()
+        self.mail.validated_email("user1@docsumo.com")
+        self.server.app.inject_failures(1, status=500)
+        self.mail.validation_cache.set("user2@docsumo.com", {"risk": "low"})
+
+        results = list(
+            self.mail.validate_many(
+                ["user1@docsumo.com", "user2@docsumo.com", "user3@docsumo.com"]
+            )
+        )
+        self.assertEqual(len(self.calls()), 2)
+        # the failed call is not cached and its error body is not a payload
+        self.assertIsNone(results[2].payload)
+        self.assertIn("500", str(results[2].error))
+        self.assertIn("Injected failure", str(results[2].error))
+        self.assertEqual(results[0].payload["risk"], "low")
+
+    def test_throttled(self):
+        self.server.app.inject_failures(1, status=429)
+        results = list(
+            self.mail.validate_many(["user1@docsumo.com", "User1@docsumo.com"])
+        )
+        for result in results:
+            self.assertIsNone(result.payload)
+            self.assertIsInstance(result.error, requests.HTTPError)
+            self.assertEqual(result.error.response.status_code, 429)
+
+
+class TestBulkValidation(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.mail = Mailgun("key", "example.com")
+        self.mail.validate_url = self.server.url + "/v4/address/validate"
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+
+    def test_job(self):
+        addresses = ["user{}@docsumo.com".format(i) for i in range(1000)]
+        addresses.append("broken")
+        created = self.mail.create_bulk_validation("import-1", iter(addresses))
+        self.assertEqual(created["id"], "import-1")
+
+        status = self.mail.wait_bulk_validation("import-1", interval=0.01, timeout=5)
+        self.assertEqual(status["quantity"], 1001)
+
+        out = io.BytesIO()
+        self.mail.download_bulk_validation(status, out)
+        with zipfile.ZipFile(out) as z:
+            rows = z.read("import-1.csv").decode("utf-8").splitlines()
+        self.assertEqual(len(rows), 1002)
+        self.assertEqual(rows[-1], "broken,high")
+
+        self.mail.cancel_bulk_validation("import-1")
+        self.assertNotIn("import-1", self.server.app.bulk_jobs)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath("../"))
+from mailgun import Mailgun, ValidationCache
+from mailgun.testing import StubServer
+
+
+class TestValidationCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.server = StubServer().start()
+        self.mail = self.client(ValidationCache(maxsize=2))
+
+    def client(self, cache):
+        mail = Mailgun("key", "example.com", validation_cache=cache)
+        mail.validate_url = self.server.url + "/v4/address/validate"
+        return mail
+
+    def tearDown(self):
+        self.mail.close()
+        self.server.stop()
+        self.dir.cleanup()
+
+    def calls(self):
+        return len([r for r in self.server.app.requests if "validate" in r[1]])
+
+    def test_normalized_hits(self):
+        self.assertTrue(self.mail.validated_email("Bkrm.Dahal@Gmail.com"))
+        self.assertTrue(self.mail.validated_email(" <bkrm.dahal@gmail.com>"))
+        self.assertEqual(
+            self.mail.validate_address("bkrm.dahal@gmail.com")["risk"], "low"
+        )
+        self.assertEqual(self.calls(), 1)
+        stats = self.mail.validation_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+    def test_lru_and_ttl(self):
+        cache = self.mail.validation_cache
+        for address in ("a@x.com", "b@x.com", "a@x.com", "c@x.com"):
+            self.mail.validated_email(address)
+        # b was the least recently used
+        self.assertIsNone(cache.get("b@x.com"))
+        self.assertIsNotNone(cache.get("a@x.com"))
+
+        cache.negative_ttl = 0.05
+        self.assertFalse(self.mail.validated_email("not-an-address"))
+        self.assertFalse(self.mail.validated_email("not-an-address"))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("not-an-address"))
+        self.assertEqual(self.calls(), 4)
+
+    def test_sqlite_store(self):
+        path = os.path.join(self.dir.name, "validations.db")
+        first = self.client(ValidationCache(store=path))
+        first.validated_email("a@x.com")
+        first.close()
+
+        # a new process, or a restart, reads the stored result
+        second = self.client(ValidationCache(store=path))
+        self.assertTrue(second.validated_email("A@X.com"))
+        second.close()
+        self.assertEqual(self.calls(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()